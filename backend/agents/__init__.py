@@ -1,8 +1,27 @@
-from .base_agent import Agent
-from .flight_agent import FlightAgent
-from .hotel_agent import HotelAgent
-from .visa_agent import VisaAgent
-from .activity_agent import ActivityAgent
-from .itinerary_agent import ItineraryAgent
-from .memory_agent import MemoryAgent
-from .travel_agent import TravelAgent
+"""
+The agents, loaded on first use: importing one pulls in google.adk and
+litellm, which the API process only needs once it plans a trip.
+"""
+import importlib
+
+_AGENTS = {
+    "Agent": "base_agent",
+    "FlightAgent": "flight_agent",
+    "HotelAgent": "hotel_agent",
+    "VisaAgent": "visa_agent",
+    "ActivityAgent": "activity_agent",
+    "ItineraryAgent": "itinerary_agent",
+    "MemoryAgent": "memory_agent",
+    "TravelAgent": "travel_agent",
+}
+
+__all__ = list(_AGENTS)
+
+
+def __getattr__(name):
+    module = _AGENTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
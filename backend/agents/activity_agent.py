@@ -3,7 +3,6 @@ from .base_agent import Agent
 from datetime import datetime
 import google.adk
 from pydantic import BaseModel, ConfigDict
-from .tools.search_tool import web_search
 
 
 class Activity(BaseModel):
@@ -23,6 +22,9 @@ class ActivityList(BaseModel):
 class ActivityAgent(Agent):
     """Agent responsible for finding activities and things to do."""
 
+    def search_query(self, context: Dict[str, Any]) -> str:
+        return f"top things to do {context.get('destination', '')} {datetime.now().year}"
+
     def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
         """Create the ADK agent for activity search."""
         destination = context.get('destination', '')
@@ -32,14 +34,12 @@ class ActivityAgent(Agent):
 
         return google.adk.Agent(
             name="ActivitySearchAgent",
-            model=self.model,
+            model=self.routed_model("ActivitySearchAgent"),
             instruction=f"""You are a travel guide. Today's date is {current_date}.
 
 TASK: Find 5 activities/things to do in {destination}.
 
-TOOL USAGE:
-- Make exactly 1 search call with query: "top things to do {destination} {current_date[:4]}"
-- DO NOT search more than once.
+{self.search_instructions(context)}
 
 AFTER SEARCHING, you MUST respond with ONLY a JSON object (no explanation, no markdown):
 {{
@@ -61,7 +61,7 @@ IMPORTANT:
 - Include exactly 5 diverse activities
 - Use real attractions from search results
 {"- Focus on free or low-cost activities" if strict_budget else "- Mix of free and paid experiences"}""",
-            tools=[web_search],
+            tools=self.search_tools(context),
             output_schema=ActivityList,
             output_key="activities"
         )
@@ -1,11 +1,41 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
 import os
 import google.adk
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.sessions.sqlite_session_service import SqliteSessionService
 from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from pydantic import BaseModel
 from ..status_manager import status_manager
+from .. import recorder
+from ..http_pool import llm_sessions
+from . import model_router
+from .progress import plan_progress, section_finished
+from .tools.search_tool import web_search
+from .streaming_json import StreamingJSONParser, StreamParseError
+
+# Stream model output so structured responses are validated while they arrive.
+# Set TRAVEL_STREAM_AGENT_OUTPUT=0 to fall back to whole-response parsing.
+STREAM_AGENT_OUTPUT = os.getenv("TRAVEL_STREAM_AGENT_OUTPUT", "1") != "0"
+
+# Run each sub-agent's single web search up front and put the results in its
+# instruction, so the model answers in one turn instead of two.
+# Set TRAVEL_SEARCH_PREFETCH=0 to let agents call web_search themselves.
+SEARCH_PREFETCH = os.getenv("TRAVEL_SEARCH_PREFETCH", "1") != "0"
+
+# Called with (agent name, list field, item) whenever a streamed list item closes
+ItemCallback = Callable[[str, str, BaseModel], Awaitable[None]]
+
+
+def _output_schemas(agent: Any) -> Dict[str, Type[BaseModel]]:
+    """Collect output_schema per agent name across an ADK agent tree."""
+    schemas = {}
+    if getattr(agent, 'output_schema', None):
+        schemas[agent.name] = agent.output_schema
+    for sub_agent in getattr(agent, 'sub_agents', None) or []:
+        schemas.update(_output_schemas(sub_agent))
+    return schemas
 
 
 class ReportingSessionService(SqliteSessionService):
@@ -37,7 +67,9 @@ class ReportingSessionService(SqliteSessionService):
                 }
                 for key in delta:
                     if key in status_map:
-                        await status_manager.send_status(self.client_id, status_map[key], step=key)
+                        section_finished(key)
+                        await status_manager.send_status(self.client_id, status_map[key], step=key,
+                                                         progress=plan_progress())
 
 
 class Agent(ABC):
@@ -48,14 +80,18 @@ class Agent(ABC):
     # Shared session service instance (created once, reused)
     _session_service: Optional[ReportingSessionService] = None
     _app_name: str = "TravelAssistant"
+    # ADK sessions are owned by the user a request is for (see set_user_id)
     _user_id: str = "default_user"
 
     def __init__(self, name: str, model_client: Any = None, model_id: str = "openai/gpt-4o-mini"):
         self.name = name
         self.client = model_client
         self.model_id = model_id
-        self.model = LiteLlm(model=self.model_id)
+        # No-op unless traffic recording is enabled (TRAVEL_RECORD_DIR)
+        self.model = recorder.instrument_model(LiteLlm(model=self.model_id))
+        self._routed_models: Dict[str, LiteLlm] = {}
         self.client_id: Optional[str] = None
+        self.user_id: str = Agent._user_id
 
         # Initialize session service if not already done
         if Agent._session_service is None:
@@ -72,11 +108,59 @@ class Agent(ABC):
         if Agent._session_service:
             Agent._session_service.set_client_id(client_id)
 
+    def set_user_id(self, user_id: str):
+        """Set the user this agent works for; its ADK sessions are kept under that user"""
+        self.user_id = user_id or Agent._user_id
+
     async def report_status(self, status: str, step: str = None, data: dict = None):
         """Send a status update via WebSocket"""
         if self.client_id:
             print(f"[{self.name}] Reporting status: {status}")
-            await status_manager.send_status(self.client_id, status, step or self.name, data)
+            await status_manager.send_status(self.client_id, status, step or self.name, data, plan_progress())
+
+    def routed_model(self, adk_agent_name: str) -> LiteLlm:
+        """
+        Pick the model for an ADK agent from the routing table (see model_router).
+        Every call through the returned model feeds its latency and outcome back
+        into the router. Falls back to self.model when routing is disabled or the
+        agent has no route.
+        """
+        if not model_router.ROUTING_ENABLED or adk_agent_name not in model_router.model_router.routes:
+            return self.model
+
+        model_id = model_router.model_router.choose(adk_agent_name, self.model_id)
+        key = f"{adk_agent_name}:{model_id}"
+        if key not in self._routed_models:
+            model = recorder.instrument_model(LiteLlm(model=model_id))
+            model.llm_client = model_router.MeasuredLLMClient(
+                model.llm_client,
+                lambda seconds, ok: model_router.model_router.record(adk_agent_name, model_id, seconds, ok)
+            )
+            self._routed_models[key] = model
+            print(f"[{self.name}] Routing {adk_agent_name} to {model_id}")
+        return self._routed_models[key]
+
+    def search_query(self, context: Dict[str, Any]) -> Optional[str]:
+        """The one web search this agent's instruction calls for, or None if it doesn't search."""
+        return None
+
+    def search_instructions(self, context: Dict[str, Any]) -> str:
+        """
+        Instruction block for the agent's search: the prefetched results when
+        context has "search_results", otherwise the rule to make the one call.
+        """
+        query = self.search_query(context)
+        results = context.get("search_results")
+        if results is None:
+            return f"""TOOL USAGE:
+- Make exactly 1 search call with query: "{query}"
+- DO NOT search more than once."""
+        return f"""SEARCH RESULTS (already fetched for "{query}"; there is no search tool):
+{results}"""
+
+    def search_tools(self, context: Dict[str, Any]) -> List[Any]:
+        """Tools for the agent: none when its search was prefetched."""
+        return [] if context.get("search_results") is not None else [web_search]
 
     @property
     def session_service(self) -> ReportingSessionService:
@@ -96,18 +180,27 @@ class Agent(ABC):
         agent: google.adk.Agent,
         prompt: str,
         session_id: str,
-        initial_state: Optional[Dict[str, Any]] = None
+        initial_state: Optional[Dict[str, Any]] = None,
+        on_item: Optional[ItemCallback] = None
     ) -> Dict[str, Any]:
         """
         Run an ADK agent using the session service directly.
         The ADK Runner handles all orchestration including sub-agents.
 
+        With STREAM_AGENT_OUTPUT, every agent in the tree that has an output
+        schema gets a StreamingJSONParser: list items are handed to `on_item`
+        as soon as they close, and output that can no longer validate is
+        rejected immediately instead of after the full completion.
+
         Args:
             agent: The ADK agent to run
             prompt: The user prompt
             session_id: Unique session ID for this request
             initial_state: Optional initial state to set in the session
+            on_item: Optional async callback for streamed list items
         """
+        # Every agent's LLM requests share one keep-alive connection pool
+        llm_sessions.install()
         runner = google.adk.Runner(
             agent=agent,
             app_name=Agent._app_name,
@@ -118,7 +211,7 @@ class Agent(ABC):
         try:
             session = await self.session_service.create_session(
                 app_name=Agent._app_name,
-                user_id=Agent._user_id,
+                user_id=self.user_id,
                 session_id=session_id,
                 state=initial_state or {}
             )
@@ -126,7 +219,7 @@ class Agent(ABC):
             # Session might already exist, try to get it
             session = await self.session_service.get_session(
                 app_name=Agent._app_name,
-                user_id=Agent._user_id,
+                user_id=self.user_id,
                 session_id=session_id
             )
             if not session:
@@ -139,25 +232,73 @@ class Agent(ABC):
 
         final_text = ""
         event_count = 0
-
-        async for event in runner.run_async(
-            user_id=Agent._user_id,
+        parsers = {}
+        rejected = set()
+        run_config = None
+        if STREAM_AGENT_OUTPUT:
+            parsers = {name: StreamingJSONParser(schema)
+                       for name, schema in _output_schemas(agent).items()}
+            run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+        events = runner.run_async(
+            user_id=self.user_id,
             session_id=session_id,
-            new_message=new_message
-        ):
-            event_count += 1
-
-            # Extract text from event content
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        final_text += part.text
+            new_message=new_message,
+            run_config=run_config
+        )
+        try:
+            async for event in events:
+                event_count += 1
+
+                # Prompt size of each LLM call (the usage comes with its final response)
+                usage = getattr(event, "usage_metadata", None)
+                if usage and usage.prompt_token_count and not event.partial:
+                    print(f"[{self.name}] {event.author} call: {usage.prompt_token_count} prompt tokens")
+                    recorder.record("prompt", agent=event.author, tokens=usage.prompt_token_count)
+
+                # Extract text from event content
+                if not (event.content and event.content.parts):
+                    continue
+                text = "".join(part.text for part in event.content.parts
+                               if hasattr(part, 'text') and part.text)
+                if not text:
+                    continue
+
+                # Streamed chunks are repeated in the final aggregated event
+                if not event.partial:
+                    final_text += text
+                    continue
+
+                parser = parsers.get(event.author)
+                if parser is None or event.author in rejected:
+                    continue
+                try:
+                    items = parser.feed(text)
+                except StreamParseError as e:
+                    rejected.add(event.author)
+                    print(f"[{self.name}] Rejecting streamed output from {event.author}: {e}")
+                    recorder.record("parse", agent=event.author, ok=False, chars=parser.chars,
+                                    error=str(e)[:500], early=True)
+                    if event.author == agent.name:
+                        # Nothing else depends on this run - stop paying for the completion
+                        break
+                    continue
+                if on_item:
+                    for field, item in items:
+                        await on_item(event.author, field, item)
+        finally:
+            await events.aclose()
 
         print(
             f"[{self.name}] Processed {event_count} events, collected {len(final_text)} chars")
 
+        if agent.name in rejected:
+            return {}
+
         if not final_text.strip():
             print(f"[{self.name}] Warning: No text response from agent {agent.name}")
+            if getattr(agent, 'output_schema', None):
+                recorder.record("parse", agent=agent.name, ok=False, chars=0, error="empty response")
             return {}
 
         # If the agent has an output schema, attempt to parse the result
@@ -182,8 +323,10 @@ class Agent(ABC):
 
                 result = agent.output_schema.model_validate_json(cleaned_text)
                 print(f"[{self.name}] Successfully parsed structured output")
+                recorder.record("parse", agent=agent.name, ok=True, chars=len(final_text))
                 return result
             except Exception as e:
+                recorder.record("parse", agent=agent.name, ok=False, chars=len(final_text), error=str(e)[:500])
                 print(
                     f"[{self.name}] Error parsing structured response for {agent.name}: {e}")
                 print(
@@ -199,7 +342,7 @@ class Agent(ABC):
         """
         session = await self.session_service.get_session(
             app_name=Agent._app_name,
-            user_id=Agent._user_id,
+            user_id=self.user_id,
             session_id=session_id
         )
 
@@ -0,0 +1,206 @@
+"""
+Deadlines and hedged execution for trip planning sections.
+
+A plan gets one request-level deadline. Each section (flights, hotels, visa,
+activities, itinerary) gets a share of it, so one slow sub-agent cannot hold
+the whole plan hostage. Once a section has run longer than its historical p95,
+a duplicate (hedged) attempt is started and whichever succeeds first wins.
+
+Section durations are kept in the section_latencies table, so percentiles
+(and hedging) survive restarts: the API loads the last
+TRAVEL_LATENCY_HISTORY_DAYS of samples once at startup (load) and writes new
+ones when a plan finishes (flush), both off the event loop. Samples are also
+kept per destination region (the destination's country); a region's own
+percentiles are used once it has MIN_REGION_SAMPLES. TRAVEL_LATENCY_HISTORY=0
+keeps them in memory only.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .. import database as db
+
+# Overall budget for one plan; override per request with UserQuery.deadline_seconds
+DEFAULT_PLAN_DEADLINE_S = float(os.getenv("TRAVEL_PLAN_DEADLINE_S", "90"))
+
+# Share of the plan deadline each section may use. The gather sections run
+# concurrently; the itinerary runs after them and gets whatever is left.
+SECTION_BUDGETS = {
+    "flights": 0.65,
+    "hotels": 0.6,
+    "visa": 0.5,
+    "activities": 0.6,
+    "itinerary": 1.0,
+}
+
+# Hedging needs a meaningful p95 before it kicks in
+MIN_HEDGE_SAMPLES = 20
+# A region's own percentiles are used once it has this many samples
+MIN_REGION_SAMPLES = 5
+# Samples behind recent_p50_s in stats(), to spot a section slowing down
+RECENT_SAMPLES = 20
+
+HISTORY_ENABLED = os.getenv("TRAVEL_LATENCY_HISTORY", "1") != "0"
+HISTORY_S = float(os.getenv("TRAVEL_LATENCY_HISTORY_DAYS", "14")) * 24 * 3600
+HISTORY_LOAD_LIMIT = 20000
+
+
+class PlanDeadline:
+    """Tracks the time left for one planning request."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds or DEFAULT_PLAN_DEADLINE_S
+        self._expires_at = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def budget_for(self, section: str) -> float:
+        """Seconds this section may run, never past the plan deadline."""
+        return min(self.seconds * SECTION_BUDGETS.get(section, 1.0), self.remaining())
+
+
+class LatencyTracker:
+    """
+    Rolling windows of section durations (timeouts count as their budget),
+    overall and per region, used to pick hedge delays and estimate time
+    remaining (see progress.py).
+    """
+
+    def __init__(self, window: int = 200, persist: bool = HISTORY_ENABLED):
+        self.window = window
+        self.persist = persist
+        self._samples: Dict[Tuple[str, Optional[str]], Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self._unsaved: List[tuple] = []
+
+    def load(self):
+        """(Re)load recent samples from the database, pruning older ones."""
+        if not self.persist:
+            return
+        self._samples.clear()
+        try:
+            since = time.time() - HISTORY_S
+            db.delete_section_latencies_before(since)
+            rows = db.get_section_latencies(since, HISTORY_LOAD_LIMIT)
+        except sqlite3.Error as e:
+            print(f"[Deadlines] Couldn't load latency history: {e}")
+            return
+        for row in rows:
+            self._add(row['section'], row['region'], row['seconds'])
+        print(f"[Deadlines] Loaded {len(rows)} section latencies")
+
+    def _add(self, section: str, region: Optional[str], seconds: float):
+        self._samples[(section, None)].append(seconds)
+        if region:
+            self._samples[(section, region)].append(seconds)
+
+    def _window(self, section: str, region: Optional[str] = None) -> Deque[float]:
+        if region and len(self._samples.get((section, region), ())) >= MIN_REGION_SAMPLES:
+            return self._samples[(section, region)]
+        return self._samples.get((section, None), deque())
+
+    def record(self, section: str, seconds: float, region: Optional[str] = None):
+        self._add(section, region, seconds)
+        if self.persist:
+            self._unsaved.append((section, region, round(seconds, 3), time.time()))
+
+    def flush(self):
+        """Write samples recorded since the last flush to the database."""
+        samples, self._unsaved = self._unsaved, []
+        if not samples:
+            return
+        try:
+            db.add_section_latencies(samples)
+        except sqlite3.Error as e:
+            print(f"[Deadlines] Couldn't save {len(samples)} section latencies: {e}")
+
+    def percentile(self, section: str, pct: float, region: Optional[str] = None) -> Optional[float]:
+        samples = sorted(self._window(section, region))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(pct / 100 * len(samples)))
+        return samples[index]
+
+    def hedge_after(self, section: str) -> Optional[float]:
+        """The section's p95 once enough history exists, else None (no hedging)."""
+        if len(self._window(section)) < MIN_HEDGE_SAMPLES:
+            return None
+        return self.percentile(section, 95)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per section: sample count, p50/p95, the median of the latest runs, and per-region medians."""
+        def median(samples) -> Optional[float]:
+            samples = sorted(samples)
+            return round(samples[len(samples) // 2], 3) if samples else None
+
+        sections: Dict[str, Any] = {}
+        for (section, region), samples in sorted(self._samples.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+            if region is None:
+                sections[section] = {
+                    "samples": len(samples),
+                    "p50_s": median(samples),
+                    "p95_s": round(self.percentile(section, 95), 3) if samples else None,
+                    "recent_p50_s": median(list(samples)[-RECENT_SAMPLES:]),
+                    "regions": {},
+                }
+            else:
+                sections.setdefault(section, {"regions": {}})["regions"][region] = {
+                    "samples": len(samples), "p50_s": median(samples)}
+        return sections
+
+
+latency_tracker = LatencyTracker()
+
+
+async def run_hedged(
+    attempt: Callable[[int], Awaitable[Any]],
+    timeout: float,
+    hedge_after: Optional[float] = None,
+    is_success: Callable[[Any], bool] = bool
+) -> Any:
+    """
+    Run attempt(0); if it hasn't finished after `hedge_after` seconds, also run
+    attempt(1). Return the first successful result and cancel the other.
+
+    Raises asyncio.TimeoutError when nothing succeeds within `timeout`, or the
+    last attempt's exception when every attempt failed.
+    """
+    loop = asyncio.get_running_loop()
+    expires_at = loop.time() + timeout
+    pending = {asyncio.ensure_future(attempt(0))}
+    hedged = hedge_after is None or hedge_after >= timeout
+    last_error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            wait_until = expires_at if hedged else min(expires_at, loop.time() + hedge_after)
+            remaining = wait_until - loop.time()
+            if remaining <= 0 and hedged:
+                raise asyncio.TimeoutError()
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, remaining), return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task.exception() is not None:
+                    last_error = task.exception()
+                elif is_success(task.result()):
+                    return task.result()
+
+            if not hedged and (not done or not pending):
+                # Still slow past p95, or the first attempt already failed: fire the duplicate
+                hedged = True
+                print(f"[Deadlines] Starting hedged attempt (p95 {hedge_after:.1f}s)")
+                pending.add(asyncio.ensure_future(attempt(1)))
+                continue
+            if not done and loop.time() >= expires_at:
+                raise asyncio.TimeoutError()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if last_error is not None:
+        raise last_error
+    return None
@@ -0,0 +1,109 @@
+from typing import Dict, Any, List
+from .base_agent import Agent
+from datetime import datetime
+import json
+import uuid
+import google.adk
+from pydantic import BaseModel, ConfigDict
+from .flight_agent import Flight
+from .hotel_agent import Hotel
+from .visa_agent import VisaInfo
+from .activity_agent import Activity
+from .itinerary_agent import ItineraryDay
+
+# Search sections -> heading in the prompt
+SEARCH_HEADINGS = {
+    "flights": "FLIGHT SEARCH RESULTS",
+    "hotels": "HOTEL SEARCH RESULTS",
+    "visa": "VISA SEARCH RESULTS",
+    "activities": "ACTIVITY SEARCH RESULTS",
+}
+
+
+class FastPlan(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    outbound_flights: List[Flight]
+    return_flights: List[Flight]
+    hotels: List[Hotel]
+    visa: VisaInfo
+    activities: List[Activity]
+    days: List[ItineraryDay]
+
+
+class FastPlanAgent(Agent):
+    """
+    Agent that plans the whole trip in one structured completion.
+
+    Used by the "fast" engine: the TravelAgent fetches every section's search
+    results up front and this agent turns them into flights, hotels, visa,
+    activities and the itinerary at once, with no tools and no second phase.
+    """
+
+    def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
+        """Create the ADK agent for single-call trip planning."""
+        origin = context.get('origin', '')
+        destination = context.get('destination', '')
+        current_date = datetime.now().strftime("%B %d, %Y")
+        currency = context.get('currency', 'USD')
+        strict_budget = context.get('strict_budget', False)
+        travelers = context.get('travelers', 1)
+        travel_time = context.get('travel_time', '')
+        dates = context.get('dates', '')
+        days = context.get('days') or 3
+        search_results = context.get('search_results', {})
+        known_visa = context.get('known_visa')
+        user_memories = context.get('user_memories', '')
+
+        searches = "\n\n".join(
+            f"{heading}:\n{search_results[section]}"
+            for section, heading in SEARCH_HEADINGS.items() if section in search_results
+        )
+        visa_note = (f"Visa requirements are already known; copy them into \"visa\": {json.dumps(known_visa)}"
+                     if known_visa else "")
+
+        return google.adk.Agent(
+            name="FastPlanAgent",
+            model=self.routed_model("FastPlanAgent"),
+            instruction=f"""You are a travel planner. Today's date is {current_date}.
+
+TASK: Plan a {days}-day trip from {origin or 'a major city'} to {destination} for {travelers} traveler(s).
+{f'Travel period: {travel_time}' if travel_time else ''}
+{f'Dates: {dates}' if dates else ''}
+
+The web searches have already been made; there is no search tool.
+
+{searches or 'No search results are available.'}
+{visa_note}
+{f"{user_memories}Take these preferences into account." if user_memories else ""}
+
+Respond with ONLY a JSON object (no explanation, no markdown) with these keys:
+- "outbound_flights": exactly 3 flights {origin} → {destination}, each {{"airline", "price": "{currency} XXX", "departure": "HH:MM AM/PM", "arrival": "HH:MM AM/PM", "duration": "Xh Xm"}}
+- "return_flights": exactly 3 flights {destination} → {origin}, same fields
+- "hotels": exactly 3 hotels, each {{"name", "price_per_night": "{currency} XXX", "rating" (number 1-5), "description", "amenities": [...], "style": "luxury/boutique/budget"}}
+- "visa": {{"country": "{destination}", "required", "requirements": [...], "processing_time", "application_url", "application_steps": [...]}}
+- "activities": exactly 5 activities, each {{"name", "description", "price": "{currency} XXX or Free", "duration", "category": "sightseeing/food/culture/adventure/relaxation"}}
+- "days": a {days}-day itinerary, each {{"day": N, "activities": [{{"name", "description", "price", "duration"}}]}}, built around the activities above
+
+IMPORTANT:
+- Output ONLY valid JSON, nothing else
+- Extract real airlines, hotels, prices and attractions from the search results; DO NOT make up details
+- The visa "application_url" MUST be copied from an official government search result URL, otherwise null
+- Include 1-2 cultural tips in the itinerary for someone traveling from {origin or 'their home'} to {destination}
+{"- Focus on budget-friendly options and free or low-cost activities" if strict_budget else "- Mix of budget and premium options"}""",
+            output_schema=FastPlan,
+            output_key="trip"
+        )
+
+    async def perform_task(self, query: str, context: Dict[str, Any] = {}) -> Dict[str, Any]:
+        print(f"[{self.name}] Planning whole trip for: {query}")
+
+        adk_agent = self.create_adk_agent(context)
+
+        try:
+            result = await self.run_adk_agent(adk_agent, query, f"fast-plan-{uuid.uuid4()}", context)
+            if isinstance(result, FastPlan):
+                return result.model_dump()
+            return result if isinstance(result, dict) else {}
+        except Exception as e:
+            print(f"[{self.name}] Error during ADK execution: {e}")
+            return {}
@@ -3,7 +3,6 @@ from .base_agent import Agent
 from urllib.parse import quote
 from datetime import datetime
 import google.adk
-from .tools.search_tool import web_search
 from pydantic import BaseModel, ConfigDict
 
 
@@ -46,6 +45,12 @@ class FlightAgent(Agent):
         search_query = " ".join(query_parts)
         return f"{base_url}?q={quote(search_query)}"
 
+    def search_query(self, context: Dict[str, Any]) -> str:
+        origin = context.get('origin', '')
+        destination = context.get('destination', '')
+        when = context.get('travel_time', '') or context.get('dates', '')
+        return f"roundtrip flights {origin} to {destination} {when} prices {datetime.now().year}"
+
     def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
         """Create the ADK agent for flight search."""
         origin = context.get('origin', '')
@@ -60,16 +65,14 @@ class FlightAgent(Agent):
 
         return google.adk.Agent(
             name="FlightSearchAgent",
-            model=self.model,
+            model=self.routed_model("FlightSearchAgent"),
             instruction=f"""You are a flight search assistant. Today's date is {current_date}.
 
 TASK: Find roundtrip flight options for a trip from {origin or 'a major city'} to {destination}.
 {f'Travel period: {travel_time}' if travel_time else ''}
 Trip duration: {days} days
 
-TOOL USAGE:
-- Make exactly 1 search call with query: "roundtrip flights {origin} to {destination} {travel_time or dates} prices {current_date[:4]}"
-- DO NOT search more than once.
+{self.search_instructions(context)}
 
 CRITICAL RULES:
 - DO NOT make up flight details (airline names, times, prices, durations)
@@ -107,7 +110,7 @@ IMPORTANT:
 - Outbound = {origin} → {destination}
 - Return = {destination} → {origin}
 {"- Focus on budget-friendly options" if strict_budget else "- Mix of budget and premium options"}""",
-            tools=[web_search],
+            tools=self.search_tools(context),
             output_schema=FlightList,
             output_key="flights"
         )
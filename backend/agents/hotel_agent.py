@@ -1,9 +1,9 @@
+import asyncio
 from typing import Dict, Any, List
 from .base_agent import Agent
 from urllib.parse import quote
 from datetime import datetime
 import google.adk
-from .tools.search_tool import web_search
 from .tools.image_utils import get_hotel_image
 from pydantic import BaseModel, ConfigDict
 
@@ -35,6 +35,9 @@ class HotelAgent(Agent):
         search_query = " ".join(query_parts)
         return f"{base_url}?q={quote(search_query)}"
 
+    def search_query(self, context: Dict[str, Any]) -> str:
+        return f"best hotels {context.get('destination', '')} prices per night {datetime.now().year}"
+
     def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
         """Create the ADK agent for hotel search."""
         destination = context.get('destination', '')
@@ -47,15 +50,13 @@ class HotelAgent(Agent):
 
         return google.adk.Agent(
             name="HotelSearchAgent",
-            model=self.model,
+            model=self.routed_model("HotelSearchAgent"),
             instruction=f"""You are a hotel search assistant. Today's date is {current_date}.
 
 TASK: Find 3 hotel options in {destination}.
 {f'Travel period: {travel_time}' if travel_time else ''}
 
-TOOL USAGE:
-- Make exactly 1 search call with query: "best hotels {destination} prices per night {current_date[:4]}"
-- DO NOT search more than once.
+{self.search_instructions(context)}
 
 AFTER SEARCHING, you MUST respond with ONLY a JSON object (no explanation, no markdown):
 {{
@@ -78,7 +79,7 @@ IMPORTANT:
 - Extract real hotel names and prices from search results
 - rating must be a number between 1-5
 {"- Focus on budget-friendly options" if strict_budget else "- Mix: 1 budget, 1 mid-range, 1 luxury"}""",
-            tools=[web_search],
+            tools=self.search_tools(context),
             output_schema=HotelList,
             output_key="hotels"
         )
@@ -107,7 +108,7 @@ IMPORTANT:
                 hotel_name = hotel.get('name', 'hotel')
                 hotel['booking_url'] = self._generate_hotel_booking_url(
                     hotel_name, destination, dates)
-                hotel['image_url'] = get_hotel_image(hotel_name, destination)
+                hotel['image_url'] = await asyncio.to_thread(get_hotel_image, hotel_name, destination)
                 # clean up style
                 hotel.pop('style', None)
 
@@ -33,15 +33,17 @@ class ItineraryAgent(Agent):
         days = context.get('days', 3)
         origin = context.get('origin', 'their home')
         destination = context.get('destination', 'this destination')
+        user_memories = context.get('user_memories', '')
 
         return google.adk.Agent(
             name="ItineraryPlannerAgent",
-            model=self.model,
+            model=self.routed_model("ItineraryPlannerAgent"),
             instruction=f"""
 You are an expert travel planner. Create a day-by-day itinerary.
 Context (flights, hotels, activities found so far): {json.dumps(gathered_info, default=str)}
 
 Generate a {days}-day itinerary.
+{f"{user_memories}Take these preferences into account." if user_memories else ""}
 
 **Cultural Sensitivity**: Include 1-2 "Cultural Tips" or adjustments in the itinerary that would be particularly useful for someone traveling from {origin} to {destination}. For example, differences in tipping culture, dress codes, or social etiquette.
 """,
@@ -1,6 +1,7 @@
 from typing import Dict, Any, List
 from .base_agent import Agent
 import json
+import uuid
 import google.adk
 from pydantic import BaseModel, ConfigDict
 
@@ -17,22 +18,36 @@ class MemoryList(BaseModel):
     memories: List[Memory]
 
 
+# UserQuery fields that say something about the user
+INTERACTION_FIELDS = ("query", "destination", "origin", "days", "travelers", "travel_time",
+                      "currency", "strict_budget", "budget")
+
+
+def compact_interaction(user_query: Dict[str, Any], trip_result: Dict[str, Any] = None) -> Dict[str, Any]:
+    """The parts of one planning interaction worth extracting memories from"""
+    summary = {field: user_query[field] for field in INTERACTION_FIELDS
+               if user_query.get(field) not in (None, "", False)}
+    if trip_result and trip_result.get('destination') and 'destination' not in summary:
+        summary['destination'] = trip_result['destination']
+    return summary
+
+
 class MemoryAgent(Agent):
     """Agent that extracts user preferences and memories from conversations."""
 
     def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
         """Create the ADK agent for memory extraction."""
-        user_query = context.get('user_query', '')
-        trip_result = context.get('trip_result', {})
+        interactions = context.get('interactions') or []
+        lines = "\n".join(json.dumps(i, separators=(",", ":"), default=str) for i in interactions)
 
         return google.adk.Agent(
             name="MemoryExtractorAgent",
-            model=self.model,
+            model=self.routed_model("MemoryExtractorAgent"),
             instruction=f"""
-Analyze this travel planning interaction and extract user preferences and facts that should be remembered for future interactions.
+Analyze these travel planning requests from one user and extract user preferences and facts that should be remembered for future interactions.
 
-User Query: {user_query}
-Context: {json.dumps(context, indent=2, default=str)}
+Requests (one JSON object per line, oldest first):
+{lines}
 
 Extract memories in these categories:
 - travel_style: How the user likes to travel (luxury, budget, adventure, etc.)
@@ -46,36 +61,41 @@ Extract memories in these categories:
 - accessibility_needs: Any special requirements
 
 Only extract memories that are clearly stated or strongly implied.
-Do not make assumptions.
+Do not make assumptions. A preference seen in several requests deserves a higher confidence.
 """,
             output_schema=MemoryList,
             output_key="memories"  # Write results to shared session state
         )
 
+    async def extract_batch(self, interactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract memories from several compacted interactions in one call.
+        Errors propagate, so a background caller can retry the batch; so does
+        an answer without a memory list (run_adk_agent returns {} when the
+        model's output is empty or doesn't parse).
+        """
+        print(f"[{self.name}] Extracting memories from {len(interactions)} interactions...")
+        adk_agent = self.create_adk_agent({'interactions': interactions})
+        result = await self.run_adk_agent(adk_agent, "Extract memories from these requests",
+                                          f"memory-extraction-{uuid.uuid4()}")
+
+        if isinstance(result, MemoryList):
+            memories = [m.model_dump() for m in result.memories]
+        elif isinstance(result, dict) and 'memories' in result:
+            memories = [m.model_dump() for m in MemoryList.model_validate(result).memories]
+        else:
+            raise ValueError(f"Memory extraction returned no memory list: {result!r:.200}")
+
+        # Note: ADK already stores results in session.state["memories"] via output_key
+        # No need to manually update state
+
+        print(f"[{self.name}] Extracted {len(memories)} memories")
+        return memories
+
     async def extract_memories(self, user_query: str, trip_result: Dict[str, Any], context: Dict[str, Any] = {}) -> List[Dict[str, Any]]:
         """Extract meaningful memories from a trip planning interaction"""
-        print(f"[{self.name}] Extracting memories from interaction...")
-
-        # Add context for the agent
-        full_context = {**context, 'user_query': user_query,
-                        'trip_result': trip_result}
-        adk_agent = self.create_adk_agent(full_context)
-
         try:
-            result = await self.run_adk_agent(adk_agent, user_query)
-
-            if isinstance(result, MemoryList):
-                memories = [m.model_dump() for m in result.memories]
-            elif isinstance(result, dict):
-                memories = result.get('memories', [])
-            else:
-                memories = []
-
-            # Note: ADK already stores results in session.state["memories"] via output_key
-            # No need to manually update state
-
-            print(f"[{self.name}] Extracted {len(memories)} memories")
-            return memories
+            return await self.extract_batch([compact_interaction({**context, 'query': user_query}, trip_result)])
         except Exception as e:
             print(f"[{self.name}] Error extracting memories: {e}")
             return []
@@ -0,0 +1,141 @@
+"""
+Per-agent model routing with latency-adaptive selection.
+
+Each ADK agent (FlightSearchAgent, VisaInfoAgent, ItineraryPlannerAgent, ...)
+has a preference list of models and a latency SLO. Every LLM call is measured
+per (agent, model) over a sliding window, and ModelRouter.choose picks the
+fastest model that is currently meeting its SLO (p95 latency and error rate).
+Models without enough recent samples are tried first, in preference order, and
+then occasionally re-explored so a recovered model can win back traffic.
+
+Override the table with TRAVEL_MODEL_ROUTES (JSON, same shape as MODEL_ROUTES)
+or pin every agent to its model_id with TRAVEL_MODEL_ROUTING=0.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from google.adk.models.lite_llm import LiteLLMClient
+
+ROUTING_ENABLED = os.getenv("TRAVEL_MODEL_ROUTING", "1") != "0"
+
+# Structured extraction from search snippets is simple; the itinerary needs
+# more reasoning, so it keeps mini-class models and a looser SLO.
+MODEL_ROUTES: Dict[str, Dict[str, Any]] = {
+    "FlightSearchAgent": {"models": ["openai/gpt-4o-mini", "openai/gpt-4.1-mini"], "p95_slo_s": 8.0},
+    "HotelSearchAgent": {"models": ["openai/gpt-4o-mini", "openai/gpt-4.1-mini"], "p95_slo_s": 8.0},
+    "VisaInfoAgent": {"models": ["openai/gpt-4.1-nano", "openai/gpt-4o-mini"], "p95_slo_s": 5.0},
+    "ActivitySearchAgent": {"models": ["openai/gpt-4.1-nano", "openai/gpt-4o-mini"], "p95_slo_s": 5.0},
+    "ItineraryPlannerAgent": {"models": ["openai/gpt-4o-mini", "openai/gpt-4.1-mini"], "p95_slo_s": 15.0},
+    "FastPlanAgent": {"models": ["openai/gpt-4o-mini", "openai/gpt-4.1-mini"], "p95_slo_s": 20.0},
+    "MemoryExtractorAgent": {"models": ["openai/gpt-4.1-nano", "openai/gpt-4o-mini"], "p95_slo_s": 10.0},
+}
+if os.getenv("TRAVEL_MODEL_ROUTES"):
+    MODEL_ROUTES = json.loads(os.environ["TRAVEL_MODEL_ROUTES"])
+
+MAX_ERROR_RATE = 0.1
+WINDOW_SIZE = 50          # calls kept per (agent, model)
+WINDOW_SECONDS = 15 * 60  # and no older than this
+MIN_SAMPLES = 5           # below this a model counts as unexplored
+EXPLORE_RATE = 0.05       # share of calls re-checking unexplored models
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ModelRouter:
+    """Sliding-window latency/error stats per (agent, model) and the selection policy."""
+
+    def __init__(self, routes: Dict[str, Dict[str, Any]], seed: Optional[int] = None):
+        self.routes = routes
+        self._calls: Dict[Tuple[str, str], Deque[Tuple[float, float, bool]]] = defaultdict(
+            lambda: deque(maxlen=WINDOW_SIZE))
+        self._rng = random.Random(seed)
+
+    def record(self, agent_name: str, model: str, seconds: float, ok: bool):
+        self._calls[(agent_name, model)].append((time.monotonic(), seconds, ok))
+
+    def stats(self, agent_name: str, model: str) -> Optional[Dict[str, float]]:
+        """p50/p95 latency and error rate over the window; None if unexplored."""
+        calls = self._calls.get((agent_name, model))
+        if not calls:
+            return None
+        cutoff = time.monotonic() - WINDOW_SECONDS
+        while calls and calls[0][0] < cutoff:
+            calls.popleft()
+        if len(calls) < MIN_SAMPLES:
+            return None
+        latencies = [seconds for _, seconds, ok in calls if ok]
+        error_rate = 1 - len(latencies) / len(calls)
+        if not latencies:
+            return {"p50": float("inf"), "p95": float("inf"), "error_rate": error_rate}
+        return {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95), "error_rate": error_rate}
+
+    def choose(self, agent_name: str, default_model: str) -> str:
+        route = self.routes.get(agent_name)
+        if not route or not route.get("models"):
+            return default_model
+
+        models = route["models"]
+        slo = route.get("p95_slo_s", float("inf"))
+        stats = {model: self.stats(agent_name, model) for model in models}
+        unexplored = [model for model in models if stats[model] is None]
+        healthy = [model for model in models
+                   if stats[model] and stats[model]["p95"] <= slo and stats[model]["error_rate"] <= MAX_ERROR_RATE]
+
+        if unexplored and (not healthy or self._rng.random() < EXPLORE_RATE):
+            return unexplored[0]
+        if healthy:
+            return min(healthy, key=lambda model: stats[model]["p50"])
+        # Everything is missing its SLO: take the least bad
+        return min(models, key=lambda model: (stats[model]["error_rate"], stats[model]["p95"]))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current stats per agent and model, for logging and ops endpoints."""
+        return {
+            agent_name: {model: self.stats(agent_name, model) for model in route.get("models", [])}
+            for agent_name, route in self.routes.items()
+        }
+
+
+model_router = ModelRouter(MODEL_ROUTES)
+
+
+class MeasuredLLMClient(LiteLLMClient):
+    """Wraps a LiteLLMClient and reports each call's latency and outcome."""
+
+    def __init__(self, inner: LiteLLMClient, on_result: Callable[[float, bool], None]):
+        self.inner = inner
+        self.on_result = on_result
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        started = time.perf_counter()
+        try:
+            response = await self.inner.acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.on_result(time.perf_counter() - started, False)
+            raise
+        if kwargs.get("stream"):
+            return self._measure_stream(response, started)
+        self.on_result(time.perf_counter() - started, True)
+        return response
+
+    async def _measure_stream(self, stream: Any, started: float):
+        try:
+            async for chunk in stream:
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # Abandoned by a hedge or an early parse rejection - says nothing about the model
+            raise
+        except Exception:
+            self.on_result(time.perf_counter() - started, False)
+            raise
+        self.on_result(time.perf_counter() - started, True)
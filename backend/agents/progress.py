@@ -0,0 +1,97 @@
+"""
+Plan progress for WebSocket status messages: time elapsed, the sections still
+pending and an estimate of the time remaining.
+
+A plan runs in phases: the search prefetch, the gather sections (flights,
+hotels, visa, activities) side by side, the itinerary, then post-processing.
+A pending section is expected to take its historical median (latency_tracker,
+for the destination's region once it has enough samples there), less the
+time it has already been running. A phase lasts as long as its slowest
+pending section and phases add up; the estimate never runs past the plan
+deadline. While some pending section has no history yet, eta_s is None.
+
+The current plan's progress lives in a context variable, so the sub-agents'
+tasks and the session service see it without it being passed around.
+"""
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .deadlines import PlanDeadline, latency_tracker
+
+
+class PlanProgress:
+    """Which sections of one plan have started and finished."""
+
+    def __init__(self, phases: Iterable[Iterable[str]], region: Optional[str] = None,
+                 deadline: Optional[PlanDeadline] = None):
+        self.phases: List[List[str]] = [list(phase) for phase in phases if phase]
+        self.region = region
+        self.deadline = deadline
+        self._started_at = time.monotonic()
+        self._running: Dict[str, float] = {}
+        self._done: Set[str] = set()
+
+    def start(self, section: str):
+        self._running.setdefault(section, time.monotonic())
+
+    def finish(self, section: str):
+        self._done.add(section)
+        self._running.pop(section, None)
+
+    @property
+    def pending(self) -> List[str]:
+        return [section for phase in self.phases for section in phase if section not in self._done]
+
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the plan is done, None without history for a pending section."""
+        now = time.monotonic()
+        total = 0.0
+        for phase in self.phases:
+            remaining = []
+            for section in phase:
+                if section in self._done:
+                    continue
+                expected = latency_tracker.percentile(section, 50, self.region)
+                if expected is None:
+                    return None
+                if section in self._running:
+                    expected -= now - self._running[section]
+                remaining.append(max(expected, 0.0))
+            total += max(remaining, default=0.0)
+        return min(total, self.deadline.remaining()) if self.deadline else total
+
+    def snapshot(self) -> Dict[str, Any]:
+        eta = self.eta()
+        return {
+            "elapsed_s": round(time.monotonic() - self._started_at, 1),
+            "pending": self.pending,
+            "eta_s": round(eta, 1) if eta is not None else None,
+        }
+
+
+_current: ContextVar[Optional[PlanProgress]] = ContextVar("plan_progress", default=None)
+
+
+def track_plan(progress: PlanProgress) -> PlanProgress:
+    """Make `progress` the current plan's (for this task and the tasks it starts)."""
+    _current.set(progress)
+    return progress
+
+
+def section_started(section: str):
+    progress = _current.get()
+    if progress is not None:
+        progress.start(section)
+
+
+def section_finished(section: str):
+    progress = _current.get()
+    if progress is not None:
+        progress.finish(section)
+
+
+def plan_progress() -> Optional[Dict[str, Any]]:
+    """The current plan's progress snapshot for a status message, None outside a plan."""
+    progress = _current.get()
+    return progress.snapshot() if progress is not None else None
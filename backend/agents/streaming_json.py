@@ -0,0 +1,181 @@
+"""
+Incremental parser for structured agent output streamed as JSON text.
+
+LLM agents answer with one JSON object (optionally inside a ```json fence).
+StreamingJSONParser consumes the text chunk by chunk and:
+- emits each element of a top-level list field (a flight, hotel, activity,
+  itinerary day) as soon as its closing brace arrives, validated against the
+  element model of the output schema
+- raises StreamParseError as soon as the stream can no longer become valid:
+  prose instead of JSON, characters that cannot appear in JSON, mismatched
+  brackets, unknown top-level keys on `extra='forbid'` schemas, or a list
+  element that fails validation
+
+Each character is scanned once, so feeding a whole completion costs O(n).
+"""
+import json
+import typing
+from typing import Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+# Characters allowed outside strings: structure, numbers, true/false/null
+_BARE_CHARS = set("{}[],:-+.eE0123456789truefalsn \t\r\n")
+_FENCE = "```"
+
+
+class StreamParseError(ValueError):
+    """The streamed text can no longer become a valid instance of the schema."""
+
+
+def _list_item_models(schema: Type[BaseModel]) -> Dict[str, Type[BaseModel]]:
+    """Map each top-level List[Model] field of the schema to its element model."""
+    item_models = {}
+    for field_name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if typing.get_origin(annotation) in (list, List):
+            args = typing.get_args(annotation)
+            if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+                item_models[field_name] = args[0]
+    return item_models
+
+
+class StreamingJSONParser:
+    """
+    Feed streamed text with feed(); collect closed list items as they arrive.
+
+    Args:
+        schema: The agent's output_schema.
+        max_preamble: How much non-JSON text (e.g. "Here are the results:") is
+            tolerated before the opening brace or a code fence.
+    """
+
+    def __init__(self, schema: Type[BaseModel], max_preamble: int = 200):
+        self.schema = schema
+        self.max_preamble = max_preamble
+        self._item_models = _list_item_models(schema)
+        self._forbid_extra = schema.model_config.get("extra") == "forbid"
+
+        self._text = ""
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        # Each frame: [bracket, start index, expecting_key, current key]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    @property
+    def done(self) -> bool:
+        return self._root_end is not None
+
+    @property
+    def chars(self) -> int:
+        return len(self._text)
+
+    def feed(self, chunk: str) -> List[Tuple[str, BaseModel]]:
+        """Consume a chunk; return (field, item) for every list item it closed."""
+        if not chunk or self.done:
+            return []
+        self._text += chunk
+        if self._root_start is None and not self._find_root():
+            return []
+        return self._scan()
+
+    def _find_root(self) -> bool:
+        """Skip an optional preamble/code fence and locate the opening brace."""
+        brace = self._text.find("{")
+        preamble = (self._text if brace == -1 else self._text[:brace]).strip()
+        # An opening ```json fence is expected noise, not preamble
+        if _FENCE in preamble:
+            preamble = preamble[:preamble.rfind(_FENCE)].strip()
+        if len(preamble) > self.max_preamble:
+            raise StreamParseError(f"No JSON object after {len(preamble)} chars: {preamble[:60]!r}")
+        if brace == -1:
+            return False
+        self._root_start = brace
+        self._pos = brace
+        return True
+
+    def _scan(self) -> List[Tuple[str, BaseModel]]:
+        items: List[Tuple[str, BaseModel]] = []
+        text = self._text
+        pos = self._pos
+        end = len(text)
+        stack = self._stack
+
+        while pos < end:
+            ch = text[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = stack[-1]
+                    if frame[0] == "{" and frame[2]:
+                        try:
+                            frame[3] = json.loads(text[self._string_start:pos + 1])
+                        except ValueError as e:
+                            raise StreamParseError(f"Invalid object key at offset {self._string_start}") from e
+                        if len(stack) == 1:
+                            self._check_top_level_key(frame[3])
+                pos += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch == "{" or ch == "[":
+                if stack and stack[-1][0] == "{" and stack[-1][2]:
+                    raise StreamParseError(f"Expected object key at offset {pos}")
+                stack.append([ch, pos, ch == "{", None])
+            elif ch == "}" or ch == "]":
+                if not stack or stack[-1][0] != ("{" if ch == "}" else "["):
+                    raise StreamParseError(f"Mismatched {ch!r} at offset {pos}")
+                frame = stack.pop()
+                if not stack:
+                    self._root_end = pos
+                    break
+                if ch == "}" and len(stack) == 2 and stack[-1][0] == "[":
+                    item = self._close_item(stack[0][3], frame[1], pos)
+                    if item is not None:
+                        items.append(item)
+            elif ch == ":":
+                if not stack or stack[-1][0] != "{" or not stack[-1][2]:
+                    raise StreamParseError(f"Unexpected ':' at offset {pos}")
+                stack[-1][2] = False
+            elif ch == ",":
+                if stack and stack[-1][0] == "{":
+                    stack[-1][2] = True
+            elif ch not in _BARE_CHARS:
+                raise StreamParseError(f"Unexpected character {ch!r} at offset {pos}")
+            pos += 1
+
+        self._pos = pos
+        return items
+
+    def _check_top_level_key(self, key: str):
+        if self._forbid_extra and key not in self.schema.model_fields:
+            raise StreamParseError(f"Unknown field {key!r} for {self.schema.__name__}")
+
+    def _close_item(self, field: Optional[str], start: int, end: int) -> Optional[Tuple[str, BaseModel]]:
+        model = self._item_models.get(field)
+        if model is None:
+            return None
+        try:
+            return field, model.model_validate(json.loads(self._text[start:end + 1]))
+        except (ValueError, ValidationError) as e:
+            raise StreamParseError(f"Invalid {field} item: {e}") from e
+
+    def result(self) -> BaseModel:
+        """Validate the completed top-level object against the schema."""
+        if not self.done:
+            raise StreamParseError("Stream ended before the JSON object was closed")
+        try:
+            return self.schema.model_validate_json(self._text[self._root_start:self._root_end + 1])
+        except ValidationError as e:
+            raise StreamParseError(str(e)) from e
@@ -0,0 +1,119 @@
+"""
+Search result distiller: what web_search hands the model instead of raw
+search results.
+
+Raw results cost prompt tokens on things the agents never use: the same page
+syndicated on three sites, "Sign in", "Cookie policy" and date prefixes in
+snippets, long bodies around the one price that matters. distill() turns a
+result list into a compact digest:
+
+- near-duplicates are dropped (same URL, or titles and bodies sharing at
+  least TRAVEL_DISTILL_SIMILARITY of their words with a kept result);
+- boilerplate phrases and "Mar 3, 2026 — " style prefixes are stripped;
+- prices, ratings, durations, clock times and stop counts are pulled out
+  with compiled patterns onto one "facts" line per result, so they survive
+  trimming the body to TRAVEL_DISTILL_BODY_CHARS.
+
+Each result keeps its title and URL (agents cite booking and visa links from
+them). TRAVEL_SEARCH_DISTILL=0 goes back to the full results.
+"""
+import os
+import re
+from typing import Any, Dict, List, Set, Tuple
+
+from ...money import PRICE_IN_TEXT
+
+DISTILL_ENABLED = os.getenv("TRAVEL_SEARCH_DISTILL", "1") != "0"
+BODY_CHARS = int(os.getenv("TRAVEL_DISTILL_BODY_CHARS", "200"))
+SIMILARITY = float(os.getenv("TRAVEL_DISTILL_SIMILARITY", "0.7"))
+FACTS_PER_KIND = 3
+
+_BOILERPLATE = re.compile(
+    r"\b(?:sign in|log in|sign up|subscribe(?: now)?|cookie (?:policy|settings)|accept (?:all )?cookies"
+    r"|privacy policy|terms (?:of use|and conditions)|all rights reserved|read more|learn more|click here"
+    r"|book now|skip to (?:main )?content|advertisement)\b[.:!]?",
+    re.IGNORECASE)
+_DATE_PREFIX = re.compile(
+    r"^\s*(?:[A-Z][a-z]{2,8}\.? \d{1,2}, \d{4}|\d{1,2} [A-Z][a-z]{2,8}\.? \d{4}|\d+ (?:minutes?|hours?|days?) ago)"
+    r"\s*[—–·-]+\s*")
+_ELLIPSIS = re.compile(r"\s*(?:\.{3}|…)\s*")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+
+FACT_PATTERNS = {
+    "prices": PRICE_IN_TEXT,
+    "ratings": re.compile(r"\b\d(?:\.\d)?\s?(?:/\s?(?:5|10)\b|out of (?:5|10)\b|stars?\b)"
+                          r"|\brated \d(?:\.\d)?\b", re.IGNORECASE),
+    "durations": re.compile(r"\b\d{1,2}\s?h(?:rs?|ours?)?(?:\s?\d{1,2}\s?m(?:ins?|inutes?)?)?\b"
+                            r"|\b\d{1,3}\s?(?:minutes|mins)\b", re.IGNORECASE),
+    "times": re.compile(r"\b(?:[01]?\d|2[0-3]):[0-5]\d(?:\s?[ap]\.?m\.?)?(?!\w)"
+                        r"|\b(?:1[0-2]|0?[1-9])\s?[ap]\.?m\.?(?!\w)", re.IGNORECASE),
+    "stops": re.compile(r"\bnon-?stop\b|\bdirect flights?\b|\b\d\s?stops?\b", re.IGNORECASE),
+}
+
+
+def clean_text(text: str) -> str:
+    """Snippet text without date prefixes, boilerplate, ellipses and extra whitespace"""
+    text = _DATE_PREFIX.sub("", text or "")
+    text = _BOILERPLATE.sub(" ", text)
+    text = _ELLIPSIS.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip(" -|·—")
+
+
+def extract_facts(text: str) -> Dict[str, List[str]]:
+    """Prices, ratings, durations, times and stops mentioned in `text`, first few of each"""
+    facts = {}
+    for kind, pattern in FACT_PATTERNS.items():
+        found = list(dict.fromkeys(m.group(0).strip() for m in pattern.finditer(text)))
+        if found:
+            facts[kind] = found[:FACTS_PER_KIND]
+    return facts
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _trim(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0]
+    return f"{cut}…"
+
+
+def dedupe(results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Results minus near-duplicates of earlier ones, and how many were dropped"""
+    kept: List[Dict[str, Any]] = []
+    seen_urls: Set[str] = set()
+    kept_words: List[Set[str]] = []
+    for result in results:
+        url = (result.get('href') or result.get('url') or result.get('link') or "").rstrip("/")
+        words = _words(f"{result.get('title') or ''} {result.get('body') or ''}")
+        if url and url in seen_urls:
+            continue
+        if any(words and len(words & other) / len(words | other) >= SIMILARITY for other in kept_words):
+            continue
+        if url:
+            seen_urls.add(url)
+        kept_words.append(words)
+        kept.append(result)
+    return kept, len(results) - len(kept)
+
+
+def distill(results: List[Dict[str, Any]]) -> str:
+    """Compact digest of search results: title and URL, extracted facts, trimmed snippet."""
+    kept, dropped = dedupe(results)
+    lines = []
+    for i, result in enumerate(kept, 1):
+        title = clean_text(result.get('title') or "") or "No Title"
+        url = result.get('href') or result.get('url') or result.get('link') or "No URL"
+        body = clean_text(result.get('body') or "")
+        facts = extract_facts(f"{title} {body}")
+        lines.append(f"[{i}] {title} | {url}")
+        if facts:
+            lines.append("    " + "; ".join(f"{kind}: {', '.join(values)}" for kind, values in facts.items()))
+        if body:
+            lines.append(f"    {_trim(body, BODY_CHARS)}")
+    if dropped:
+        lines.append(f"({dropped} near-duplicate result{'s' if dropped != 1 else ''} omitted)")
+    return "\n".join(lines)
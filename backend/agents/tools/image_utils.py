@@ -7,12 +7,12 @@ OPTIMIZATION: Functions are designed to make minimal API calls.
 Use get_category_image() for batch operations instead of per-item calls.
 """
 
+import time
 from typing import Optional
 
-try:
-    from ddgs import DDGS
-except ImportError:
-    from duckduckgo_search import DDGS
+from ... import recorder
+from ...airports import airport_index
+from .search_providers import search_broker
 
 
 # Simple in-memory cache for the current session
@@ -20,8 +20,8 @@ _image_cache: dict = {}
 
 
 def _get_cache_key(category: str, destination: str) -> str:
-    """Generate a cache key for the image."""
-    return f"{category}:{destination}".lower().strip()
+    """Generate a cache key for the image, so "Tokyo" and "Tokyo (HND)" share one entry."""
+    return f"{category}:{airport_index.canonical_place(destination)}"
 
 
 def _search_images(query: str, max_results: int = 1, size: str = "Medium") -> list[str]:
@@ -38,14 +38,16 @@ def _search_images(query: str, max_results: int = 1, size: str = "Medium") -> li
     """
     results = []
     try:
-        with DDGS() as ddgs:
-            for result in ddgs.images(query, max_results=max_results, size=size):
-                if result.get('image'):
-                    results.append(result['image'])
-                    if len(results) >= max_results:
-                        break
+        started = time.perf_counter()
+        raw_results = search_broker.search("images", query, max_results, size=size)
+        recorder.record_search("images", query, max_results, raw_results, time.perf_counter() - started)
+        for result in raw_results:
+            if result.get('image'):
+                results.append(result['image'])
+                if len(results) >= max_results:
+                    break
     except Exception as e:
-        print(f"[ImageUtils] DuckDuckGo search failed for '{query}': {e}")
+        print(f"[ImageUtils] Image search failed for '{query}': {e}")
     return results
 
 
@@ -0,0 +1,330 @@
+"""
+Search providers and the broker every web and image search goes through.
+
+A SearchProvider answers "text" and/or "images" searches. SearchBroker tries
+them in SEARCH_PROVIDERS order:
+
+- First "index": stored snippets of near-duplicate earlier searches (see
+  snippet_index.py). A cache provider that can't answer raises SearchMiss,
+  and the broker moves on without counting a failure.
+- Each provider has a token-bucket rate limit (rate_per_s, burst). A search
+  waits up to RATE_WAIT_S for a token, else moves on to the next provider
+  rather than pile onto a throttled one.
+- Timeouts and other errors are retried on the same provider with
+  exponential backoff and jitter, up to MAX_ATTEMPTS. A rate-limit error
+  is never retried there: the provider cools down (COOLDOWN_S, doubling
+  while it keeps throttling) and the search moves on at once. So does a
+  provider after FAILURES_BEFORE_COOLDOWN failed searches in a row.
+- An empty result is an answer, not a failure.
+- The last provider is "local": results of earlier successful searches,
+  so a search nobody will answer right now still gets stale results
+  instead of an error. A query it hasn't seen is a miss, not an answer.
+- Every provider sees the results of the one that answered (remember), so
+  the caches fill up from live searches.
+
+Only when every provider has failed does the broker raise
+SearchUnavailable. Latency and outcome of every attempt are kept per
+provider over a sliding window (p50/p95, error rate, cooldown); see
+search_broker.snapshot().
+
+Override the table with TRAVEL_SEARCH_PROVIDERS (JSON, same shape as
+SEARCH_PROVIDERS; its order is the failover order).
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from ...http_pool import search_client
+
+try:
+    from ddgs import DDGS
+    from ddgs.exceptions import RatelimitException
+except ImportError:
+    from duckduckgo_search import DDGS
+    from duckduckgo_search.exceptions import RatelimitException
+
+# "ddgs" is the metasearch across DDGS's engines the app always used; the
+# single-engine providers behind it are only asked when it fails.
+SEARCH_PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "index": {"kinds": ["text"]},
+    "ddgs": {"backend": "auto", "kinds": ["text", "images"], "rate_per_s": 4.0, "burst": 12},
+    "brave": {"backend": "brave", "kinds": ["text"], "rate_per_s": 1.0, "burst": 4},
+    "mojeek": {"backend": "mojeek", "kinds": ["text"], "rate_per_s": 1.0, "burst": 4},
+    "local": {"kinds": ["text", "images"]},
+}
+if os.getenv("TRAVEL_SEARCH_PROVIDERS"):
+    SEARCH_PROVIDERS = json.loads(os.environ["TRAVEL_SEARCH_PROVIDERS"])
+
+MAX_ATTEMPTS = int(os.getenv("TRAVEL_SEARCH_ATTEMPTS", "2"))  # per provider
+BACKOFF_S = 0.25
+MAX_BACKOFF_S = 2.0
+RATE_WAIT_S = float(os.getenv("TRAVEL_SEARCH_RATE_WAIT_S", "1.0"))
+COOLDOWN_S = 30.0
+MAX_COOLDOWN_S = 600.0
+FAILURES_BEFORE_COOLDOWN = 3
+LOCAL_MAX_ENTRIES = int(os.getenv("TRAVEL_SEARCH_LOCAL_ENTRIES", "2000"))
+
+WINDOW_SIZE = 100          # attempts kept per provider
+WINDOW_SECONDS = 15 * 60   # and no older than this
+
+
+class SearchUnavailable(Exception):
+    """Every provider failed, was cooling down or was rate limited."""
+
+
+class SearchMiss(Exception):
+    """A cache provider has nothing good enough for this search (not a failure)."""
+
+
+class SearchProvider(ABC):
+    """Something that answers searches: `kinds` says which ("text", "images")."""
+
+    # Caches answer from what live providers found earlier (and raise SearchMiss)
+    is_cache = False
+
+    def __init__(self, name: str, kinds: Iterable[str] = ("text",)):
+        self.name = name
+        self.kinds = tuple(kinds)
+
+    @abstractmethod
+    def search(self, kind: str, query: str, max_results: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Results as DDGS returns them (title/href/body, or image/...); raises on failure."""
+
+    def remember(self, kind: str, query: str, results: List[Dict[str, Any]]):
+        """Results another provider found for a search; caches keep them."""
+
+
+class DDGSProvider(SearchProvider):
+    """One DDGS backend ("auto" is DDGS's own metasearch), on pooled keep-alive clients."""
+
+    def __init__(self, name: str, backend: str = "auto", kinds: Iterable[str] = ("text",)):
+        super().__init__(name, kinds)
+        self.backend = backend
+
+    def search(self, kind: str, query: str, max_results: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        with search_client(DDGS) as ddgs:
+            method = ddgs.images if kind == "images" else ddgs.text
+            return list(method(query, max_results=max_results, backend=self.backend, **kwargs))
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.findall(r"\w+", query.lower()))
+
+
+class LocalSearchProvider(SearchProvider):
+    """Results of earlier successful searches, by normalized query (LRU, LOCAL_MAX_ENTRIES)."""
+
+    is_cache = True
+
+    def __init__(self, name: str = "local", kinds: Iterable[str] = ("text", "images"),
+                 max_entries: int = LOCAL_MAX_ENTRIES):
+        super().__init__(name, kinds)
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, kind: str, query: str, results: List[Dict[str, Any]]):
+        if not results:
+            return
+        key = (kind, normalize_query(query))
+        with self._lock:
+            self._results[key] = results
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def search(self, kind: str, query: str, max_results: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        key = (kind, normalize_query(query))
+        with self._lock:
+            results = self._results.get(key)
+            if results is not None:
+                self._results.move_to_end(key)
+        if not results:
+            raise SearchMiss("no earlier results")
+        return results[:max_results]
+
+
+class TokenBucket:
+    """rate_per_s tokens a second, up to burst; None means unlimited."""
+
+    def __init__(self, rate_per_s: Optional[float], burst: float = 1):
+        self.rate_per_s = rate_per_s
+        self.burst = max(burst, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait_s: float) -> bool:
+        if not self.rate_per_s:
+            return True
+        deadline = time.monotonic() + max_wait_s
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate_per_s
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ProviderHealth:
+    """Sliding-window latency/outcome of one provider's attempts, plus its cooldown."""
+
+    def __init__(self):
+        self.attempts: Deque[Tuple[float, float, bool]] = deque(maxlen=WINDOW_SIZE)
+        self.consecutive_failures = 0
+        self.cooldown_s = COOLDOWN_S
+        self.cooling_until = 0.0
+        self.rate_limited = 0
+        self.skipped = 0
+        self.misses = 0
+        self.last_error: Optional[str] = None
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooling_until
+
+    def record(self, seconds: float, ok: bool, error: Optional[str] = None):
+        self.attempts.append((time.monotonic(), seconds, ok))
+        if ok:
+            self.consecutive_failures = 0
+            self.cooldown_s = COOLDOWN_S
+        else:
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def cool_down(self):
+        self.cooling_until = time.monotonic() + self.cooldown_s
+        self.cooldown_s = min(self.cooldown_s * 2, MAX_COOLDOWN_S)
+
+    def stats(self) -> Dict[str, Any]:
+        cutoff = time.monotonic() - WINDOW_SECONDS
+        while self.attempts and self.attempts[0][0] < cutoff:
+            self.attempts.popleft()
+        latencies = [seconds for _, seconds, ok in self.attempts if ok]
+        return {
+            "attempts": len(self.attempts),
+            "error_rate": round(1 - len(latencies) / len(self.attempts), 3) if self.attempts else None,
+            "p50_s": round(_percentile(latencies, 50), 3) if latencies else None,
+            "p95_s": round(_percentile(latencies, 95), 3) if latencies else None,
+            "consecutive_failures": self.consecutive_failures,
+            "cooling_down_s": round(max(0.0, self.cooling_until - time.monotonic()), 1),
+            "rate_limited": self.rate_limited,
+            "skipped": self.skipped,
+            "misses": self.misses,
+            "last_error": self.last_error,
+        }
+
+
+class SearchBroker:
+    """Rate limits, retries and fails over across providers; tracks their health."""
+
+    def __init__(self, providers: List[SearchProvider], limits: Optional[Dict[str, TokenBucket]] = None,
+                 seed: Optional[int] = None):
+        self.providers = providers
+        self.limits = limits or {}
+        self.health = {provider.name: ProviderHealth() for provider in providers}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Dict[str, Any]]) -> "SearchBroker":
+        providers, limits = [], {}
+        for name, settings in config.items():
+            kinds = settings.get("kinds", ["text"])
+            if name == "index":
+                # Imported here: snippet_index builds on this module
+                from .snippet_index import SnippetIndexProvider
+                providers.append(SnippetIndexProvider(name, kinds))
+            elif name == "local":
+                providers.append(LocalSearchProvider(name, kinds))
+            else:
+                providers.append(DDGSProvider(name, settings.get("backend", name), kinds))
+            limits[name] = TokenBucket(settings.get("rate_per_s"), settings.get("burst", 1))
+        return cls(providers, limits)
+
+    def _backoff(self, attempt: int) -> float:
+        return min(MAX_BACKOFF_S, BACKOFF_S * 2 ** attempt) * (0.5 + self._rng.random())
+
+    def search(self, kind: str, query: str, max_results: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        """Results from the first provider that answers; SearchUnavailable if none does."""
+        errors = []
+        for provider in self.providers:
+            if kind not in provider.kinds:
+                continue
+            health = self.health[provider.name]
+            if health.cooling_down():
+                with self._lock:
+                    health.skipped += 1
+                errors.append(f"{provider.name}: cooling down")
+                continue
+            limit = self.limits.get(provider.name)
+            if limit and not limit.acquire(RATE_WAIT_S):
+                with self._lock:
+                    health.skipped += 1
+                errors.append(f"{provider.name}: over its rate limit")
+                continue
+
+            for attempt in range(MAX_ATTEMPTS):
+                started = time.perf_counter()
+                try:
+                    results = provider.search(kind, query, max_results, **kwargs)
+                except SearchMiss as e:
+                    with self._lock:
+                        health.misses += 1
+                    errors.append(f"{provider.name}: {e}")
+                    break
+                except RatelimitException as e:
+                    with self._lock:
+                        health.record(time.perf_counter() - started, False, f"rate limited: {e}")
+                        health.rate_limited += 1
+                        health.cool_down()
+                    errors.append(f"{provider.name}: rate limited")
+                    print(f"[SearchBroker] {provider.name} is rate limiting, cooling down")
+                    break
+                except Exception as e:
+                    with self._lock:
+                        health.record(time.perf_counter() - started, False, str(e))
+                        if health.consecutive_failures >= FAILURES_BEFORE_COOLDOWN:
+                            health.cool_down()
+                    errors.append(f"{provider.name}: {e}")
+                    if health.cooling_down() or attempt + 1 >= MAX_ATTEMPTS:
+                        break
+                    time.sleep(self._backoff(attempt))
+                    continue
+
+                with self._lock:
+                    health.record(time.perf_counter() - started, True)
+                if not provider.is_cache:
+                    for other in self.providers:
+                        if other is not provider:
+                            other.remember(kind, query, results)
+                else:
+                    print(f"[SearchBroker] Served '{query}' from {provider.name}")
+                return results
+
+        raise SearchUnavailable("; ".join(errors) or f"no provider for {kind} searches")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Current stats per provider, for logging and ops endpoints."""
+        with self._lock:
+            return {provider.name: {"kinds": list(provider.kinds), **self.health[provider.name].stats()}
+                    for provider in self.providers}
+
+
+search_broker = SearchBroker.from_config(SEARCH_PROVIDERS)
@@ -1,29 +1,42 @@
-try:
-    from ddgs import DDGS
-except ImportError:
-    from duckduckgo_search import DDGS
+import time
 from typing import List, Dict
 
+from ... import recorder
+from .distiller import DISTILL_ENABLED, distill
+from .search_providers import SearchUnavailable, search_broker
+
+# Prefix of web_search's answer when no provider could search
+SEARCH_ERROR = "Error during search"
+
 
 def web_search(query: str, max_results: int = 5) -> str:
     """
-    Performs a web search using DuckDuckGo and returns a formatted string of results.
+    Performs a web search (DuckDuckGo, failing over to other providers) and
+    returns a formatted string of results.
 
     Args:
         query: The search query string.
         max_results: Maximum number of results to return.
 
     Returns:
-        A string containing the search results (titles, URLs, snippets).
+        A string containing the search results (titles, URLs, snippets), as a
+        compact digest unless TRAVEL_SEARCH_DISTILL=0 (see distiller).
     """
     print(f"[SearchTool] Searching for: {query}")
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
+        started = time.perf_counter()
+        results = search_broker.search("text", query, max_results)
+        recorder.record_search("text", query, max_results, results, time.perf_counter() - started)
 
         if not results:
             return "No search results found."
 
+        if DISTILL_ENABLED:
+            digest = distill(results)
+            raw_chars = sum(len(r.get('title') or "") + len(r.get('body') or "") for r in results)
+            print(f"[SearchTool] Distilled {len(results)} results: {raw_chars} -> {len(digest)} chars")
+            return digest
+
         formatted_results = []
         for i, res in enumerate(results, 1):
             title = res.get('title', 'No Title')
@@ -34,8 +47,10 @@ def web_search(query: str, max_results: int = 5) -> str:
             )
 
         return "\n\n".join(formatted_results)
+    except SearchUnavailable as e:
+        return f"{SEARCH_ERROR}: no search provider is available ({e})"
     except Exception as e:
-        return f"Error during search: {str(e)}"
+        return f"{SEARCH_ERROR}: {str(e)}"
 
 
 def image_search(query: str, max_results: int = 3) -> List[str]:
@@ -51,8 +66,9 @@ def image_search(query: str, max_results: int = 3) -> List[str]:
     """
     print(f"[SearchTool] Searching images for: {query}")
     try:
-        with DDGS() as ddgs:
-            results = list(ddgs.images(query, max_results=max_results))
+        started = time.perf_counter()
+        results = search_broker.search("images", query, max_results)
+        recorder.record_search("images", query, max_results, results, time.perf_counter() - started)
 
         if not results:
             return []
@@ -0,0 +1,120 @@
+"""
+Local snippet index: answers web searches that are near-duplicates of
+earlier ones.
+
+Agents rarely send the same query twice ("roundtrip flights NYC to Paris
+March 2026" vs "... Spring 2026"), but the pages behind them are largely the
+same. Every web search result is stored in the search_snippets table (one
+row per page, the latest copy wins) with the query that found it, the
+plan's destination and origin and its fetch time, under an FTS5 index.
+
+SnippetIndexProvider is the first provider the search broker asks. It looks
+up the query's terms (BM25 over title, body and the original query) among
+snippets of the same destination fetched in the last TRAVEL_SNIPPET_MAX_AGE_H
+hours. Searches that name the plan's origin (flights from it, visas for its
+citizens) only match snippets stored for that same origin: a London to Paris
+flight search must not be answered with New York to Paris fares. Searches
+outside a plan (no destination set) are never answered from the index. A
+snippet counts as relevant when its text and original query
+together cover TRAVEL_SNIPPET_MIN_COVERAGE of the query's terms. With at
+least TRAVEL_SNIPPET_MIN_HITS relevant snippets (fewer if fewer results were
+asked for), the search is answered from them and DDGS is never called;
+otherwise it is a miss and the broker moves on. Snippets older than
+TRAVEL_SNIPPET_KEEP_DAYS are pruned as new ones come in.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+from ... import database as db
+from ...airports import airport_index
+from .search_providers import SearchMiss, SearchProvider
+
+MAX_AGE_S = float(os.getenv("TRAVEL_SNIPPET_MAX_AGE_H", "24")) * 3600
+KEEP_S = float(os.getenv("TRAVEL_SNIPPET_KEEP_DAYS", "7")) * 24 * 3600
+MIN_HITS = int(os.getenv("TRAVEL_SNIPPET_MIN_HITS", "3"))
+MIN_COVERAGE = float(os.getenv("TRAVEL_SNIPPET_MIN_COVERAGE", "0.6"))
+CANDIDATES = 50
+PRUNE_EVERY = 500  # stored searches between prunes
+
+STOPWORDS = {"a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+
+
+class SearchScope(NamedTuple):
+    destination: Optional[str]  # canonical place keys
+    origin: Optional[str]
+    origin_terms: FrozenSet[str]  # query terms that name the origin
+
+
+# Plan the current task is searching for (see set_search_scope)
+_scope: ContextVar[SearchScope] = ContextVar("search_scope", default=SearchScope(None, None, frozenset()))
+
+
+def query_terms(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, in order, once each"""
+    return list(dict.fromkeys(t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS))
+
+
+def set_search_scope(destination: Optional[str], origin: Optional[str] = None):
+    """Tag this task's searches (and the threads it starts) with a plan's destination and origin."""
+    _scope.set(SearchScope(
+        airport_index.canonical_place(destination) if destination else None,
+        airport_index.canonical_place(origin) if origin else None,
+        frozenset(query_terms(origin)) if origin else frozenset()))
+
+
+class SnippetIndexProvider(SearchProvider):
+    """Answers text searches from stored snippets of near-duplicate queries."""
+
+    is_cache = True
+
+    def __init__(self, name: str = "index", kinds=("text",)):
+        super().__init__(name, kinds)
+        self._stored = 0
+        self._lock = threading.Lock()
+
+    def remember(self, kind: str, query: str, results: List[Dict[str, Any]]):
+        snippets = [{"href": r.get('href') or r.get('url') or r.get('link'),
+                     "title": r.get('title') or "", "body": r.get('body') or ""} for r in results]
+        snippets = [s for s in snippets if s['href'] and s['body']]
+        if kind not in self.kinds or not snippets:
+            return
+        now = time.time()
+        scope = _scope.get()
+        try:
+            db.upsert_search_snippets(snippets, scope.destination, query, now, scope.origin)
+            with self._lock:
+                self._stored += 1
+                prune = self._stored % PRUNE_EVERY == 0
+            if prune:
+                db.delete_search_snippets_before(now - KEEP_S)
+        except sqlite3.OperationalError as e:
+            print(f"[SnippetIndex] Couldn't store snippets: {e}")
+
+    def search(self, kind: str, query: str, max_results: int, **kwargs: Any) -> List[Dict[str, Any]]:
+        scope = _scope.get()
+        if scope.destination is None:
+            raise SearchMiss("no plan destination to scope the search to")
+        terms = query_terms(query)
+        if not terms:
+            raise SearchMiss("no searchable terms")
+        # Naming the origin makes the answer depend on it: only that origin's snippets will do
+        origin = scope.origin if scope.origin_terms & set(terms) else None
+        match = " OR ".join(f'"{term}"' for term in terms)
+        try:
+            rows = db.match_search_snippets(match, scope.destination, time.time() - MAX_AGE_S, CANDIDATES, origin)
+        except sqlite3.OperationalError as e:
+            raise SearchMiss(f"index unavailable: {e}")
+
+        relevant = []
+        for row in rows:
+            covered = set(query_terms(f"{row['title']} {row['body']} {row['query'] or ''}"))
+            if sum(term in covered for term in terms) / len(terms) >= MIN_COVERAGE:
+                relevant.append({"title": row['title'], "href": row['href'], "body": row['body']})
+        if len(relevant) < min(max_results, MIN_HITS):
+            raise SearchMiss(f"{len(relevant)} fresh relevant snippets")
+        return relevant[:max_results]
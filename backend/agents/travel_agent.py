@@ -1,37 +1,73 @@
 """
 TravelAgent - Root orchestrator that manages sub-agents for trip planning.
-Uses Google ADK's SequentialAgent + ParallelAgent for proper orchestration.
+Runs each sub-agent as its own ADK run so every section gets a deadline,
+mirroring the SequentialAgent(ParallelAgent(...), itinerary) structure.
 """
+import asyncio
+import time
 import uuid
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from datetime import datetime
 from urllib.parse import quote
 import google.adk
 from google.adk.agents import ParallelAgent, SequentialAgent
 
+from . import base_agent
 from .base_agent import Agent
 from .flight_agent import FlightAgent
 from .hotel_agent import HotelAgent
 from .visa_agent import VisaAgent
 from .activity_agent import ActivityAgent
 from .itinerary_agent import ItineraryAgent
+from .fast_plan_agent import FastPlanAgent
+from .deadlines import PlanDeadline, latency_tracker, run_hedged
+from .progress import PlanProgress, section_finished, section_started, track_plan
+from ..visa_matrix import country_code, visa_matrix
+from ..memory_index import memory_index_for
+from .tools.search_tool import SEARCH_ERROR, web_search
+from .tools.snippet_index import set_search_scope
 from .tools.image_utils import get_destination_images, get_hotel_image, clear_image_cache
 
+# Schema list fields -> frontend progress step for streamed items
+SECTION_STEPS = {
+    "outbound_flights": "flights",
+    "return_flights": "flights",
+    "hotels": "hotels",
+    "activities": "activities",
+    "days": "itinerary",
+}
+
+SECTION_LABELS = {
+    "flights": "Flight search",
+    "hotels": "Hotel search",
+    "visa": "Visa lookup",
+    "activities": "Activity search",
+    "itinerary": "Itinerary planning",
+}
+
 
 class TravelAgent(Agent):
     """
     Root orchestrator agent that coordinates all sub-agents for trip planning.
 
-    Uses Google ADK's orchestration pattern:
-    - SequentialAgent as root
-    - ParallelAgent gathers data from all sub-agents concurrently
-    - Sub-agents write to session state via output_key
+    Orchestration pattern:
+    - Flight, hotel, visa and activity agents run concurrently (like a ParallelAgent)
+    - The itinerary agent runs after them (like a SequentialAgent)
+    - Each section runs under its share of the plan deadline, hedged past its p95
     """
 
     def __init__(self, name: str = "TravelAgent", model_client: Any = None,
-                 model_id: str = "openai/gpt-4o-mini"):
+                 model_id: str = "openai/gpt-4o-mini", max_concurrent_sections: Optional[int] = None,
+                 prefetch_search: Optional[bool] = None):
         super().__init__(name, model_client, model_id)
 
+        # Run the sub-agents' searches up front (defaults to TRAVEL_SEARCH_PREFETCH)
+        self.prefetch_search = base_agent.SEARCH_PREFETCH if prefetch_search is None else prefetch_search
+
+        # Optional cap on sections running at once across every plan this agent runs
+        # (used when comparing destinations)
+        self._section_slots = asyncio.Semaphore(max_concurrent_sections) if max_concurrent_sections else None
+
         # Initialize sub-agents (they provide ADK agent definitions)
         self.flight_agent = FlightAgent("FlightAgent", model_client, model_id)
         self.hotel_agent = HotelAgent("HotelAgent", model_client, model_id)
@@ -40,6 +76,7 @@ class TravelAgent(Agent):
             "ActivityAgent", model_client, model_id)
         self.itinerary_agent = ItineraryAgent(
             "ItineraryAgent", model_client, model_id)
+        self.fast_plan_agent = FastPlanAgent("FastPlanAgent", model_client, model_id)
 
     def set_client_id(self, client_id: str):
         """Override to pass client_id to all sub-agents"""
@@ -49,12 +86,37 @@ class TravelAgent(Agent):
         self.visa_agent.set_client_id(client_id)
         self.activity_agent.set_client_id(client_id)
         self.itinerary_agent.set_client_id(client_id)
-
-    def _get_memory_context(self) -> Dict[str, Any]:
-        """Convert memories to context for personalization"""
-        # TODO: Implement memory-based personalization in the future
-        # This will convert user memories into context for agent personalization
-        return {}
+        self.fast_plan_agent.set_client_id(client_id)
+
+    def set_user_id(self, user_id: str):
+        """Override to pass user_id to all sub-agents"""
+        super().set_user_id(user_id)
+        self.flight_agent.set_user_id(user_id)
+        self.hotel_agent.set_user_id(user_id)
+        self.visa_agent.set_user_id(user_id)
+        self.activity_agent.set_user_id(user_id)
+        self.itinerary_agent.set_user_id(user_id)
+        self.fast_plan_agent.set_user_id(user_id)
+
+    def _get_memory_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """The user's memories most relevant to this trip, as context for personalization"""
+        try:
+            user_memories = memory_index_for(self.user_id).context_for(context)
+        except Exception as e:
+            print(f"[{self.name}] Memory retrieval failed: {e}")
+            return {}
+        return {"user_memories": user_memories} if user_memories else {}
+
+    async def _report_streamed_item(self, agent_name: str, field: str, item: Any):
+        """Forward each flight/hotel/activity/day to the client as soon as it is parsed"""
+        label = getattr(item, 'name', None) or getattr(item, 'airline', None)
+        if label is None and hasattr(item, 'day'):
+            label = f"Day {item.day} of your itinerary"
+        await self.report_status(
+            f"Found {label or field}",
+            step=SECTION_STEPS.get(field, field),
+            data={"section": field, "item": item.model_dump()}
+        )
 
     def _generate_hotel_booking_url(self, hotel_name: str, destination: str, dates: str = None) -> str:
         """Generate a Google Hotels search URL"""
@@ -78,22 +140,22 @@ class TravelAgent(Agent):
         search_query = " ".join(query_parts)
         return f"{base_url}?q={quote(search_query)}"
 
-    async def _post_process_results(self, context: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+    async def _post_process_results(self, context: Dict[str, Any], sections: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Post-process results from session state.
+        Post-process the structured outputs of each section.
         Adds booking URLs, images, and cleans up data.
         """
         destination = context.get('destination', '')
         origin = context.get('origin', '')
         dates = context.get('dates', '')
 
-        # Get raw results from ADK session state (agents wrote via output_key)
-        # Note: ADK stores FlightList under "flights" key, which contains outbound_flights and return_flights
-        flights_data = await self.get_session_state(session_id, "flights", {})
-        hotels = await self.get_session_state(session_id, "hotels", [])
-        visa = await self.get_session_state(session_id, "visa", {})
-        activities = await self.get_session_state(session_id, "activities", [])
-        itinerary = await self.get_session_state(session_id, "itinerary", [])
+        # Raw section outputs, keyed like the agents' output_key
+        # Note: FlightList holds both outbound_flights and return_flights
+        flights_data = sections.get("flights") or {}
+        hotels = sections.get("hotels") or []
+        visa = sections.get("visa") or {}
+        activities = sections.get("activities") or []
+        itinerary = sections.get("itinerary") or []
 
         # Extract outbound and return flights from the flights data
         outbound_flights = []
@@ -151,7 +213,8 @@ class TravelAgent(Agent):
                 hotel_name = hotel.get('name', 'hotel')
                 hotel['booking_url'] = self._generate_hotel_booking_url(
                     hotel_name, destination, dates)
-                hotel['image_url'] = get_hotel_image(hotel_name, destination)
+                # Image lookups go through the search broker, which sleeps on rate limits and backoff
+                hotel['image_url'] = await asyncio.to_thread(get_hotel_image, hotel_name, destination)
                 hotel.pop('style', None)
 
         # Post-process activities
@@ -186,6 +249,9 @@ class TravelAgent(Agent):
             - HotelSearchAgent (output_key: hotels)
             - VisaInfoAgent (output_key: visa)
             - ActivitySearchAgent (output_key: activities)
+
+        perform_task runs the same sub-agents section by section instead, so
+        each can get its own deadline; this tree is the all-in-one equivalent.
         """
         # Create ADK agents from each sub-agent
         flight_adk = self.flight_agent.create_adk_agent(context)
@@ -213,49 +279,253 @@ class TravelAgent(Agent):
 
         return root_agent
 
-    async def perform_task(self, query: str, context: Dict[str, Any] = {}) -> Dict[str, Any]:
+    async def _run_section(self, section: str, sub_agent: Agent, query: str, context: Dict[str, Any],
+                           session_id: str, deadline: PlanDeadline) -> Tuple[str, Optional[Any]]:
         """
-        Execute the complete trip planning flow using ADK's orchestration.
+        Run one sub-agent within its share of the plan deadline, hedging past its p95.
 
-        1. Initialize shared session with context
-        2. Create the ADK agent hierarchy (Sequential -> Parallel -> sub-agents)
-        3. Run through ADK Runner (handles all orchestration internally)
-        4. Post-process results (add URLs, images)
-        5. Return the complete trip plan
+        Returns (status, result) where status is "ok", "pending" (deadline hit)
+        or "degraded" (the agent failed or produced unusable output).
+        """
+        if self._section_slots is not None:
+            async with self._section_slots:
+                return await self._run_section_now(section, sub_agent, query, context, session_id, deadline)
+        return await self._run_section_now(section, sub_agent, query, context, session_id, deadline)
+
+    async def _run_section_now(self, section: str, sub_agent: Agent, query: str, context: Dict[str, Any],
+                               session_id: str, deadline: PlanDeadline) -> Tuple[str, Any]:
+        """_run_section once a section slot is held."""
+        budget = deadline.budget_for(section)
+        if budget <= 0:
+            return "pending", None
+
+        # Only the first attempt to stream items forwards them, so a hedge doesn't repeat them
+        streaming_attempt: Dict[str, int] = {}
+
+        def attempt(n: int):
+            async def on_item(agent_name: str, field: str, item: Any):
+                if streaming_attempt.setdefault(section, n) == n:
+                    await self._report_streamed_item(agent_name, field, item)
+
+            adk_agent = sub_agent.create_adk_agent(context)
+            return self.run_adk_agent(adk_agent, query, f"{session_id}-{section}-{n}", context, on_item=on_item)
+
+        started = time.monotonic()
+        region = country_code(context.get('destination'))
+        section_started(section)
+        timed_out = False
+        try:
+            result = await run_hedged(attempt, budget, latency_tracker.hedge_after(section))
+        except asyncio.TimeoutError:
+            timed_out, result = True, None
+        except Exception as e:
+            print(f"[{self.name}] {section} failed: {e}")
+            return "degraded", None
+        finally:
+            section_finished(section)
+
+        if timed_out:
+            # Counted at its budget, so slow sections push their p95 (and hedge delay) up
+            latency_tracker.record(section, budget, region)
+            print(f"[{self.name}] {section} missed its {budget:.1f}s budget")
+            await self.report_status(f"{SECTION_LABELS.get(section, 'Trip planning')} is taking too long - continuing without it",
+                                     step=section)
+            return "pending", None
+        if not result:
+            return "degraded", None
+        latency_tracker.record(section, time.monotonic() - started, region)
+        return "ok", result
+
+    async def _prefetch_searches(self, agents: Dict[str, Agent], context: Dict[str, Any],
+                                 deadline: PlanDeadline) -> Dict[str, str]:
         """
+        Run every section's web search concurrently, ahead of its agent.
+        Each search gets half its section's budget; sections whose search fails
+        or times out are left out and their agent calls the tool itself.
+        """
+        async def fetch(section: str, agent: Agent) -> Optional[str]:
+            try:
+                results = await asyncio.wait_for(asyncio.to_thread(web_search, agent.search_query(context)),
+                                                 deadline.budget_for(section) / 2)
+            except asyncio.TimeoutError:
+                print(f"[{self.name}] {section} search prefetch timed out")
+                return None
+            return None if results.startswith(SEARCH_ERROR) else results
+
+        started = time.monotonic()
+        section_started("search")
+        fetched = await asyncio.gather(*(fetch(section, agent) for section, agent in agents.items()))
+        latency_tracker.record("search", time.monotonic() - started, country_code(context.get('destination')))
+        section_finished("search")
+        return {section: results for section, results in zip(agents, fetched) if results is not None}
+
+    async def perform_task(self, query: str, context: Dict[str, Any] = {},
+                           sections: Optional[Iterable[str]] = None,
+                           known_sections: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Execute the complete trip planning flow under a request-level deadline.
+
+        1. Run flight, hotel, visa and activity agents concurrently, each
+           within its share of the deadline (hedged past its historical p95);
+           the visa agent is skipped when the visa matrix has a fresh answer.
+           With search prefetch on, their web searches run first and the
+           results go into the agents' instructions
+        2. Plan the itinerary from what was gathered, with the time left
+        3. Post-process results (add URLs, images)
+        4. Return the trip plan; sections that missed the deadline are marked
+           "pending" and failed ones "degraded" in section_status
+
+        `sections` limits the run to some of "flights", "hotels", "visa",
+        "activities" and "itinerary"; the others come back empty and are left
+        out of section_status. `known_sections` holds results from an earlier
+        plan for sections that aren't re-run; the itinerary is planned from
+        them alongside the fresh ones.
+        """
+        wanted = set(sections) if sections is not None else set(SECTION_LABELS)
         print(f"[{self.name}] Starting trip planning for: {query}")
+        # Stored search snippets are tagged with (and looked up by) the destination and origin
+        set_search_scope(context.get('destination'), context.get('origin'))
 
         # Clear image cache for new trip search
         clear_image_cache()
 
         # Generate unique session ID for this planning request
         session_id = str(uuid.uuid4())
+        deadline = PlanDeadline(context.get('deadline_seconds'))
 
         # Add memory context to the planning context
-        memory_context = self._get_memory_context()
+        memory_context = self._get_memory_context(context)
         full_context = {**context, **memory_context}
 
-        # Create the ADK agent hierarchy
-        print(
-            f"[{self.name}] Creating ADK orchestration (Sequential -> Parallel -> sub-agents)...")
-        adk_agent = self.create_adk_agent(full_context)
-
-        # Run through ADK Runner - this handles all orchestration internally
-        # Session is created automatically in run_adk_agent
-        print(f"[{self.name}] Running ADK orchestration...")
+        gather_agents = {
+            "flights": self.flight_agent,
+            "hotels": self.hotel_agent,
+            "visa": self.visa_agent,
+            "activities": self.activity_agent,
+        }
+        gather_agents = {section: agent for section, agent in gather_agents.items() if section in wanted}
+        # Visa rules rarely change: skip the visa agent when the matrix has a fresh answer
+        cached_visa = "visa" in wanted and visa_matrix.lookup(context.get('origin'), context.get('destination'))
+        if cached_visa:
+            del gather_agents["visa"]
+        # Status messages carry elapsed time, pending sections and an ETA from here on
+        progress = track_plan(PlanProgress(
+            [["search"] if self.prefetch_search and gather_agents else [], list(gather_agents),
+             ["itinerary"] if "itinerary" in wanted else [], ["post_process"]],
+            region=country_code(context.get('destination')), deadline=deadline))
+
+        print(f"[{self.name}] Gathering sections in parallel ({deadline.seconds:.0f}s deadline)...")
         await self.report_status(f"Searching for flights, hotels, and activities in {context.get('destination')}...", step="start")
-        await self.run_adk_agent(adk_agent, query, session_id, full_context)
-
-        # Post-process results from session state
+        if cached_visa:
+            await self.report_status("Retrieved visa requirements", step="visa")
+        # Searches run up front so each agent answers in a single model turn
+        prefetched = await self._prefetch_searches(gather_agents, full_context, deadline) \
+            if self.prefetch_search else {}
+        outcomes = await asyncio.gather(*(
+            self._run_section(section, sub_agent, query,
+                              {**full_context, "search_results": prefetched[section]}
+                              if section in prefetched else full_context,
+                              session_id, deadline)
+            for section, sub_agent in gather_agents.items()
+        ))
+        section_status = {section: status for section, (status, _) in zip(gather_agents, outcomes)}
+        sections = {section: result for section, (_, result) in zip(gather_agents, outcomes)}
+        if cached_visa:
+            section_status["visa"], sections["visa"] = "ok", cached_visa
+        elif section_status.get("visa") == "ok" and hasattr(sections["visa"], 'model_dump'):
+            visa_matrix.store(context.get('origin'), context.get('destination'), sections["visa"].model_dump())
+
+        # Itinerary runs after data gathering, using whatever was found
+        if "itinerary" in wanted:
+            gathered = {**(known_sections or {}), **{section: result for section, result in sections.items() if result}}
+            gathered_info = {section: result.model_dump() if hasattr(result, 'model_dump') else result
+                             for section, result in gathered.items() if result}
+            itinerary_context = {**full_context, "gathered_info": gathered_info}
+            section_status["itinerary"], sections["itinerary"] = await self._run_section(
+                "itinerary", self.itinerary_agent, query, itinerary_context, session_id, deadline)
+
+        # Post-process results
         print(f"[{self.name}] Post-processing results...")
+        finalize_started = time.monotonic()
+        section_started("post_process")
         await self.report_status("Finalizing your personalized trip plan...", step="post_process")
-        results = await self._post_process_results(full_context, session_id)
+        results = await self._post_process_results(full_context, sections)
+        results["section_status"] = section_status
 
-        print(f"[{self.name}] Results - Outbound Flights: {len(results['outbound_flights'])}, Return Flights: {len(results['return_flights'])}, Hotels: {len(results['hotels'])}, Activities: {len(results['activities'])}")
+        print(f"[{self.name}] Results - Outbound Flights: {len(results['outbound_flights'])}, Return Flights: {len(results['return_flights'])}, Hotels: {len(results['hotels'])}, Activities: {len(results['activities'])}, Sections: {section_status}")
 
         # Add destination images
-        results["destination_images"] = get_destination_images(
-            context.get('destination', 'travel'), count=3
+        results["destination_images"] = await asyncio.to_thread(
+            get_destination_images, context.get('destination', 'travel'), count=3
         )
 
+        latency_tracker.record("post_process", time.monotonic() - finalize_started, progress.region)
+        section_finished("post_process")
+        await asyncio.to_thread(latency_tracker.flush)
+        return results
+
+    async def perform_fast_plan(self, query: str, context: Dict[str, Any] = {}) -> Dict[str, Any]:
+        """
+        Plan the trip with a single structured completion (the "fast" engine).
+
+        1. Run the flight, hotel, visa and activity searches concurrently
+           (the visa search is skipped when the visa matrix has a fresh answer)
+        2. One FastPlanAgent call turns all results into flights, hotels,
+           visa, activities and the itinerary, under the whole plan deadline
+        3. Post-process like perform_task; every section shares the call's status
+
+        Returns the same shape as perform_task.
+        """
+        print(f"[{self.name}] Starting fast trip planning for: {query}")
+        set_search_scope(context.get('destination'), context.get('origin'))
+        clear_image_cache()
+
+        session_id = str(uuid.uuid4())
+        deadline = PlanDeadline(context.get('deadline_seconds'))
+        full_context = {**context, **self._get_memory_context(context)}
+        progress = track_plan(PlanProgress([["search"], ["plan"], ["post_process"]],
+                                           region=country_code(context.get('destination')), deadline=deadline))
+
+        await self.report_status(f"Searching for flights, hotels, and activities in {context.get('destination')}...", step="start")
+        search_agents = {
+            "flights": self.flight_agent,
+            "hotels": self.hotel_agent,
+            "visa": self.visa_agent,
+            "activities": self.activity_agent,
+        }
+        cached_visa = visa_matrix.lookup(context.get('origin'), context.get('destination'))
+        if cached_visa:
+            del search_agents["visa"]
+        search_results = await self._prefetch_searches(search_agents, full_context, deadline)
+
+        plan_context = {**full_context, "search_results": search_results, "known_visa": cached_visa or None}
+        status, plan = await self._run_section("plan", self.fast_plan_agent, query, plan_context, session_id, deadline)
+        plan = plan.model_dump() if hasattr(plan, 'model_dump') else (plan or {})
+
+        section_status = {section: status for section in SECTION_LABELS}
+        sections = {
+            "flights": {"outbound_flights": plan.get("outbound_flights", []),
+                        "return_flights": plan.get("return_flights", [])},
+            "hotels": {"hotels": plan.get("hotels", [])},
+            "visa": plan.get("visa"),
+            "activities": {"activities": plan.get("activities", [])},
+            "itinerary": {"days": plan.get("days", [])},
+        }
+        if cached_visa:
+            section_status["visa"], sections["visa"] = "ok", cached_visa
+        elif status == "ok" and plan.get("visa"):
+            visa_matrix.store(context.get('origin'), context.get('destination'), plan["visa"])
+
+        print(f"[{self.name}] Post-processing results...")
+        finalize_started = time.monotonic()
+        section_started("post_process")
+        await self.report_status("Finalizing your personalized trip plan...", step="post_process")
+        results = await self._post_process_results(full_context, sections)
+        results["section_status"] = section_status
+        results["destination_images"] = await asyncio.to_thread(
+            get_destination_images, context.get('destination', 'travel'), count=3
+        )
+        latency_tracker.record("post_process", time.monotonic() - finalize_started, progress.region)
+        section_finished("post_process")
+        await asyncio.to_thread(latency_tracker.flush)
         return results
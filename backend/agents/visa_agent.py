@@ -3,7 +3,6 @@ from .base_agent import Agent
 from datetime import datetime
 import google.adk
 from pydantic import BaseModel
-from .tools.search_tool import web_search
 
 
 class VisaInfo(BaseModel):
@@ -18,6 +17,11 @@ class VisaInfo(BaseModel):
 class VisaAgent(Agent):
     """Agent responsible for checking visa requirements."""
 
+    def search_query(self, context: Dict[str, Any]) -> str:
+        origin = context.get('origin', 'Unknown')
+        destination = context.get('destination', 'Unknown')
+        return f"{origin} citizens visa requirements {destination} official visa application site {datetime.now().year}"
+
     def create_adk_agent(self, context: Dict[str, Any]) -> google.adk.Agent:
         """Create the ADK agent for visa information lookup."""
         origin = context.get('origin', 'Unknown')
@@ -26,14 +30,12 @@ class VisaAgent(Agent):
 
         return google.adk.Agent(
             name="VisaInfoAgent",
-            model=self.model,
+            model=self.routed_model("VisaInfoAgent"),
             instruction=f"""You are a visa expert. Today's date is {current_date}.
 
 TASK: Provide accurate visa requirements for traveling from {origin} to {destination}.
 
-TOOL USAGE:
-- Make exactly 1 search call with query: "{origin} citizens visa requirements {destination} official visa application site {current_date[:4]}"
-- DO NOT search more than once.
+{self.search_instructions(context)}
 
 AFTER SEARCHING, you MUST respond with ONLY a JSON object (no explanation, no markdown):
 {{
@@ -54,7 +56,7 @@ IMPORTANT:
 - Never use generic sources (search engines, Wikipedia, travel blogs, visa brokers)
 - If no official URL is found, set "application_url" to null
 - If origin is unknown, assume tourist visa requirements""",
-            tools=[web_search],
+            tools=self.search_tools(context),
             output_schema=VisaInfo,
             output_key="visa"
         )
@@ -0,0 +1,173 @@
+"""
+In-memory airport/city index.
+
+backend/data/airports.csv (IATA code, airport name, city, ISO country) is
+loaded once into:
+- a prefix trie over IATA codes, city names, airport names and their words,
+  answering as-you-type queries in time proportional to the query length
+- a trigram index, used as a fallback for typos ("Tokio", "Barcelna")
+
+The same index canonicalizes free-text origins/destinations ("London (LHR)",
+"lhr", "london") so caches keyed on places agree on one spelling.
+"""
+import csv
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+_AIRPORTS_PATH = os.path.join(os.path.dirname(__file__), "data", "airports.csv")
+
+# Postings kept per trie node; short prefixes ("s") only need the top few
+MAX_IDS_PER_NODE = 64
+MIN_TRIGRAM_SCORE = 0.5
+_IATA_IN_LABEL = re.compile(r"\(([A-Za-z]{3})\)\s*$")
+_STOP_WORDS = {"airport", "international", "intl", "the", "of", "de", "del", "la"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Airport:
+    iata: str
+    name: str
+    city: str
+    country: str
+    primary: bool  # first-listed (main) airport of its city
+
+    @property
+    def label(self) -> str:
+        """Display form used by the frontend, e.g. "London (LHR)"."""
+        return f"{self.city} ({self.iata})"
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"iata": self.iata, "name": self.name, "city": self.city,
+                "country": self.country, "label": self.label}
+
+
+class AirportIndex:
+    """Prefix trie + trigram index over a fixed airport list."""
+
+    def __init__(self, airports: List[Airport]):
+        self.airports = airports
+        self._by_iata = {a.iata: i for i, a in enumerate(airports)}
+        self._by_city: Dict[str, int] = {}
+        self._city_norm = [normalize(a.city) for a in airports]
+        self._trie: dict = {}
+        self._trigrams: Dict[str, List[int]] = {}
+
+        for i, airport in enumerate(airports):
+            city = self._city_norm[i]
+            if airport.primary:
+                self._by_city.setdefault(city, i)
+            name = normalize(airport.name)
+            keys = {airport.iata.lower(), city, name}
+            keys.update(w for w in f"{city} {name}".split() if w not in _STOP_WORDS)
+            for key in keys:
+                self._insert(key, i)
+            for gram in _trigrams(f"{city} {name}"):
+                self._trigrams.setdefault(gram, []).append(i)
+
+    @classmethod
+    def from_csv(cls, path: str = _AIRPORTS_PATH) -> "AirportIndex":
+        airports: List[Airport] = []
+        seen_cities: Set[Tuple[str, str]] = set()
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                city_key = (normalize(row["city"]), row["country"])
+                airports.append(Airport(row["iata"].upper(), row["name"], row["city"], row["country"],
+                                        primary=city_key not in seen_cities))
+                seen_cities.add(city_key)
+        return cls(airports)
+
+    def _insert(self, key: str, airport_id: int):
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+            ids = node.setdefault("", [])
+            # Insertion follows file order, so the cap keeps the first-listed (bigger) airports
+            if len(ids) < MAX_IDS_PER_NODE and airport_id not in ids:
+                ids.append(airport_id)
+
+    def _prefix_ids(self, prefix: str) -> List[int]:
+        node = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get("", [])
+
+    def _tier(self, q: str, airport_id: int) -> int:
+        """Lower is better: IATA code, exact city, city prefix, word prefix."""
+        airport = self.airports[airport_id]
+        city = self._city_norm[airport_id]
+        if q == airport.iata.lower():
+            return 0
+        if q == city:
+            return 1
+        if city.startswith(q):
+            return 2
+        return 3
+
+    def search(self, query: str, limit: int = 10) -> List[Airport]:
+        """Ranked matches for an as-you-type query."""
+        q = normalize(query)
+        if not q:
+            return []
+
+        candidates = self._prefix_ids(q)
+        ranked = sorted(candidates, key=lambda i: (self._tier(q, i), not self.airports[i].primary, i))
+        results = ranked[:limit]
+
+        if not results and len(q) >= 3:
+            # Fuzzy fallback for typos: share of the query's trigrams each airport contains
+            grams = _trigrams(q)
+            counts = Counter(i for gram in grams for i in self._trigrams.get(gram, ()))
+            fuzzy = [(count / len(grams), i) for i, count in counts.items()
+                     if count / len(grams) >= MIN_TRIGRAM_SCORE]
+            fuzzy.sort(key=lambda item: (-item[0], not self.airports[item[1]].primary, item[1]))
+            results = [i for _, i in fuzzy[:limit]]
+
+        return [self.airports[i] for i in results]
+
+    def resolve(self, place: Optional[str]) -> Optional[Airport]:
+        """
+        Exact resolution of a place string to an airport: "London (LHR)", "LHR",
+        or a city name (its main airport). No fuzzy matching - None if unsure.
+        """
+        if not place:
+            return None
+        match = _IATA_IN_LABEL.search(place)
+        if match and match.group(1).upper() in self._by_iata:
+            return self.airports[self._by_iata[match.group(1).upper()]]
+        text = place.strip()
+        if len(text) == 3 and text.upper() in self._by_iata:
+            return self.airports[self._by_iata[text.upper()]]
+        q = normalize(text)
+        # "Kyoto, Japan" -> try the city part on its own
+        for candidate in (q, normalize(text.split(",")[0])):
+            if candidate in self._by_city:
+                return self.airports[self._by_city[candidate]]
+        return None
+
+    def canonical_place(self, place: Optional[str]) -> str:
+        """Stable cache-key form of a place: "london|gb" for anything resolving to London."""
+        airport = self.resolve(place)
+        if airport is None:
+            return normalize(place or "")
+        return f"{self._city_norm[self._by_iata[airport.iata]]}|{airport.country.lower()}"
+
+
+airport_index = AirportIndex.from_csv()
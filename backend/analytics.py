@@ -0,0 +1,129 @@
+"""
+Budget analytics over saved trip plans.
+
+Every saved plan has a trip_costs row (parsed once, see money.py). Budget
+distributions per (destination, month, currency) are computed over all of them
+at once with NumPy: rows are grouped with np.unique, sorted within groups with
+np.lexsort, and means/percentiles are read off the sorted arrays, so the cost
+is one sort regardless of how many groups there are.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from . import database as db
+from .airports import airport_index
+from .money import estimate_trip_cost, priced_plan_items
+
+PERCENTILES = (25, 50, 75, 90)
+
+_MONTHS = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_ISO_MONTH = re.compile(r"\b(20\d{2})-(\d{1,2})\b")
+# Full month names or their abbreviations only: not "Marrakech" or "maybe"
+_NAMED_MONTH = re.compile(r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+                          r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b", re.IGNORECASE)
+_YEAR = re.compile(r"\b(20\d{2})\b")
+
+
+def travel_month(dates: Optional[str], travel_time: Optional[str] = None) -> Optional[str]:
+    """
+    Month of travel as "YYYY-MM" from the query's dates ("2026-03-10 to
+    2026-03-17", "March 10-17, 2026") or travel_time ("March 2026").
+    None when no month can be read (e.g. "Summer 2026").
+    """
+    for text in (dates, travel_time):
+        if not text:
+            continue
+        iso = _ISO_MONTH.search(text)
+        if iso and 1 <= int(iso.group(2)) <= 12:
+            return f"{iso.group(1)}-{int(iso.group(2)):02d}"
+        named = _NAMED_MONTH.search(text)
+        year = _YEAR.search(text)
+        if named:
+            month = _MONTHS[named.group(1)[:3].lower()]
+            return f"{year.group(1) if year else datetime.now().year}-{month:02d}"
+    return None
+
+
+def record_trip_cost(message_id: int, session_id: str, destination: str, cost: Dict[str, Any],
+                     user_id: str = db.DEFAULT_USER_ID):
+    """Store a saved plan's cost under its canonical destination."""
+    db.add_trip_cost(message_id, session_id, destination, airport_index.canonical_place(destination), cost, user_id)
+
+
+def backfill_trip_costs() -> int:
+    """Parse plans saved before trip_costs existed. Runs once per plan."""
+    messages = db.get_unpriced_plan_messages()
+    for msg in messages:
+        plan, query = msg['trip_plan'], msg['user_query']
+        currency = plan.get('preferred_currency') or query.get('currency') or "USD"
+        try:
+            items = priced_plan_items(plan, currency)
+        except Exception as e:
+            print(f"[Analytics] Skipping unreadable plan in message {msg['id']}: {e}")
+            items = ([], [], [], [])
+        cost = estimate_trip_cost(*items, query.get('days'), currency,
+                                  travel_month(query.get('dates'), query.get('travel_time')))
+        record_trip_cost(msg['id'], msg['session_id'], plan.get('destination'), cost.model_dump(), msg['user_id'])
+    if messages:
+        print(f"[Analytics] Backfilled costs for {len(messages)} saved plans")
+    return len(messages)
+
+
+def budget_distributions(destination: Optional[str] = None, currency: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Budget distribution per (destination, travel month, currency) across all saved plans."""
+    destination_key = airport_index.canonical_place(destination) if destination else None
+    rows = db.get_trip_costs(destination_key, currency)
+    if not rows:
+        return []
+
+    keys = np.array([f"{r['destination_key']}\t{r['travel_month'] or ''}\t{r['currency']}" for r in rows])
+    totals = np.array([r['total'] for r in rows], dtype=float)
+    components = np.array([[r['flights'] or 0.0, r['hotels'] or 0.0, r['activities'] or 0.0] for r in rows],
+                          dtype=float)
+
+    groups, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    sorted_totals = totals[np.lexsort((totals, inverse))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    means = np.bincount(inverse, weights=totals) / counts
+    component_means = np.stack(
+        [np.bincount(inverse, weights=components[:, k], minlength=len(groups)) for k in range(3)], axis=1
+    ) / counts[:, None]
+
+    # Linear-interpolated percentiles within each group's sorted slice
+    percentiles = {}
+    for pct in PERCENTILES:
+        position = pct / 100 * (counts - 1)
+        low = np.floor(position).astype(int)
+        high = np.ceil(position).astype(int)
+        frac = position - low
+        percentiles[pct] = sorted_totals[starts + low] * (1 - frac) + sorted_totals[starts + high] * frac
+
+    # Show a readable destination name per group (the most recent spelling)
+    names = {}
+    for r in sorted(rows, key=lambda r: r['message_id']):
+        names[r['destination_key']] = r['destination']
+
+    results = []
+    for g, group in enumerate(groups):
+        key, month, group_currency = group.split("\t")
+        results.append({
+            "destination": names.get(key, key),
+            "destination_key": key,
+            "month": month or None,
+            "currency": group_currency,
+            "count": int(counts[g]),
+            "mean": round(float(means[g]), 2),
+            "min": round(float(sorted_totals[starts[g]]), 2),
+            "max": round(float(sorted_totals[starts[g] + counts[g] - 1]), 2),
+            **{f"p{pct}": round(float(percentiles[pct][g]), 2) for pct in PERCENTILES},
+            "mean_breakdown": {
+                "flights": round(float(component_means[g, 0]), 2),
+                "hotels": round(float(component_means[g, 1]), 2),
+                "activities": round(float(component_means[g, 2]), 2),
+            },
+        })
+    return results
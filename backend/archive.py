@@ -0,0 +1,178 @@
+"""
+Cold storage for idle chat sessions.
+
+chat_messages keeps every generated plan as JSON text, which is most of the
+database. Sessions untouched for TRAVEL_ARCHIVE_AFTER_DAYS have their
+messages moved out of the hot table into append-only segment files next to
+the database (travel_agent-archive/segment-000001.z, ...). Each session is
+one record: a 4-byte length header followed by the zlib-compressed JSON of
+its message rows. The session_archive table is the index: segment, byte
+offset and length per session. The chat_sessions row itself stays hot, so
+session lists don't change.
+
+Reads are transparent: database.get_session_messages reads an archived
+session straight from its segment, and database.add_message moves it back
+into chat_messages (same message ids) before adding to it. Segments are
+never rewritten; records of restored or deleted sessions just stop being
+referenced. A new segment is started once the current one reaches
+TRAVEL_ARCHIVE_SEGMENT_MB.
+
+Archive by hand (VACUUM afterwards to shrink the database file itself):
+
+    python -m backend.archive --days 30 [--vacuum]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import database as db
+
+# 0 turns the periodic archive job off
+ARCHIVE_AFTER_DAYS = float(os.getenv("TRAVEL_ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL_S = float(os.getenv("TRAVEL_ARCHIVE_INTERVAL_S", str(24 * 3600)))
+SEGMENT_MAX_BYTES = int(float(os.getenv("TRAVEL_ARCHIVE_SEGMENT_MB", "64")) * 1024 * 1024)
+BATCH_SIZE = 200
+
+_HEADER = struct.Struct(">I")
+_SEGMENT = re.compile(r"^segment-(\d{6})\.z$")
+_append_lock = threading.Lock()
+
+
+def archive_dir(shard: Optional[int] = None) -> str:
+    """Directory holding the segments of one database file"""
+    return f"{os.path.splitext(db.shard_path(shard))[0]}-archive"
+
+
+def _writable_segment(directory: str) -> str:
+    numbers = sorted(int(m.group(1)) for m in map(_SEGMENT.match, os.listdir(directory)) if m)
+    if numbers:
+        latest = f"segment-{numbers[-1]:06d}.z"
+        if os.path.getsize(os.path.join(directory, latest)) < SEGMENT_MAX_BYTES:
+            return latest
+    return f"segment-{(numbers[-1] + 1) if numbers else 1:06d}.z"
+
+
+def append_record(payload: Dict[str, Any], shard: Optional[int] = None) -> Tuple[str, int, int]:
+    """Compress and append one record; returns (segment, byte offset, byte length)"""
+    data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+    record = _HEADER.pack(len(data)) + data
+    directory = archive_dir(shard)
+    with _append_lock:
+        os.makedirs(directory, exist_ok=True)
+        segment = _writable_segment(directory)
+        with open(os.path.join(directory, segment), "ab") as f:
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+    return segment, offset, len(record)
+
+
+def read_record(segment: str, byte_offset: int, byte_length: int, shard: Optional[int] = None) -> Dict[str, Any]:
+    with open(os.path.join(archive_dir(shard), segment), "rb") as f:
+        f.seek(byte_offset)
+        record = f.read(byte_length)
+    (size,) = _HEADER.unpack_from(record)
+    if size != byte_length - _HEADER.size:
+        raise ValueError(f"Corrupt archive record in {segment} at {byte_offset}")
+    return json.loads(zlib.decompress(record[_HEADER.size:]))
+
+
+def read_archived_messages(shard: Optional[int], location: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """A session's message rows (as stored in chat_messages) from its session_archive entry"""
+    payload = read_record(location['segment'], location['byte_offset'], location['byte_length'], shard)
+    return payload['messages']
+
+
+def archive_session(session_id: str, shard: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """Move one session's messages to the archive; None if it had none or changed meanwhile"""
+    messages = db.get_raw_session_messages(session_id, shard)
+    if not messages:
+        return None
+    payload = {"session_id": session_id, "messages": messages}
+    segment, offset, length = append_record(payload, shard)
+    if not db.mark_session_archived(session_id, segment, offset, length, [m['id'] for m in messages], shard):
+        # The appended record is left unreferenced
+        return None
+    raw = sum(len(m['content']) + len(m['trip_plan'] or "") + len(m['user_query'] or "") for m in messages)
+    return {"messages": len(messages), "raw_bytes": raw, "archived_bytes": length}
+
+
+def archive_idle_sessions(days: float = ARCHIVE_AFTER_DAYS) -> Dict[str, int]:
+    """Archive every session untouched for `days`, in every shard."""
+    stats = {"sessions": 0, "messages": 0, "raw_bytes": 0, "archived_bytes": 0}
+    for shard in db.all_shards():
+        while True:
+            session_ids = db.get_idle_sessions(days, BATCH_SIZE, shard)
+            archived = [archive_session(session_id, shard) for session_id in session_ids]
+            for result in filter(None, archived):
+                stats["sessions"] += 1
+                for key, value in result.items():
+                    stats[key] += value
+            if len(session_ids) < BATCH_SIZE:
+                break
+    if stats["sessions"]:
+        print(f"[Archive] Archived {stats['sessions']} sessions ({stats['messages']} messages, "
+              f"{stats['raw_bytes'] / 1024:.0f}KB -> {stats['archived_bytes'] / 1024:.0f}KB)")
+    return stats
+
+
+class SessionArchiver:
+    """Runs archive_idle_sessions every ARCHIVE_INTERVAL_S, off the event loop."""
+
+    def __init__(self, days: float = ARCHIVE_AFTER_DAYS, interval_s: float = ARCHIVE_INTERVAL_S):
+        self.days = days
+        self.interval_s = interval_s
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(archive_idle_sessions, self.days)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Archive] Archiving failed, will retry: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            print(f"[Archive] Started (sessions idle for {self.days:g} days)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_archiver = SessionArchiver()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Move idle chat sessions to compressed archive segments")
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS or 30,
+                        help="Archive sessions untouched for this many days")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database files afterwards")
+    args = parser.parse_args(argv)
+
+    stats = archive_idle_sessions(args.days)
+    print(f"[Archive] {stats}")
+    if args.vacuum:
+        for shard in db.all_shards():
+            db.vacuum(shard)
+        print("[Archive] Vacuumed")
+
+
+if __name__ == "__main__":
+    main()
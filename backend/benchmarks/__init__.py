@@ -0,0 +1,10 @@
+"""
+Offline benchmark harness for the trip planning pipeline.
+
+Everything in here runs without network access: the LLM and DuckDuckGo are
+replaced by scripted fakes (see fakes.py) so throughput and latency numbers
+reflect our own orchestration overhead, not third-party variance.
+
+Run a load test with:
+    python -m backend.benchmarks.load_test --requests 50 --concurrency 10
+"""
@@ -0,0 +1,297 @@
+"""
+Scripted stand-ins for the LLM and DuckDuckGo used by the benchmark harness.
+
+FakeLLMClient plugs into LiteLlm as its `llm_client`, so the real ADK/LiteLlm
+request conversion, tool-call round trip and structured-output parsing all
+still run - only the network call is replaced. The fake recognises each agent
+by the name of its response schema (FlightList, HotelList, VisaInfo,
+ActivityList, Itinerary, FastPlan, MemoryList) and answers with schema-valid JSON.
+
+FakeDDGS mimics the blocking `DDGS` client behind the search providers (web
+search and images), sleeping for the configured latency like a real HTTP call.
+"""
+import asyncio
+import functools
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+from litellm import ModelResponse, ModelResponseStream
+from litellm.types.utils import Delta, StreamingChoices
+
+from .. import recorder
+from ..agents import base_agent
+from ..agents.flight_agent import FlightList
+from ..agents.hotel_agent import HotelList
+from ..agents.visa_agent import VisaInfo
+from ..agents.activity_agent import ActivityList
+from ..agents.itinerary_agent import Itinerary
+from ..agents.memory_agent import MemoryList
+from ..agents.fast_plan_agent import FastPlan
+from ..agents.tools import search_providers
+
+
+def _flight(i: int, currency: str = "USD") -> Dict[str, Any]:
+    return {
+        "airline": f"Bench Air {i}",
+        "price": f"{currency} {420 + i * 35}",
+        "departure": f"{7 + i}:15 AM",
+        "arrival": f"{3 + i}:40 PM",
+        "duration": f"{8 + i}h 25m",
+    }
+
+
+def _activity(i: int) -> Dict[str, Any]:
+    return {
+        "name": f"Benchmark Activity {i}",
+        "description": "A scripted activity returned by the fake LLM.",
+        "price": "Free" if i % 2 else f"USD {15 + i * 5}",
+        "duration": f"{1 + i % 3} hours",
+    }
+
+
+def default_payloads() -> Dict[str, str]:
+    """Schema-valid JSON answers keyed by response schema name."""
+    payloads = {
+        "FlightList": FlightList.model_validate({
+            "outbound_flights": [_flight(i) for i in range(3)],
+            "return_flights": [_flight(i + 3) for i in range(3)],
+        }),
+        "HotelList": HotelList.model_validate({
+            "hotels": [
+                {
+                    "name": f"Benchmark Hotel {i}",
+                    "price_per_night": f"USD {90 + i * 60}",
+                    "rating": 3.5 + i * 0.5,
+                    "description": "A scripted hotel returned by the fake LLM.",
+                    "amenities": ["WiFi", "Breakfast"],
+                    "style": ["budget", "boutique", "luxury"][i],
+                }
+                for i in range(3)
+            ]
+        }),
+        "VisaInfo": VisaInfo.model_validate({
+            "country": "Benchmarkia",
+            "required": True,
+            "requirements": ["Valid passport", "Return ticket"],
+            "processing_time": "5 business days",
+            "application_url": "https://visa.example.gov",
+            "application_steps": ["Fill in the form", "Pay the fee"],
+        }),
+        "ActivityList": ActivityList.model_validate({
+            "activities": [{**_activity(i), "category": "sightseeing"} for i in range(5)]
+        }),
+        "Itinerary": Itinerary.model_validate({
+            "days": [
+                {"day": d + 1, "activities": [_activity(d * 2), _activity(d * 2 + 1)]}
+                for d in range(3)
+            ]
+        }),
+        "MemoryList": MemoryList.model_validate({
+            "memories": [
+                {"memory_type": "travel_style", "content": "Prefers mid-range hotels", "confidence": 0.8}
+            ]
+        }),
+    }
+    payloads["FastPlan"] = FastPlan.model_validate({
+        **payloads["FlightList"].model_dump(),
+        **payloads["HotelList"].model_dump(),
+        "visa": payloads["VisaInfo"].model_dump(),
+        **payloads["ActivityList"].model_dump(),
+        **payloads["Itinerary"].model_dump(),
+    })
+    return {name: model.model_dump_json() for name, model in payloads.items()}
+
+
+async def stream_response(response: ModelResponse, latency: float = 0.0,
+                          chunk_chars: int = 24) -> AsyncIterator[ModelResponseStream]:
+    """
+    Replay a complete ModelResponse as streaming chunks, the way LiteLlm
+    receives them with stream=True. `latency` is spread evenly over the chunks.
+    """
+    choice = response.choices[0]
+    message = choice.message
+    content = message.content or ""
+    pieces = [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)]
+    delay = latency / max(1, len(pieces))
+
+    if message.tool_calls:
+        await asyncio.sleep(latency)
+        tool_calls = [
+            {"index": i, "id": call.id, "type": "function",
+             "function": {"name": call.function.name, "arguments": call.function.arguments}}
+            for i, call in enumerate(message.tool_calls)
+        ]
+        yield ModelResponseStream(choices=[StreamingChoices(index=0, delta=Delta(role="assistant", tool_calls=tool_calls))])
+    for piece in pieces:
+        await asyncio.sleep(delay)
+        yield ModelResponseStream(choices=[StreamingChoices(index=0, delta=Delta(content=piece))])
+    # Usage rides on the last chunk, as with stream_options={"include_usage": True}
+    yield ModelResponseStream(choices=[StreamingChoices(index=0, delta=Delta(), finish_reason=choice.finish_reason)],
+                              usage=getattr(response, "usage", None))
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _tool_names(tools: Optional[List[Dict[str, Any]]]) -> List[str]:
+    return [t.get("function", {}).get("name") for t in tools or []]
+
+
+class FakeLLMClient(LiteLLMClient):
+    """
+    Drop-in replacement for LiteLLMClient that never leaves the process.
+
+    Agents that have the web_search tool get one tool call first (mirroring the
+    "exactly 1 search call" rule in every instruction), then the JSON answer.
+
+    Args:
+        latency: Mean seconds per completion.
+        jitter: Fractional spread around the mean (0.2 => +/-20%).
+        payloads: Overrides for the JSON returned per schema name.
+        seed: Seed for the latency jitter, for reproducible runs.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0,
+                 payloads: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.payloads = {**default_payloads(), **(payloads or {})}
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.prompt_chars = 0
+        self.completion_chars = 0
+
+    def _delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        spread = self.latency * self.jitter
+        return max(0.0, self._rng.uniform(self.latency - spread, self.latency + spread))
+
+    def _response(self, message: Dict[str, Any], prompt_chars: int, finish_reason: str) -> ModelResponse:
+        completion_chars = len(json.dumps(message))
+        self.completion_chars += completion_chars
+        return ModelResponse(
+            choices=[{"message": message, "finish_reason": finish_reason}],
+            usage={
+                # ~4 chars per token is close enough for relative comparisons
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": completion_chars // 4,
+                "total_tokens": (prompt_chars + completion_chars) // 4,
+            },
+        )
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any,
+                          **kwargs: Any) -> Union[ModelResponse, AsyncIterator[ModelResponseStream]]:
+        response = self._answer(messages, tools, kwargs.get("response_format"))
+        if kwargs.get("stream"):
+            return stream_response(response, self._delay())
+        await asyncio.sleep(self._delay())
+        return response
+
+    def _answer(self, messages: Any, tools: Any, response_format: Any) -> ModelResponse:
+        self.calls += 1
+        prompt_chars = sum(len(_message_text(m)) for m in messages)
+        self.prompt_chars += prompt_chars
+
+        last_role = messages[-1].get("role") if messages else None
+        if "web_search" in _tool_names(tools) and last_role != "tool":
+            query = _message_text(messages[-1]) or "travel"
+            return self._response({
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{
+                    "id": f"call_{self.calls}",
+                    "type": "function",
+                    "function": {"name": "web_search", "arguments": json.dumps({"query": query[:120]})},
+                }],
+            }, prompt_chars, "tool_calls")
+
+        name = recorder.response_schema_name(response_format)
+        content = self.payloads.get(name, "{}")
+        return self._response({"role": "assistant", "content": content}, prompt_chars, "stop")
+
+
+class FakeDDGS:
+    """
+    Blocking stand-in for `ddgs.DDGS`.
+
+    Sleeps with time.sleep on purpose: the real client blocks its calling
+    thread, and the benchmark should surface it when that thread is the event
+    loop.
+    """
+
+    latency: float = 0.0
+    calls: int = 0
+    _lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    @classmethod
+    def _record_call(cls):
+        with cls._lock:
+            cls.calls += 1
+        if cls.latency > 0:
+            time.sleep(cls.latency)
+
+    def text(self, query: str, max_results: int = 5, **kwargs) -> List[Dict[str, str]]:
+        self._record_call()
+        return [
+            {
+                "title": f"Result {i} for {query}",
+                "href": f"https://example.com/{abs(hash(query)) % 10000}/{i}",
+                "body": f"Snippet {i}: prices from USD {100 + i * 25}, rated 4.{i} by travellers.",
+            }
+            for i in range(1, max_results + 1)
+        ]
+
+    def images(self, query: str, max_results: int = 1, size: str = None, **kwargs) -> List[Dict[str, str]]:
+        self._record_call()
+        return [{"image": f"https://images.example.com/{abs(hash(query)) % 10000}/{i}.jpg"}
+                for i in range(max_results)]
+
+
+@contextmanager
+def fake_backends(llm_latency: float = 0.0, llm_jitter: float = 0.0, search_latency: float = 0.0,
+                  seed: Optional[int] = None, llm_client: Optional[LiteLLMClient] = None):
+    """
+    Patch every Agent's LiteLlm and the search providers' DDGS client with the fakes.
+
+    Yields a namespace with `llm` (the FakeLLMClient) and `search` (the FakeDDGS
+    class) so callers can read their call counters. Agents must be
+    constructed inside the `with` block, since the model is bound in
+    Agent.__init__.
+    """
+    client = llm_client or FakeLLMClient(llm_latency, llm_jitter, seed=seed)
+    fake_ddgs = type("FakeDDGS", (FakeDDGS,), {"latency": search_latency, "calls": 0})
+
+    originals: List[tuple] = [
+        (base_agent, "LiteLlm", base_agent.LiteLlm),
+        (search_providers, "DDGS", search_providers.DDGS),
+        # Nothing remote to protect: the fakes shouldn't be throttled
+        (search_providers.search_broker, "limits", search_providers.search_broker.limits),
+    ]
+    lite_llm_factory: Callable[..., LiteLlm] = functools.partial(LiteLlm, llm_client=client)
+    base_agent.LiteLlm = lite_llm_factory
+    search_providers.DDGS = fake_ddgs
+    search_providers.search_broker.limits = {}
+    try:
+        yield SimpleNamespace(llm=client, search=fake_ddgs)
+    finally:
+        for module, attr, value in originals:
+            setattr(module, attr, value)
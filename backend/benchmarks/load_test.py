@@ -0,0 +1,298 @@
+"""
+Offline load test for /plan_trip_with_session and /ws/{client_id}.
+
+Boots the real FastAPI app under uvicorn inside this process (so event-loop lag
+is measured on the loop that actually serves requests), swaps the LLM and
+DuckDuckGo for the fakes in fakes.py, and drives N planning requests at the
+requested concurrency. Each virtual user opens its status WebSocket first,
+exactly like the frontend does.
+
+Usage:
+    python -m backend.benchmarks.load_test --requests 50 --concurrency 10 \\
+        --llm-latency 0.4 --search-latency 0.15 --output bench.json
+
+Add --engine fast to measure the single-call fast plan against the default
+multi-agent pipeline (latency, LLM calls and prompt tokens per plan).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Keep litellm from trying to download its model cost map on import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import httpx
+import uvicorn
+import websockets
+
+from .. import database as db
+from ..agents import base_agent
+from ..agents.base_agent import Agent, ReportingSessionService
+from .fakes import fake_backends
+
+DESTINATIONS = ["Paris", "Tokyo", "Lisbon", "Bangkok", "Mexico City", "Reykjavik"]
+ORIGINS = ["New York", "London", "Delhi", "Sydney"]
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class LoopMonitor:
+    """Samples event-loop lag (sleep overshoot) and RSS on a fixed interval."""
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.lags_ms: List[float] = []
+        self.rss_mb: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (loop.time() - started - self.interval) * 1000))
+            self.rss_mb.append(current_rss_mb())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def build_query(i: int, client_id: str, engine: str = "agents") -> Dict[str, Any]:
+    destination = DESTINATIONS[i % len(DESTINATIONS)]
+    return {
+        "query": f"Trip to {destination}",
+        "destination": destination,
+        "origin": ORIGINS[i % len(ORIGINS)],
+        "days": 3,
+        "travel_time": "March 2026",
+        "client_id": client_id,
+        "engine": engine,
+    }
+
+
+async def _collect_ws(url: str, started: float, record: Dict[str, Any], ready: asyncio.Event):
+    try:
+        async with websockets.connect(url) as ws:
+            ready.set()
+            async for _ in ws:
+                record["ws_messages"] += 1
+                if record["first_status_s"] is None:
+                    record["first_status_s"] = time.perf_counter() - started
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        record["ws_error"] = str(e)
+    finally:
+        ready.set()
+
+
+async def run_one(client: httpx.AsyncClient, base_url: str, ws_url: str, i: int, use_ws: bool,
+                  engine: str = "agents") -> Dict[str, Any]:
+    client_id = f"bench-{uuid.uuid4()}"
+    record: Dict[str, Any] = {"ok": False, "latency_s": None, "first_status_s": None, "ws_messages": 0}
+    started = time.perf_counter()
+
+    ws_task = None
+    if use_ws:
+        ready = asyncio.Event()
+        ws_task = asyncio.create_task(_collect_ws(f"{ws_url}/ws/{client_id}", started, record, ready))
+        await ready.wait()
+
+    try:
+        response = await client.post(f"{base_url}/plan_trip_with_session", json=build_query(i, client_id, engine))
+        record["ok"] = response.status_code == 200
+        record["status_code"] = response.status_code
+    except Exception as e:
+        record["error"] = str(e)
+    record["latency_s"] = time.perf_counter() - started
+
+    if ws_task:
+        ws_task.cancel()
+        try:
+            await ws_task
+        except asyncio.CancelledError:
+            pass
+    return record
+
+
+def use_temp_storage() -> str:
+    """Point the chat DB and the ADK session store at a throwaway directory."""
+    workdir = tempfile.mkdtemp(prefix="travel-bench-")
+    db.DATABASE_PATH = os.path.join(workdir, "travel_agent.db")
+    db.init_db()
+    Agent._session_service = ReportingSessionService(os.path.join(workdir, "adk_sessions.db"))
+    return workdir
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    use_temp_storage()
+    if args.no_search_prefetch:
+        base_agent.SEARCH_PREFETCH = False
+
+    from ..main import app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    base_url = f"http://127.0.0.1:{port}"
+    ws_url = f"ws://127.0.0.1:{port}"
+    monitor = LoopMonitor()
+    rss_start = current_rss_mb()
+
+    with fake_backends(args.llm_latency, args.llm_jitter, args.search_latency, seed=args.seed) as fakes:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+            for i in range(args.warmup):
+                await run_one(client, base_url, ws_url, i, not args.no_ws, args.engine)
+            llm_calls_before, search_calls_before = fakes.llm.calls, fakes.search.calls
+            prompt_chars_before = fakes.llm.prompt_chars
+
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def bounded(i: int):
+                async with semaphore:
+                    return await run_one(client, base_url, ws_url, i, not args.no_ws, args.engine)
+
+            monitor.start()
+            wall_start = time.perf_counter()
+            records = await asyncio.gather(*(bounded(i) for i in range(args.requests)))
+            wall = time.perf_counter() - wall_start
+            await monitor.stop()
+
+        llm_calls = fakes.llm.calls - llm_calls_before
+        search_calls = fakes.search.calls - search_calls_before
+        prompt_chars = fakes.llm.prompt_chars - prompt_chars_before
+
+    server.should_exit = True
+    await server_task
+
+    ok = [r for r in records if r["ok"]]
+    per_plan = max(1, len(records))
+    return {
+        "config": vars(args),
+        "requests": len(records),
+        "succeeded": len(ok),
+        "failed": len(records) - len(ok),
+        "wall_time_s": wall,
+        "throughput_rps": len(ok) / wall if wall else 0.0,
+        "latency_s": summarize([r["latency_s"] for r in ok]),
+        "time_to_first_status_s": summarize([r["first_status_s"] for r in ok if r["first_status_s"] is not None]),
+        "ws_messages_per_plan": sum(r["ws_messages"] for r in records) / per_plan,
+        "event_loop_lag_ms": summarize(monitor.lags_ms),
+        "rss_mb": {
+            "start": rss_start,
+            "peak": max(monitor.rss_mb, default=rss_start),
+            "end": current_rss_mb(),
+        },
+        "llm_calls_per_plan": llm_calls / per_plan,
+        "search_calls_per_plan": search_calls / per_plan,
+        "prompt_tokens_per_plan": prompt_chars / 4 / per_plan,
+    }
+
+
+def _fmt(value: Optional[float], scale: float = 1.0, unit: str = "") -> str:
+    return "-" if value is None else f"{value * scale:.1f}{unit}"
+
+
+def print_report(report: Dict[str, Any]):
+    lat = report["latency_s"]
+    ttfs = report["time_to_first_status_s"]
+    lag = report["event_loop_lag_ms"]
+    rss = report["rss_mb"]
+    print("\n=== Trip planning load test (offline fakes) ===")
+    print(f"requests        {report['succeeded']}/{report['requests']} ok, {report['failed']} failed")
+    print(f"wall time       {report['wall_time_s']:.2f}s, throughput {report['throughput_rps']:.2f} plans/s")
+    print(f"latency         p50 {_fmt(lat['p50'], 1000, 'ms')}  p95 {_fmt(lat['p95'], 1000, 'ms')}  "
+          f"p99 {_fmt(lat['p99'], 1000, 'ms')}  max {_fmt(lat['max'], 1000, 'ms')}")
+    print(f"first status    p50 {_fmt(ttfs['p50'], 1000, 'ms')}  p95 {_fmt(ttfs['p95'], 1000, 'ms')}  "
+          f"({report['ws_messages_per_plan']:.1f} ws messages/plan)")
+    print(f"event-loop lag  p50 {_fmt(lag['p50'], 1, 'ms')}  p99 {_fmt(lag['p99'], 1, 'ms')}  max {_fmt(lag['max'], 1, 'ms')}")
+    print(f"rss             start {rss['start']:.1f}MB  peak {rss['peak']:.1f}MB  end {rss['end']:.1f}MB")
+    print(f"per plan        {report['llm_calls_per_plan']:.1f} LLM calls, {report['search_calls_per_plan']:.1f} searches, "
+          f"~{report['prompt_tokens_per_plan']:.0f} prompt tokens")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline load test for the trip planning API")
+    parser.add_argument("--requests", type=int, default=20, help="Number of planning requests to measure")
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent virtual users")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests run first")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Mean seconds per fake LLM completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Fractional spread of LLM latency")
+    parser.add_argument("--search-latency", type=float, default=0.1, help="Seconds per fake DDGS call")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for latency jitter")
+    parser.add_argument("--no-ws", action="store_true", help="Skip the status WebSocket per request")
+    parser.add_argument("--engine", choices=["agents", "fast"], default="agents",
+                        help="Planning engine: the multi-agent pipeline or the single-call fast plan")
+    parser.add_argument("--no-search-prefetch", action="store_true",
+                        help="Let agents call web_search themselves instead of prefetching")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Replay recorded planning runs offline.
+
+Cassettes are written by backend/recorder.py when TRAVEL_RECORD_DIR is set in
+production. Replaying serves the recorded LLM responses and DuckDuckGo results
+back to the current build, so real prompt sizes, tool-call patterns and the
+occasional malformed JSON all come through as they did live.
+
+Runs start at their original relative times (scaled by --time-scale, 0 means
+back to back) and each call sleeps for its recorded duration (scaled by
+--latency-scale). The report compares latency and structured-output parse
+failure rates between the original runs and the replay.
+
+Usage:
+    python -m backend.benchmarks.replay recordings/ --time-scale 0.1 --latency-scale 1.0
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+from litellm import ModelResponse
+
+from .. import recorder
+from ..agents import base_agent
+from ..agents.tools import search_providers
+from ..models import UserQueryWithClientId
+from .fakes import stream_response
+from .load_test import summarize, use_temp_storage, _fmt
+
+_current: ContextVar[Optional["Cassette"]] = ContextVar("replay_cassette", default=None)
+
+
+class Cassette:
+    """One recorded planning run, indexed for replay."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self.end: Dict[str, Any] = {}
+        self.parse_entries: List[Dict[str, Any]] = []
+        self._llm: Dict[Tuple[Optional[str], int], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._search: Dict[Tuple[str, str], Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._search_by_kind: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self.misses = 0
+        # Recorded before search prefetch (or with it off): agents made their own tool calls
+        self.agent_searches = False
+
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                kind = entry.get("type")
+                if kind == "run":
+                    self.header = entry
+                elif kind == "end":
+                    self.end = entry
+                elif kind == "llm":
+                    self._llm[(entry.get("schema"), entry.get("turn", 0))].append(entry)
+                    message = ((entry.get("response") or {}).get("choices") or [{}])[0].get("message") or {}
+                    self.agent_searches = self.agent_searches or bool(message.get("tool_calls"))
+                elif kind == "search":
+                    self._search[(entry["kind"], entry["query"])].append(entry)
+                    self._search_by_kind[entry["kind"]].append(entry)
+                elif kind == "parse":
+                    self.parse_entries.append(entry)
+
+    @property
+    def started_at(self) -> float:
+        return self.header.get("started_at", 0.0)
+
+    @property
+    def user_query(self) -> Dict[str, Any]:
+        return self.header.get("user_query", {})
+
+    def next_llm(self, schema: Optional[str], turn: int) -> Optional[Dict[str, Any]]:
+        queue = self._llm.get((schema, turn))
+        if queue:
+            return queue.popleft()
+        self.misses += 1
+        return None
+
+    def next_search(self, kind: str, query: str) -> Optional[Dict[str, Any]]:
+        # Exact query first; prompts embed today's date, so fall back to recording order
+        for queue in (self._search.get((kind, query)), self._search_by_kind.get(kind)):
+            while queue:
+                entry = queue.popleft()
+                if not entry.get("_used"):
+                    entry["_used"] = True
+                    return entry
+        self.misses += 1
+        return None
+
+
+class ReplayLLMClient(LiteLLMClient):
+    """Serves recorded completions for the cassette bound to the current run."""
+
+    def __init__(self, latency_scale: float = 1.0):
+        self.latency_scale = latency_scale
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any) -> ModelResponse:
+        cassette = _current.get()
+        schema = recorder.response_schema_name(kwargs.get("response_format"))
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        entry = cassette.next_llm(schema, turn) if cassette else None
+        if entry is None:
+            response = ModelResponse(choices=[{"message": {"role": "assistant", "content": ""}, "finish_reason": "stop"}])
+            latency = 0.0
+        else:
+            response = ModelResponse(**entry["response"])
+            latency = entry.get("duration_s", 0.0) * self.latency_scale
+        if kwargs.get("stream"):
+            return stream_response(response, latency)
+        await asyncio.sleep(latency)
+        return response
+
+
+class ReplayDDGS:
+    """Blocking DDGS stand-in that returns recorded results, like the real client."""
+
+    latency_scale: float = 1.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def _serve(self, kind: str, query: str) -> List[Dict[str, Any]]:
+        cassette = _current.get()
+        entry = cassette.next_search(kind, query) if cassette else None
+        if entry is None:
+            return []
+        time.sleep(entry.get("duration_s", 0.0) * self.latency_scale)
+        return entry.get("results", [])
+
+    def text(self, query: str, max_results: int = 5, **kwargs) -> List[Dict[str, Any]]:
+        return self._serve("text", query)[:max_results]
+
+    def images(self, query: str, max_results: int = 1, size: str = None, **kwargs) -> List[Dict[str, Any]]:
+        return self._serve("images", query)[:max_results]
+
+
+@contextmanager
+def replay_backends(latency_scale: float = 1.0):
+    """Patch LiteLlm and the search providers' DDGS client to serve from the current cassette."""
+    client = ReplayLLMClient(latency_scale)
+    replay_ddgs = type("ReplayDDGS", (ReplayDDGS,), {"latency_scale": latency_scale})
+    originals = [
+        (base_agent, "LiteLlm", base_agent.LiteLlm),
+        (search_providers, "DDGS", search_providers.DDGS),
+        # Nothing remote to protect: the fakes shouldn't be throttled
+        (search_providers.search_broker, "limits", search_providers.search_broker.limits),
+    ]
+    base_agent.LiteLlm = lambda model, **kwargs: LiteLlm(model=model, llm_client=client)
+    search_providers.DDGS = replay_ddgs
+    search_providers.search_broker.limits = {}
+    try:
+        yield client
+    finally:
+        for module, attr, value in originals:
+            setattr(module, attr, value)
+
+
+def load_cassettes(paths: List[str]) -> List[Cassette]:
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.jsonl"))))
+        else:
+            files.append(path)
+    cassettes = [Cassette(f) for f in files]
+    return sorted(cassettes, key=lambda c: c.started_at)
+
+
+async def replay_run(cassette: Cassette) -> Dict[str, Any]:
+    from ..orchestrator import Orchestrator
+
+    query = {**cassette.user_query, "client_id": None}
+    token = _current.set(cassette)
+    record: Dict[str, Any] = {"path": cassette.path, "ok": False}
+    try:
+        with recorder.observe_run(query) as run:
+            started = time.perf_counter()
+            try:
+                orchestrator = Orchestrator()
+                # Serve the recorded turns in the mode they were recorded in
+                orchestrator.travel_agent.prefetch_search = not cassette.agent_searches
+                await orchestrator.plan_trip(UserQueryWithClientId(**query))
+                record["ok"] = True
+            except Exception as e:
+                record["error"] = str(e)
+            record["latency_s"] = time.perf_counter() - started
+        parses = [e for e in run.entries if e["type"] == "parse"]
+        record["parse_attempts"] = len(parses)
+        record["parse_failures"] = run.parse_failures()
+        record["misses"] = cassette.misses
+    finally:
+        _current.reset(token)
+    return record
+
+
+async def run_replay(args: argparse.Namespace) -> Dict[str, Any]:
+    cassettes = load_cassettes(args.cassettes)
+    if not cassettes:
+        raise SystemExit("No cassettes found")
+    use_temp_storage()
+
+    t0 = cassettes[0].started_at
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def scheduled(cassette: Cassette):
+        await asyncio.sleep(max(0.0, (cassette.started_at - t0) * args.time_scale))
+        async with semaphore:
+            return await replay_run(cassette)
+
+    with replay_backends(args.latency_scale):
+        wall_start = time.perf_counter()
+        records = await asyncio.gather(*(scheduled(c) for c in cassettes))
+        wall = time.perf_counter() - wall_start
+
+    original_attempts = sum(len(c.parse_entries) for c in cassettes)
+    original_failures = sum(1 for c in cassettes for e in c.parse_entries if not e["ok"])
+    replay_attempts = sum(r.get("parse_attempts", 0) for r in records)
+    replay_failures = sum(r.get("parse_failures", 0) for r in records)
+    return {
+        "config": vars(args),
+        "runs": len(records),
+        "succeeded": sum(1 for r in records if r["ok"]),
+        "original_errors": sum(1 for c in cassettes if c.end.get("error")),
+        "replay_errors": sum(1 for r in records if not r["ok"]),
+        "wall_time_s": wall,
+        "original_latency_s": summarize([c.end["duration_s"] for c in cassettes if c.end.get("duration_s")]),
+        "replay_latency_s": summarize([r["latency_s"] for r in records if r["ok"]]),
+        "original_parse_failure_rate": original_failures / original_attempts if original_attempts else 0.0,
+        "replay_parse_failure_rate": replay_failures / replay_attempts if replay_attempts else 0.0,
+        "cassette_misses": sum(r.get("misses", 0) for r in records),
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    orig, rep = report["original_latency_s"], report["replay_latency_s"]
+    print("\n=== Cassette replay ===")
+    print(f"runs            {report['succeeded']}/{report['runs']} ok in {report['wall_time_s']:.2f}s")
+    for label, lat in (("original", orig), ("replay", rep)):
+        print(f"{label:<16}p50 {_fmt(lat['p50'], 1000, 'ms')}  p95 {_fmt(lat['p95'], 1000, 'ms')}  "
+              f"p99 {_fmt(lat['p99'], 1000, 'ms')}")
+    print(f"parse failures  original {report['original_parse_failure_rate']:.1%}  "
+          f"replay {report['replay_parse_failure_rate']:.1%}")
+    print(f"failed runs     original {report['original_errors']}  replay {report['replay_errors']}")
+    print(f"cassette misses {report['cassette_misses']}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay recorded planning runs offline")
+    parser.add_argument("cassettes", nargs="+", help="Cassette files or directories of *.jsonl")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="Scale for the original gaps between runs (0 = back to back)")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="Scale for recorded LLM/search latencies (0 = instant)")
+    parser.add_argument("--concurrency", type=int, default=10, help="Max runs in flight")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    report = asyncio.run(run_replay(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Microbenchmark: CPU spent turning a finished plan into the stored message
+and the HTTP response body.
+
+"before" is the pipeline as it was: TripPlan.model_dump() + json.dumps for
+add_message, then FastAPI's jsonable_encoder + JSONResponse for the response
+(and json.loads + the same encoding when a session is read back). "after" is
+the serialize-once pipeline in backend/serialization.py: one
+model_dump_json() whose text is both stored and spliced into the response.
+Both build the TripPlan the same way, so only the encoding differs.
+
+Usage:
+    python -m backend.benchmarks.serialization --iterations 2000 --days 7
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, Dict
+
+# Keep litellm from trying to download its model cost map on import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from ..models import UserQuery
+from ..orchestrator import Orchestrator
+from ..serialization import RawJSON, encode_model, json_response
+from .fakes import default_payloads
+from .load_test import use_temp_storage
+
+
+def build_result(days: int) -> Dict[str, Any]:
+    """A TravelAgent result shaped like a real one, with a `days`-day itinerary"""
+    payloads = {name: json.loads(text) for name, text in default_payloads().items()}
+    day = payloads["Itinerary"]["days"][0]
+    # As TravelAgent._post_process_results leaves them
+    hotels = [{**{k: v for k, v in h.items() if k != "style"},
+               "booking_url": "https://www.booking.com/searchresults.html?ss=Benchmark",
+               "image_url": "https://images.example.com/hotel.jpg"} for h in payloads["HotelList"]["hotels"]]
+    flights = {key: [{**f, "booking_url": "https://www.google.com/travel/flights?q=Benchmark"} for f in value]
+               for key, value in payloads["FlightList"].items()}
+    return {
+        **flights,
+        "hotels": hotels,
+        "visa": payloads["VisaInfo"],
+        "activities": [{k: v for k, v in a.items() if k != "category"}
+                       for a in payloads["ActivityList"]["activities"]],
+        "itinerary": [{**day, "day": d + 1} for d in range(days)],
+        "destination_images": [f"https://images.example.com/{i}.jpg" for i in range(3)],
+        "section_status": {s: "ok" for s in ("flights", "hotels", "visa", "activities", "itinerary")},
+    }
+
+
+def cpu_per_call(fn: Callable[[], Any], iterations: int) -> float:
+    """Process CPU time per call, in microseconds"""
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=7, help="Itinerary length of the benchmark plan")
+    args = parser.parse_args(argv)
+
+    use_temp_storage()
+    orchestrator = Orchestrator()
+    query = UserQuery(query="Plan a trip", destination="Benchmarkia", origin="Testville", days=args.days)
+    result = build_result(args.days)
+    plan = orchestrator._build_trip_plan(query, result)
+    session_id = "benchmark-session"
+
+    def write_before():
+        stored = json.dumps(plan.model_dump())
+        body = JSONResponse(jsonable_encoder({"session_id": session_id, "trip_plan": plan})).body
+        return stored, body
+
+    def write_after():
+        trip_plan = encode_model(plan)
+        body = json_response({"session_id": session_id, "trip_plan": trip_plan}).body
+        return trip_plan.text, body
+
+    stored = plan.model_dump_json()
+    row = {"id": 1, "session_id": session_id, "role": "assistant", "content": "I've planned your trip!",
+           "trip_plan": stored, "user_query": query.model_dump_json(), "created_at": "2025-01-01 00:00:00"}
+
+    def read_before():
+        message = {**row, "trip_plan": json.loads(row["trip_plan"]), "user_query": json.loads(row["user_query"])}
+        return JSONResponse(jsonable_encoder({"messages": [message]})).body
+
+    def read_after():
+        message = {**row, "trip_plan": RawJSON(row["trip_plan"]), "user_query": RawJSON(row["user_query"])}
+        return json_response({"messages": [message]}).body
+
+    # Same content either way
+    assert json.loads(write_before()[1]) == json.loads(write_after()[1])
+    assert json.loads(read_before()) == json.loads(read_after())
+
+    build = cpu_per_call(lambda: orchestrator._build_trip_plan(query, result), args.iterations)
+    rows = [
+        ("save + respond", cpu_per_call(write_before, args.iterations), cpu_per_call(write_after, args.iterations)),
+        ("read session", cpu_per_call(read_before, args.iterations), cpu_per_call(read_after, args.iterations)),
+    ]
+    print(f"=== Plan serialization ({args.days}-day plan, {len(stored) / 1024:.1f}KB JSON, "
+          f"{args.iterations} iterations) ===")
+    print(f"build TripPlan (both)  {build:9.1f}us")
+    for name, before, after in rows:
+        print(f"{name:<22} before {before:9.1f}us  after {after:9.1f}us  "
+              f"saved {before - after:9.1f}us ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Startup benchmark: how long a fresh API process takes to answer its first
+request.
+
+Each run is a new Python process (imports are cached per process) with its
+own empty database directory. It records:
+
+    import    import backend.main
+    startup   the app's startup hooks (schema creation, visa matrix, ...)
+    request   the first GET /sessions
+    total     process spawn to first response (time-to-first-request)
+    warmup    POST /warmup afterwards (loading the planning stack), with --warmup
+
+--eager imports backend.orchestrator ahead of the app, as backend.main used
+to at import time, to compare against the lazy imports. --restart boots a
+second time on the same database, where the schema check skips the DDL.
+
+Usage:
+    python -m backend.benchmarks.startup --runs 5 [--eager] [--warmup] [--restart] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+HEAVY_MODULES = ("google.adk", "litellm", "ddgs")
+
+
+def _child(spawned_at: float, database_path: str, eager: bool, warmup: bool) -> Dict[str, Any]:
+    """One boot, measured inside the fresh process"""
+    started = time.perf_counter()
+    if eager:
+        from .. import orchestrator  # noqa: F401
+    from .. import database as db
+    from .. import main
+    imported = time.perf_counter()
+    db.DATABASE_PATH = database_path
+
+    from fastapi.testclient import TestClient
+    with TestClient(main.app) as client:
+        booted = time.perf_counter()
+        response = client.get("/sessions")
+        answered = time.perf_counter()
+        first_response_at = time.time()
+        assert response.status_code == 200, response.text
+        heavy_loaded = [m for m in HEAVY_MODULES if m in sys.modules]
+        result = {
+            "import_ms": (imported - started) * 1000,
+            "startup_ms": (booted - imported) * 1000,
+            "request_ms": (answered - booted) * 1000,
+            "total_ms": (first_response_at - spawned_at) * 1000,
+            "heavy_modules_at_first_request": heavy_loaded,
+        }
+        if warmup:
+            warmed_from = time.perf_counter()
+            assert client.post("/warmup").status_code == 200
+            result["warmup_ms"] = (time.perf_counter() - warmed_from) * 1000
+    return result
+
+
+def boot(database_path: str, eager: bool = False, warmup: bool = False) -> Dict[str, Any]:
+    """Boot the app in a new process and return its timings"""
+    env = {**os.environ, "LITELLM_LOCAL_MODEL_COST_MAP": "True"}
+    command = [sys.executable, "-m", "backend.benchmarks.startup", "--child", str(time.time()), database_path]
+    if eager:
+        command.append("--eager")
+    if warmup:
+        command.append("--warmup")
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    # Startup hooks print too; the result is the last line
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, float]:
+    keys = [key for key in runs[0] if key.endswith("_ms")]
+    return {key: statistics.median(run[key] for run in runs) for key in keys}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--eager", action="store_true", help="Import the planning stack up front, as before")
+    parser.add_argument("--warmup", action="store_true", help="Also time POST /warmup after the first request")
+    parser.add_argument("--restart", action="store_true", help="Also time a second boot on the same database")
+    parser.add_argument("--output", help="Write every run's timings to this JSON file")
+    parser.add_argument("--child", nargs=2, metavar=("SPAWNED_AT", "DATABASE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_child(float(args.child[0]), args.child[1], args.eager, args.warmup)))
+        return
+
+    cold, restarts = [], []
+    for _ in range(args.runs):
+        database_path = os.path.join(tempfile.mkdtemp(prefix="travel-startup-"), "travel_agent.db")
+        cold.append(boot(database_path, args.eager, args.warmup))
+        if args.restart:
+            restarts.append(boot(database_path, args.eager))
+
+    print(f"=== Startup ({'eager' if args.eager else 'lazy'} imports, median of {args.runs} runs) ===")
+    for label, runs in (("first boot", cold), ("restart", restarts)):
+        if not runs:
+            continue
+        timings = summarize(runs)
+        print(f"{label:<11} " + "  ".join(f"{key[:-3]} {value:7.0f}ms" for key, value in timings.items()))
+    print(f"heavy modules loaded at first request: {cold[0]['heavy_modules_at_first_request'] or 'none'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"eager": args.eager, "first_boot": cold, "restart": restarts}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
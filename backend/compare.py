@@ -0,0 +1,94 @@
+"""
+Side-by-side destination comparison.
+
+Orchestrator.compare_destinations plans every candidate with one TravelAgent
+whose sections share a concurrency cap, and skips the itinerary (the summary
+only needs cost, visa and flight time, and the itinerary is the largest
+prompt). This module turns the resulting plans into ranked summaries.
+
+Ranking, best first: plans that didn't fail, then within the budget (when a
+strict budget was given), then cheapest, then no visa needed, then shortest
+outbound flight.
+"""
+import os
+import re
+from typing import Dict, List, Optional
+
+from .models import DestinationSummary, TripPlan
+from .money import parse_money
+
+# Sections running at once across all destinations of one comparison
+COMPARE_MAX_CONCURRENT_SECTIONS = int(os.getenv("TRAVEL_COMPARE_MAX_SECTIONS", "8"))
+COMPARE_MAX_DESTINATIONS = 6
+COMPARE_SECTIONS = ("flights", "hotels", "visa", "activities")
+
+_HOURS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:h|hr|hrs|hour|hours)\b", re.IGNORECASE)
+_MINUTES = re.compile(r"(\d+)\s*(?:m|min|mins|minute|minutes)\b", re.IGNORECASE)
+_CLOCK = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+
+
+def duration_minutes(duration: Optional[str]) -> Optional[int]:
+    """Minutes in a flight duration like "14h 30m", "7 hours" or "9:45"."""
+    if not duration:
+        return None
+    hours, minutes = _HOURS.search(duration), _MINUTES.search(duration)
+    if hours or minutes:
+        return int(float(hours.group(1)) * 60 if hours else 0) + int(minutes.group(1) if minutes else 0)
+    clock = _CLOCK.search(duration)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+    return None
+
+
+def summarize(destination: str, plan: Optional[TripPlan], budget: Optional[str], strict_budget: bool,
+              currency: str, error: Optional[str] = None) -> DestinationSummary:
+    """Summary row for one destination (rank filled in by rank_summaries)."""
+    if plan is None:
+        return DestinationSummary(rank=0, destination=destination, error=error or "Planning failed")
+
+    within_budget = None
+    limit = parse_money(budget, currency) if budget else None
+    if limit and limit.currency == currency and plan.cost and plan.cost.total > 0:
+        within_budget = plan.cost.total <= limit.amount
+
+    visa_required = plan.visa.required if plan.section_status.get("visa") == "ok" else None
+    flight = plan.outbound_flights[0] if plan.outbound_flights else None
+    return DestinationSummary(
+        rank=0,
+        destination=destination,
+        total_budget=plan.total_budget,
+        cost=plan.cost,
+        within_budget=within_budget,
+        visa_required=visa_required,
+        flight_duration=flight.duration if flight else None,
+        flight_duration_minutes=duration_minutes(flight.duration) if flight else None,
+        section_status=plan.section_status,
+    )
+
+
+def rank_summaries(summaries: List[DestinationSummary], strict_budget: bool) -> List[DestinationSummary]:
+    """Sort best first and number the ranks from 1."""
+    inf = float("inf")
+
+    def key(summary: DestinationSummary):
+        priced = summary.cost is not None and summary.cost.total > 0
+        return (
+            summary.error is not None,
+            strict_budget and summary.within_budget is False,
+            summary.cost.total if priced else inf,
+            summary.visa_required is not False,
+            summary.flight_duration_minutes if summary.flight_duration_minutes is not None else inf,
+        )
+
+    ranked = sorted(summaries, key=key)
+    return [summary.model_copy(update={"rank": i}) for i, summary in enumerate(ranked, start=1)]
+
+
+def unique_destinations(destinations: List[str]) -> List[str]:
+    """Drop blanks and repeats, keeping the user's order."""
+    seen: Dict[str, str] = {}
+    for destination in destinations:
+        name = destination.strip()
+        if name and name.lower() not in seen:
+            seen[name.lower()] = name
+    return list(seen.values())
@@ -1,17 +1,65 @@
 import sqlite3
 import json
+import uuid
+import zlib
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Union
 from contextlib import contextmanager
 import os
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'travel_agent.db')
 
+# Every session and memory belongs to a user; requests without one use this
+DEFAULT_USER_ID = "default_user"
+
+# With TRAVEL_DB_USER_SHARDS=N (N > 0), users' sessions, messages, trip costs
+# and memories live in N shard files next to DATABASE_PATH (travel_agent.shard00.db,
+# ...), picked by a hash of the user id. Shared tables (visa matrix, worker
+# checkpoints) stay in DATABASE_PATH. 0 keeps everything in one file. User
+# data already in DATABASE_PATH when sharding is turned on is moved into the
+# shards at startup (migrate_to_shards); turning sharding off again, or
+# changing N, does not move it back.
+USER_SHARDS = int(os.getenv("TRAVEL_DB_USER_SHARDS", "0"))
+
+# Per-user counters bumped by every memory write, so in-memory memory caches know to reload
+_memory_versions: Dict[str, int] = {}
+
+# Bump whenever init_db's DDL changes: files at this version skip the DDL
+# entirely, older ones run it (CREATE ... IF NOT EXISTS plus the ALTER
+# migrations) and are stamped with it (PRAGMA user_version)
+SCHEMA_VERSION = 3
+
+# Database files whose schema has been checked in this process
+_initialized_paths = set()
+
+
+def shard_for(user_id: str) -> Optional[int]:
+    """The shard holding a user's data (None when sharding is off)"""
+    if USER_SHARDS <= 0:
+        return None
+    return zlib.crc32((user_id or DEFAULT_USER_ID).encode()) % USER_SHARDS
+
+
+def all_shards() -> List[Optional[int]]:
+    """Every shard, for work that spans users (None is the single unsharded file)"""
+    return list(range(USER_SHARDS)) if USER_SHARDS > 0 else [None]
+
+
+def shard_path(shard: Optional[int]) -> str:
+    if shard is None:
+        return DATABASE_PATH
+    base, ext = os.path.splitext(DATABASE_PATH)
+    return f"{base}.shard{shard:02d}{ext}"
+
 
 @contextmanager
-def get_db():
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_PATH)
+def get_db(shard: Optional[int] = None):
+    """Context manager for database connections (the main file, or a user shard)"""
+    path = shard_path(shard)
+    if path not in _initialized_paths:
+        _initialized_paths.add(path)
+        init_db(shard)
+    conn = sqlite3.connect(path)
     conn.row_factory = sqlite3.Row
     try:
         yield conn
@@ -23,15 +71,28 @@ def get_db():
         conn.close()
 
 
-def init_db():
-    """Initialize database tables"""
-    with get_db() as conn:
+def user_db(user_id: str):
+    """Connection to the database file holding a user's data"""
+    return get_db(shard_for(user_id))
+
+
+def init_db(shard: Optional[int] = None):
+    """
+    Initialize database tables (every file gets the full schema). A file
+    already at SCHEMA_VERSION is left alone, so this is one PRAGMA read on
+    every start after the first.
+    """
+    _initialized_paths.add(shard_path(shard))
+    with get_db(shard) as conn:
         cursor = conn.cursor()
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
 
         # Chat sessions table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chat_sessions (
                 id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL DEFAULT 'default_user',
                 title TEXT NOT NULL,
                 destination TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -65,61 +126,220 @@ def init_db():
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS user_memories (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL DEFAULT 'default_user',
                 memory_type TEXT NOT NULL,
                 content TEXT NOT NULL,
                 confidence REAL DEFAULT 1.0,
                 source_session_id TEXT,
+                content_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                decayed_at TIMESTAMP,
                 FOREIGN KEY (source_session_id) REFERENCES chat_sessions(id) ON DELETE SET NULL
             )
         ''')
 
+        # Add dedupe/decay columns if they don't exist (for existing databases)
+        for column in ('content_hash TEXT', 'decayed_at TIMESTAMP'):
+            try:
+                cursor.execute(f'ALTER TABLE user_memories ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                # Column already exists, ignore
+                pass
+
+        # Add owner columns if they don't exist (existing rows belong to the default user)
+        for table in ('chat_sessions', 'user_memories'):
+            try:
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT 'default_user'")
+            except sqlite3.OperationalError:
+                # Column already exists, ignore
+                pass
+
         # Create indexes for better performance
         cursor.execute(
             'CREATE INDEX IF NOT EXISTS idx_messages_session ON chat_messages(session_id)')
+        # Per-user reads lead on user_id, so they only touch that user's rows;
+        # top-k memories (optionally per type) walk the index in order, without a sort
+        for index in ('idx_memories_type', 'idx_memories_rank', 'idx_memories_type_rank', 'idx_memories_hash'):
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
         cursor.execute(
-            'CREATE INDEX IF NOT EXISTS idx_memories_type ON user_memories(memory_type)')
+            'CREATE INDEX IF NOT EXISTS idx_sessions_user ON chat_sessions(user_id, updated_at DESC)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_memories_user_rank ON user_memories(user_id, confidence DESC, updated_at DESC)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_memories_user_type_rank ON user_memories(user_id, memory_type, confidence DESC, updated_at DESC)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_memories_user_hash ON user_memories(user_id, content_hash)')
 
-        print("[Database] Initialized successfully")
+        # Visa matrix: cached visa rules per (origin country, destination country)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS visa_matrix (
+                origin_code TEXT NOT NULL,
+                destination_code TEXT NOT NULL,
+                origin TEXT,
+                destination TEXT,
+                visa_info TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (origin_code, destination_code)
+            )
+        ''')
+
+        # Trip costs: parsed once per saved plan, for budget analytics
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS trip_costs (
+                message_id INTEGER PRIMARY KEY,
+                session_id TEXT NOT NULL,
+                destination TEXT,
+                destination_key TEXT,
+                travel_month TEXT,
+                currency TEXT NOT NULL,
+                total REAL NOT NULL,
+                flights REAL DEFAULT 0,
+                hotels REAL DEFAULT 0,
+                activities REAL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (message_id) REFERENCES chat_messages(id) ON DELETE CASCADE
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_trip_costs_destination ON trip_costs(destination_key, travel_month)')
+
+        # Memory vectors: hashed embeddings for relevance-ranked memory retrieval
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS memory_vectors (
+                memory_id INTEGER PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                FOREIGN KEY (memory_id) REFERENCES user_memories(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Background worker progress, e.g. the last chat message memories were extracted from
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS worker_checkpoints (
+                name TEXT PRIMARY KEY,
+                last_message_id INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Session archive: where an idle session's messages went in the cold segment files (see archive.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS session_archive (
+                session_id TEXT PRIMARY KEY,
+                segment TEXT NOT NULL,
+                byte_offset INTEGER NOT NULL,
+                byte_length INTEGER NOT NULL,
+                message_count INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Search snippets: every web search result, BM25-searchable (see agents/tools/snippet_index.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS search_snippets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                href TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                body TEXT NOT NULL,
+                destination TEXT,
+                origin TEXT,
+                query TEXT,
+                fetched_at REAL NOT NULL
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_snippets_destination ON search_snippets(destination, fetched_at)')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_snippets_fetched ON search_snippets(fetched_at)')
+        try:
+            # External-content FTS5 index over the rows above, kept in sync by triggers
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_snippets_fts USING fts5(
+                    title, body, query, content='search_snippets', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS search_snippets_ai AFTER INSERT ON search_snippets BEGIN
+                    INSERT INTO search_snippets_fts (rowid, title, body, query) VALUES (new.id, new.title, new.body, new.query);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS search_snippets_ad AFTER DELETE ON search_snippets BEGIN
+                    INSERT INTO search_snippets_fts (search_snippets_fts, rowid, title, body, query)
+                    VALUES ('delete', old.id, old.title, old.body, old.query);
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS search_snippets_au AFTER UPDATE ON search_snippets BEGIN
+                    INSERT INTO search_snippets_fts (search_snippets_fts, rowid, title, body, query)
+                    VALUES ('delete', old.id, old.title, old.body, old.query);
+                    INSERT INTO search_snippets_fts (rowid, title, body, query) VALUES (new.id, new.title, new.body, new.query);
+                END
+            ''')
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: searches just never hit the snippet index
+            print(f"[Database] Search snippet index unavailable: {e}")
+
+        # Section latencies: how long each planning section took (see agents/deadlines.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS section_latencies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                section TEXT NOT NULL,
+                region TEXT,
+                seconds REAL NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+        ''')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_section_latencies_recorded ON section_latencies(recorded_at)')
+
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        print(f"[Database] Initialized successfully (schema v{SCHEMA_VERSION})"
+              f"{f' (shard {shard})' if shard is not None else ''}")
 
 # Chat Session Functions
 
 
-def create_session(session_id: str, title: str, destination: str = None) -> Dict[str, Any]:
-    """Create a new chat session"""
-    with get_db() as conn:
+def create_session(session_id: str, title: str, destination: str = None,
+                   user_id: str = DEFAULT_USER_ID) -> Dict[str, Any]:
+    """Create a new chat session for a user"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            'INSERT INTO chat_sessions (id, title, destination) VALUES (?, ?, ?)',
-            (session_id, title, destination)
+            'INSERT INTO chat_sessions (id, user_id, title, destination) VALUES (?, ?, ?, ?)',
+            (session_id, user_id, title, destination)
         )
-        return get_session(session_id)
+    return get_session(session_id, user_id)
 
 
-def get_session(session_id: str) -> Optional[Dict[str, Any]]:
-    """Get a chat session by ID"""
-    with get_db() as conn:
+def get_session(session_id: str, user_id: str = DEFAULT_USER_ID) -> Optional[Dict[str, Any]]:
+    """Get one of a user's chat sessions by ID (None if it isn't theirs)"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT * FROM chat_sessions WHERE id = ?', (session_id,))
+            'SELECT * FROM chat_sessions WHERE id = ? AND user_id = ?', (session_id, user_id))
         row = cursor.fetchone()
         if row:
             return dict(row)
         return None
 
 
-def get_all_sessions() -> List[Dict[str, Any]]:
-    """Get all chat sessions, ordered by most recent"""
-    with get_db() as conn:
+def get_all_sessions(user_id: str = DEFAULT_USER_ID) -> List[Dict[str, Any]]:
+    """Get a user's chat sessions, ordered by most recent"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM chat_sessions ORDER BY updated_at DESC')
+        cursor.execute('SELECT * FROM chat_sessions WHERE user_id = ? ORDER BY updated_at DESC', (user_id,))
         return [dict(row) for row in cursor.fetchall()]
 
 
-def update_session(session_id: str, title: str = None, destination: str = None):
+def update_session(session_id: str, title: str = None, destination: str = None,
+                   user_id: str = DEFAULT_USER_ID):
     """Update a chat session"""
-    with get_db() as conn:
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
         updates = []
         params = []
@@ -132,31 +352,56 @@ def update_session(session_id: str, title: str = None, destination: str = None):
             params.append(destination)
 
         updates.append('updated_at = CURRENT_TIMESTAMP')
-        params.append(session_id)
+        params.extend([session_id, user_id])
 
         cursor.execute(
-            f'UPDATE chat_sessions SET {", ".join(updates)} WHERE id = ?',
+            f'UPDATE chat_sessions SET {", ".join(updates)} WHERE id = ? AND user_id = ?',
             params
         )
 
 
-def delete_session(session_id: str) -> bool:
-    """Delete a chat session and its messages"""
-    with get_db() as conn:
+def delete_session(session_id: str, user_id: str = DEFAULT_USER_ID) -> bool:
+    """Delete one of a user's chat sessions and its messages"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
+        cursor.execute(
+            'SELECT 1 FROM chat_sessions WHERE id = ? AND user_id = ?', (session_id, user_id))
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            'DELETE FROM trip_costs WHERE session_id = ?', (session_id,))
         cursor.execute(
             'DELETE FROM chat_messages WHERE session_id = ?', (session_id,))
+        # Archived bytes stay in their append-only segment; only the pointer goes
+        cursor.execute(
+            'DELETE FROM session_archive WHERE session_id = ?', (session_id,))
         cursor.execute('DELETE FROM chat_sessions WHERE id = ?', (session_id,))
         return cursor.rowcount > 0
 
 # Chat Message Functions
 
 
-def add_message(session_id: str, role: str, content: str, trip_plan: Dict = None, user_query: Dict = None) -> Dict[str, Any]:
-    """Add a message to a session"""
-    with get_db() as conn:
+def _decode_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    if msg['trip_plan']:
+        msg['trip_plan'] = json.loads(msg['trip_plan'])
+    if msg['user_query']:
+        msg['user_query'] = json.loads(msg['user_query'])
+    return msg
+
+
+def add_message(session_id: str, role: str, content: str, trip_plan: Union[Dict, str] = None,
+                user_query: Dict = None, user_id: str = DEFAULT_USER_ID) -> Dict[str, Any]:
+    """
+    Add a message to a session (bringing the session back from the archive
+    first if it was archived). trip_plan may be already-encoded JSON text.
+    """
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
-        trip_plan_json = json.dumps(trip_plan) if trip_plan else None
+        _restore_archived_session(cursor, session_id, shard_for(user_id))
+        if isinstance(trip_plan, str):
+            trip_plan_json = trip_plan
+        else:
+            trip_plan_json = json.dumps(trip_plan) if trip_plan else None
         user_query_json = json.dumps(user_query) if user_query else None
         cursor.execute(
             'INSERT INTO chat_messages (session_id, role, content, trip_plan, user_query) VALUES (?, ?, ?, ?, ?)',
@@ -177,87 +422,697 @@ def add_message(session_id: str, role: str, content: str, trip_plan: Dict = None
         }
 
 
-def get_session_messages(session_id: str) -> List[Dict[str, Any]]:
-    """Get all messages for a session"""
-    with get_db() as conn:
+def get_session_messages(session_id: str, user_id: str = DEFAULT_USER_ID, decode: bool = True) -> List[Dict[str, Any]]:
+    """
+    Get all messages for a session (read from its archive segment if it was
+    archived). With decode=False, trip_plan and user_query stay JSON text.
+    """
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        location = _archive_location(cursor, session_id)
+        if location is None:
+            cursor.execute(
+                'SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC',
+                (session_id,)
+            )
+            messages = [dict(row) for row in cursor.fetchall()]
+        else:
+            messages = None
+    if messages is None:
+        from .archive import read_archived_messages
+        messages = read_archived_messages(shard_for(user_id), location)
+    return [_decode_message(msg) for msg in messages] if decode else messages
+
+# Session Archive Functions
+
+
+def _archive_location(cursor: sqlite3.Cursor, session_id: str) -> Optional[Dict[str, Any]]:
+    cursor.execute('SELECT * FROM session_archive WHERE session_id = ?', (session_id,))
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def _restore_archived_session(cursor: sqlite3.Cursor, session_id: str, shard: Optional[int]):
+    """Move an archived session's messages back into chat_messages, keeping their ids"""
+    location = _archive_location(cursor, session_id)
+    if location is None:
+        return
+    from .archive import read_archived_messages
+    messages = read_archived_messages(shard, location)
+    cursor.executemany(
+        '''INSERT OR IGNORE INTO chat_messages (id, session_id, role, content, trip_plan, user_query, created_at)
+           VALUES (:id, :session_id, :role, :content, :trip_plan, :user_query, :created_at)''',
+        messages
+    )
+    cursor.execute('DELETE FROM session_archive WHERE session_id = ?', (session_id,))
+    print(f"[Database] Restored {len(messages)} archived messages of session {session_id}")
+
+
+def get_idle_sessions(days: float, limit: int, shard: Optional[int] = None) -> List[str]:
+    """Ids of sessions untouched for `days` that still have messages in the hot table, oldest first"""
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT s.id FROM chat_sessions s
+               WHERE s.updated_at < datetime('now', ?)
+                 AND NOT EXISTS (SELECT 1 FROM session_archive a WHERE a.session_id = s.id)
+                 AND EXISTS (SELECT 1 FROM chat_messages m WHERE m.session_id = s.id)
+               ORDER BY s.updated_at ASC LIMIT ?''',
+            (f'-{days} days', limit)
+        )
+        return [row['id'] for row in cursor.fetchall()]
+
+
+def get_raw_session_messages(session_id: str, shard: Optional[int] = None) -> List[Dict[str, Any]]:
+    """A session's message rows as stored (JSON columns left encoded), for archiving"""
+    with get_db(shard) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            'SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC',
+            'SELECT * FROM chat_messages WHERE session_id = ? ORDER BY created_at ASC, id ASC',
             (session_id,)
         )
-        messages = []
-        for row in cursor.fetchall():
-            msg = dict(row)
-            if msg['trip_plan']:
-                msg['trip_plan'] = json.loads(msg['trip_plan'])
-            if msg['user_query']:
-                msg['user_query'] = json.loads(msg['user_query'])
-            messages.append(msg)
-        return messages
+        return [dict(row) for row in cursor.fetchall()]
 
-# Memory Functions
+
+def mark_session_archived(session_id: str, segment: str, byte_offset: int, byte_length: int, message_ids: List[int],
+                          shard: Optional[int] = None) -> bool:
+    """
+    Point a session at its archive record and drop its hot messages, in one
+    transaction. Returns False (changing nothing) if the session got new
+    messages since they were read.
+    """
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id FROM chat_messages WHERE session_id = ?', (session_id,))
+        if sorted(row['id'] for row in cursor.fetchall()) != sorted(message_ids):
+            return False
+        cursor.execute(
+            '''INSERT INTO session_archive (session_id, segment, byte_offset, byte_length, message_count)
+               VALUES (?, ?, ?, ?, ?)''',
+            (session_id, segment, byte_offset, byte_length, len(message_ids))
+        )
+        cursor.execute('DELETE FROM chat_messages WHERE session_id = ?', (session_id,))
+        return True
 
 
-def add_memory(memory_type: str, content: str, source_session_id: str = None, confidence: float = 1.0) -> Dict[str, Any]:
-    """Add a new memory"""
-    with get_db() as conn:
+def vacuum(shard: Optional[int] = None):
+    """Rebuild a database file so space freed by archiving goes back to the filesystem"""
+    conn = sqlite3.connect(shard_path(shard))
+    try:
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+# Trip Cost Functions
+
+
+def add_trip_cost(message_id: int, session_id: str, destination: str, destination_key: str, cost: Dict,
+                  user_id: str = DEFAULT_USER_ID):
+    """Store the parsed cost of a saved trip plan (next to the plan, in the user's shard)"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
         cursor.execute(
-            'INSERT INTO user_memories (memory_type, content, source_session_id, confidence) VALUES (?, ?, ?, ?)',
-            (memory_type, content, source_session_id, confidence)
+            '''INSERT OR REPLACE INTO trip_costs
+               (message_id, session_id, destination, destination_key, travel_month, currency, total, flights, hotels, activities)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+            (message_id, session_id, destination, destination_key, cost.get('travel_month'), cost['currency'],
+             cost['total'], cost.get('flights', 0.0), cost.get('hotels', 0.0), cost.get('activities', 0.0))
         )
-        return {
-            'id': cursor.lastrowid,
-            'memory_type': memory_type,
-            'content': content,
-            'confidence': confidence
-        }
 
 
-def get_memories(memory_type: str = None, limit: int = 20) -> List[Dict[str, Any]]:
-    """Get user memories, optionally filtered by type"""
+def get_trip_costs(destination_key: str = None, currency: str = None) -> List[Dict[str, Any]]:
+    """Get priced trip costs (total > 0) across all users, optionally for one destination/currency"""
+    query = 'SELECT * FROM trip_costs WHERE total > 0'
+    params = []
+    if destination_key:
+        query += ' AND destination_key = ?'
+        params.append(destination_key)
+    if currency:
+        query += ' AND currency = ?'
+        params.append(currency)
+    rows = []
+    for shard in all_shards():
+        with get_db(shard) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows.extend(dict(row) for row in cursor.fetchall())
+    return rows
+
+
+def _plan_message(row: sqlite3.Row) -> Dict[str, Any]:
+    msg = dict(row)
+    msg['trip_plan'] = json.loads(msg['trip_plan'])
+    msg['user_query'] = json.loads(msg['user_query']) if msg['user_query'] else {}
+    return msg
+
+
+def get_unpriced_plan_messages() -> List[Dict[str, Any]]:
+    """Assistant messages (of every user) with a trip plan but no trip_costs row, with the user query that led to them"""
+    messages = []
+    for shard in all_shards():
+        with get_db(shard) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT m.id, m.session_id, s.user_id, m.trip_plan, m.created_at,
+                       (SELECT u.user_query FROM chat_messages u
+                        WHERE u.session_id = m.session_id AND u.role = 'user' AND u.id < m.id
+                        ORDER BY u.id DESC LIMIT 1) AS user_query
+                FROM chat_messages m
+                JOIN chat_sessions s ON s.id = m.session_id
+                LEFT JOIN trip_costs c ON c.message_id = m.id
+                WHERE m.trip_plan IS NOT NULL AND c.message_id IS NULL
+            ''')
+            messages.extend(_plan_message(row) for row in cursor.fetchall())
+    return messages
+
+
+def get_plan_messages_after(message_id: int, limit: int, shard: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Assistant messages in one shard with a trip plan after message_id, oldest
+    first, with their owner and the user query that led to them
+    """
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT m.id, m.session_id, s.user_id, m.trip_plan, m.created_at,
+                   (SELECT u.user_query FROM chat_messages u
+                    WHERE u.session_id = m.session_id AND u.role = 'user' AND u.id < m.id
+                    ORDER BY u.id DESC LIMIT 1) AS user_query
+            FROM chat_messages m
+            JOIN chat_sessions s ON s.id = m.session_id
+            WHERE m.role = 'assistant' AND m.trip_plan IS NOT NULL AND m.id > ?
+            ORDER BY m.id ASC LIMIT ?
+        ''', (message_id, limit))
+        return [_plan_message(row) for row in cursor.fetchall()]
+
+# Worker Checkpoint Functions
+
+
+def get_checkpoint(name: str, shard: Optional[int] = None) -> int:
+    """Last message id (or line) a background worker or import has processed (0 if it never ran)"""
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT last_message_id FROM worker_checkpoints WHERE name = ?', (name,))
+        row = cursor.fetchone()
+        return row['last_message_id'] if row else 0
+
+
+def _set_checkpoint(cursor: sqlite3.Cursor, name: str, message_id: int):
+    cursor.execute(
+        '''INSERT INTO worker_checkpoints (name, last_message_id, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(name) DO UPDATE SET last_message_id = excluded.last_message_id,
+                                           updated_at = CURRENT_TIMESTAMP''',
+        (name, message_id)
+    )
+
+
+def set_checkpoint(name: str, message_id: int):
+    """Record a background worker's progress"""
     with get_db() as conn:
+        _set_checkpoint(conn.cursor(), name, message_id)
+
+# Memory Functions
+
+
+def memory_version(user_id: str = DEFAULT_USER_ID) -> int:
+    """Counter bumped whenever a user's memories change"""
+    return _memory_versions.get(user_id, 0)
+
+
+def _memories_changed(user_ids: Iterable[str]):
+    for user_id in user_ids:
+        _memory_versions[user_id] = _memory_versions.get(user_id, 0) + 1
+
+
+def add_memory(memory_type: str, content: str, source_session_id: str = None, confidence: float = 1.0,
+               content_hash: str = None, user_id: str = DEFAULT_USER_ID) -> Dict[str, Any]:
+    """Add a new memory (use memory_store.upsert_memory to merge duplicates instead)"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''INSERT INTO user_memories (user_id, memory_type, content, source_session_id, confidence, content_hash)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            (user_id, memory_type, content, source_session_id, confidence, content_hash)
+        )
+        memory_id = cursor.lastrowid
+    _memories_changed([user_id])
+    return {
+        'id': memory_id,
+        'memory_type': memory_type,
+        'content': content,
+        'confidence': confidence
+    }
+
+
+def get_memories(memory_type: str = None, limit: int = 20, user_id: str = DEFAULT_USER_ID) -> List[Dict[str, Any]]:
+    """Get a user's memories, optionally filtered by type"""
+    with user_db(user_id) as conn:
         cursor = conn.cursor()
         if memory_type:
             cursor.execute(
-                'SELECT * FROM user_memories WHERE memory_type = ? ORDER BY confidence DESC, updated_at DESC LIMIT ?',
-                (memory_type, limit)
+                '''SELECT * FROM user_memories WHERE user_id = ? AND memory_type = ?
+                   ORDER BY confidence DESC, updated_at DESC LIMIT ?''',
+                (user_id, memory_type, limit)
             )
         else:
             cursor.execute(
-                'SELECT * FROM user_memories ORDER BY confidence DESC, updated_at DESC LIMIT ?',
-                (limit,)
+                'SELECT * FROM user_memories WHERE user_id = ? ORDER BY confidence DESC, updated_at DESC LIMIT ?',
+                (user_id, limit)
             )
         return [dict(row) for row in cursor.fetchall()]
 
 
-def get_all_memories_for_context() -> str:
-    """Get all memories formatted for LLM context"""
-    memories = get_memories(limit=50)
-    if not memories:
-        return ""
+def get_all_memories_for_context(query: Dict[str, Any] = None, user_id: str = DEFAULT_USER_ID) -> str:
+    """Get the user's memories most relevant to a trip query, formatted for LLM context (see memory_index)"""
+    from .memory_index import memory_index_for
+    return memory_index_for(user_id).context_for(query or {})
+
+
+def delete_memory(memory_id: int, user_id: str = DEFAULT_USER_ID) -> bool:
+    """Delete one of a user's memories"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM user_memories WHERE id = ? AND user_id = ?', (memory_id, user_id))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            cursor.execute('DELETE FROM memory_vectors WHERE memory_id = ?', (memory_id,))
+    _memories_changed([user_id])
+    return deleted
+
+
+def clear_all_memories(user_id: str = DEFAULT_USER_ID) -> int:
+    """Clear all of a user's memories"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'DELETE FROM memory_vectors WHERE memory_id IN (SELECT id FROM user_memories WHERE user_id = ?)',
+            (user_id,))
+        cursor.execute('DELETE FROM user_memories WHERE user_id = ?', (user_id,))
+        deleted = cursor.rowcount
+    _memories_changed([user_id])
+    return deleted
+
+
+def get_memory_by_hash(content_hash: str, user_id: str = DEFAULT_USER_ID) -> Optional[Dict[str, Any]]:
+    """The user's strongest memory with this normalized content hash"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT * FROM user_memories WHERE user_id = ? AND content_hash = ? ORDER BY confidence DESC LIMIT 1',
+            (user_id, content_hash)
+        )
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
 
-    memory_text = "User preferences and past information:\n"
-    for mem in memories:
-        memory_text += f"- [{mem['memory_type']}]: {mem['content']}\n"
-    return memory_text
+def reinforce_memory(memory_id: int, confidence: float, user_id: str = DEFAULT_USER_ID) -> Optional[Dict[str, Any]]:
+    """Set a memory's merged confidence and mark it as seen now. None if the memory is gone."""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''UPDATE user_memories SET confidence = ?, updated_at = CURRENT_TIMESTAMP, decayed_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND user_id = ?''',
+            (confidence, memory_id, user_id)
+        )
+        cursor.execute('SELECT id, memory_type, content, confidence FROM user_memories WHERE id = ? AND user_id = ?',
+                       (memory_id, user_id))
+        row = cursor.fetchone()
+    if row is None:
+        # Deleted since it was looked up (e.g. by a compaction pass)
+        return None
+    _memories_changed([user_id])
+    return dict(row)
 
 
-def delete_memory(memory_id: int) -> bool:
-    """Delete a specific memory"""
+def get_memories_for_compaction(shard: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Every memory in a shard (of every user there) with the fields the decay/compaction pass needs"""
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT id, user_id, memory_type, content, content_hash, confidence, updated_at,
+                      COALESCE(decayed_at, updated_at) AS decayed_at
+               FROM user_memories'''
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def apply_memory_compaction(updates: List[tuple], deleted: List[tuple], shard: Optional[int] = None,
+                            user_ids: Iterable[str] = ()) -> int:
+    """
+    Apply one shard's compaction pass in one transaction: (confidence,
+    content_hash, id, *seen) updates and (id, *seen) deletions, where seen is
+    the (confidence, updated_at, decayed_at) the pass read. Rows changed since
+    then (a memory reinforced mid-pass) are left alone for the next pass.
+    user_ids are the users it touched. Returns how many rows were left alone.
+    """
+    unchanged = 'id = ? AND confidence IS ? AND updated_at IS ? AND COALESCE(decayed_at, updated_at) IS ?'
+    skipped = 0
+    with get_db(shard) as conn:
+        cursor = conn.cursor()
+        for update in updates:
+            cursor.execute(
+                f'''UPDATE user_memories SET confidence = ?, content_hash = ?, decayed_at = CURRENT_TIMESTAMP
+                    WHERE {unchanged}''',
+                update
+            )
+            skipped += cursor.rowcount == 0
+        for row in deleted:
+            cursor.execute(f'DELETE FROM user_memories WHERE {unchanged}', row)
+            if cursor.rowcount:
+                cursor.execute('DELETE FROM memory_vectors WHERE memory_id = ?', (row[0],))
+            else:
+                skipped += 1
+    _memories_changed(user_ids)
+    return skipped
+
+
+def get_memories_with_vectors(user_id: str = DEFAULT_USER_ID) -> List[Dict[str, Any]]:
+    """Get every memory of a user with its stored vector (None when not embedded yet)"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT m.id, m.memory_type, m.content, m.confidence, v.dim, v.vector
+               FROM user_memories m LEFT JOIN memory_vectors v ON v.memory_id = m.id
+               WHERE m.user_id = ?''',
+            (user_id,)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def save_memory_vectors(vectors: List[tuple], user_id: str = DEFAULT_USER_ID):
+    """Store (memory_id, dim, vector bytes) rows of a user's memories"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            'INSERT OR REPLACE INTO memory_vectors (memory_id, dim, vector) VALUES (?, ?, ?)',
+            vectors
+        )
+
+# Export / Import Functions
+
+
+def get_sessions_page(user_id: str, after_id: str, limit: int) -> List[Dict[str, Any]]:
+    """A page of a user's sessions in id order, after after_id (keyset pagination for streaming export)"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT * FROM chat_sessions WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?',
+            (user_id, after_id, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def get_raw_messages_page(session_id: str, after_id: int, limit: int,
+                          user_id: str = DEFAULT_USER_ID) -> List[Dict[str, Any]]:
+    """A page of a session's hot message rows as stored (JSON columns left encoded), in id order"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT * FROM chat_messages WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?',
+            (session_id, after_id, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def get_archive_location(session_id: str, user_id: str = DEFAULT_USER_ID) -> Optional[Dict[str, Any]]:
+    """The session_archive entry of an archived session (None if its messages are hot)"""
+    with user_db(user_id) as conn:
+        return _archive_location(conn.cursor(), session_id)
+
+
+def get_memories_page(user_id: str, after_id: int, limit: int) -> List[Dict[str, Any]]:
+    """A page of a user's memories in id order"""
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT id, memory_type, content, confidence, source_session_id, content_hash,
+                      created_at, updated_at, decayed_at
+               FROM user_memories WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?''',
+            (user_id, after_id, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def _imported_session_id(cursor: sqlite3.Cursor, session_id: str, user_id: str) -> str:
+    """
+    The id an imported session gets: its own, unless another user already has
+    a session with that id (e.g. importing into a second user of the same
+    database); then a stable id derived from both, so resumed imports agree.
+    """
+    cursor.execute('SELECT user_id FROM chat_sessions WHERE id = ?', (session_id,))
+    row = cursor.fetchone()
+    if row is None or row['user_id'] == user_id:
+        return session_id
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{user_id}/{session_id}"))
+
+
+def import_batch(user_id: str, sessions: List[Dict[str, Any]], messages: List[Dict[str, Any]],
+                 memories: List[Dict[str, Any]], checkpoint: str, line: int) -> Dict[str, int]:
+    """
+    Write one batch of imported rows for a user and record `line` as the
+    import's checkpoint, in one transaction. Sessions that already exist are
+    kept, and memories whose content hash the user already has are skipped.
+    Messages get new ids.
+    """
+    with user_db(user_id) as conn:
+        cursor = conn.cursor()
+        counts = {"sessions": 0, "messages": 0, "memories": 0}
+        session_ids: Dict[str, str] = {}
+
+        def target(session_id: str) -> str:
+            if session_id not in session_ids:
+                session_ids[session_id] = _imported_session_id(cursor, session_id, user_id)
+            return session_ids[session_id]
+
+        for session in sessions:
+            cursor.execute(
+                '''INSERT OR IGNORE INTO chat_sessions (id, user_id, title, destination, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))''',
+                (target(session['id']), user_id, session.get('title') or "Imported trip", session.get('destination'),
+                 session.get('created_at'), session.get('updated_at'))
+            )
+            counts["sessions"] += cursor.rowcount
+        for message in messages:
+            session_id = target(message['session_id'])
+            cursor.execute(
+                '''INSERT INTO chat_messages (session_id, role, content, trip_plan, user_query, created_at)
+                   SELECT ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP)
+                   WHERE EXISTS (SELECT 1 FROM chat_sessions WHERE id = ? AND user_id = ?)''',
+                (session_id, message['role'], message['content'], message.get('trip_plan'),
+                 message.get('user_query'), message.get('created_at'), session_id, user_id)
+            )
+            counts["messages"] += cursor.rowcount
+        for memory in memories:
+            cursor.execute(
+                '''INSERT INTO user_memories (user_id, memory_type, content, confidence, content_hash,
+                                              created_at, updated_at, decayed_at)
+                   SELECT ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?
+                   WHERE NOT EXISTS (SELECT 1 FROM user_memories WHERE user_id = ? AND content_hash = ?)''',
+                (user_id, memory['memory_type'], memory['content'], memory.get('confidence', 1.0),
+                 memory['content_hash'], memory.get('created_at'), memory.get('updated_at'),
+                 memory.get('decayed_at'), user_id, memory['content_hash'])
+            )
+            counts["memories"] += cursor.rowcount
+        _set_checkpoint(cursor, checkpoint, line)
+    if counts["memories"]:
+        _memories_changed([user_id])
+    return counts
+
+# Visa Matrix Functions
+
+
+def upsert_visa_entry(origin_code: str, destination_code: str, visa_info: Dict,
+                      origin: str = None, destination: str = None) -> Dict[str, Any]:
+    """Insert or replace the visa rules for a country pair"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM user_memories WHERE id = ?', (memory_id,))
-        return cursor.rowcount > 0
+        cursor.execute(
+            '''INSERT INTO visa_matrix (origin_code, destination_code, origin, destination, visa_info, updated_at)
+               VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT(origin_code, destination_code) DO UPDATE SET
+                   origin = excluded.origin, destination = excluded.destination,
+                   visa_info = excluded.visa_info, updated_at = excluded.updated_at''',
+            (origin_code, destination_code, origin, destination, json.dumps(visa_info))
+        )
+        cursor.execute(
+            'SELECT * FROM visa_matrix WHERE origin_code = ? AND destination_code = ?',
+            (origin_code, destination_code)
+        )
+        entry = dict(cursor.fetchone())
+        entry['visa_info'] = visa_info
+        return entry
+
+
+def get_visa_entries() -> List[Dict[str, Any]]:
+    """Get the whole visa matrix"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM visa_matrix')
+        entries = []
+        for row in cursor.fetchall():
+            entry = dict(row)
+            entry['visa_info'] = json.loads(entry['visa_info'])
+            entries.append(entry)
+        return entries
+
+
+# Search Snippet Functions
+
+
+def upsert_search_snippets(snippets: List[Dict[str, Any]], destination: Optional[str], query: str,
+                           fetched_at: float, origin: Optional[str] = None) -> int:
+    """Store search results (title/href/body), replacing earlier copies of the same page"""
+    rows = [(s['href'], s['title'], s['body'], destination, origin, query, fetched_at) for s in snippets]
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            '''INSERT INTO search_snippets (href, title, body, destination, origin, query, fetched_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(href) DO UPDATE SET
+                   title = excluded.title, body = excluded.body, destination = excluded.destination,
+                   origin = excluded.origin, query = excluded.query, fetched_at = excluded.fetched_at''',
+            rows
+        )
+        return len(rows)
+
 
+def match_search_snippets(match: str, destination: Optional[str], fetched_after: float,
+                          limit: int, origin: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Snippets matching an FTS5 query, fetched after `fetched_after` (and for
+    `destination` / `origin` when given), best BM25 score first. Title hits
+    weigh double; the query that fetched a snippet counts like its body.
+    """
+    sql = '''SELECT s.*, bm25(search_snippets_fts, 2.0, 1.0, 1.0) AS score
+             FROM search_snippets_fts JOIN search_snippets s ON s.id = search_snippets_fts.rowid
+             WHERE search_snippets_fts MATCH ? AND s.fetched_at >= ?'''
+    params: List[Any] = [match, fetched_after]
+    if destination:
+        sql += ' AND s.destination = ?'
+        params.append(destination)
+    if origin:
+        sql += ' AND s.origin = ?'
+        params.append(origin)
+    sql += ' ORDER BY score LIMIT ?'
+    params.append(limit)
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
 
-def clear_all_memories() -> int:
-    """Clear all memories"""
+
+def delete_search_snippets_before(fetched_before: float) -> int:
+    """Drop snippets fetched before a time; returns how many"""
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute('DELETE FROM user_memories')
+        cursor.execute('DELETE FROM search_snippets WHERE fetched_at < ?', (fetched_before,))
         return cursor.rowcount
 
 
-# Initialize database on import
-init_db()
+# Section Latency Functions
+
+
+def add_section_latencies(samples: List[tuple]):
+    """Store (section, region, seconds, recorded_at) samples"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            'INSERT INTO section_latencies (section, region, seconds, recorded_at) VALUES (?, ?, ?, ?)',
+            samples
+        )
+
+
+def get_section_latencies(recorded_after: float, limit: int) -> List[Dict[str, Any]]:
+    """The latest `limit` samples recorded after a time, oldest first"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            '''SELECT * FROM (SELECT * FROM section_latencies WHERE recorded_at >= ?
+                              ORDER BY recorded_at DESC LIMIT ?)
+               ORDER BY recorded_at''',
+            (recorded_after, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def delete_section_latencies_before(recorded_before: float) -> int:
+    """Drop samples recorded before a time; returns how many"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM section_latencies WHERE recorded_at < ?', (recorded_before,))
+        return cursor.rowcount
+
+
+# Shard Migration Functions
+
+# Per-user tables and how their rows find their owner, parents before children
+_SHARDED_TABLES = [
+    ("chat_sessions", "id, user_id, title, destination, created_at, updated_at",
+     "user_id IN (SELECT user_id FROM temp.moving_users)"),
+    ("chat_messages", "id, session_id, role, content, trip_plan, user_query, created_at",
+     "session_id IN (SELECT id FROM main.chat_sessions WHERE user_id IN (SELECT user_id FROM temp.moving_users))"),
+    ("trip_costs", "message_id, session_id, destination, destination_key, travel_month, currency, total, "
+                   "flights, hotels, activities, created_at",
+     "session_id IN (SELECT id FROM main.chat_sessions WHERE user_id IN (SELECT user_id FROM temp.moving_users))"),
+    ("user_memories", "id, user_id, memory_type, content, confidence, source_session_id, content_hash, "
+                      "created_at, updated_at, decayed_at",
+     "user_id IN (SELECT user_id FROM temp.moving_users)"),
+    ("memory_vectors", "memory_id, dim, vector",
+     "memory_id IN (SELECT id FROM main.user_memories WHERE user_id IN (SELECT user_id FROM temp.moving_users))"),
+]
+
+
+def migrate_to_shards() -> Dict[int, int]:
+    """
+    Move user data still in the unsharded file into the users' shards, for
+    when TRAVEL_DB_USER_SHARDS is turned on for an existing database. Archived
+    sessions are restored to chat_messages first (their segments belong to
+    the unsharded file). Rows keep their ids, and the memory worker's
+    checkpoint carries over to shards that don't have one, so nothing is
+    extracted twice. Returns {shard: users moved}.
+
+    Raises RuntimeError, leaving the shard untouched, when rows collide with
+    ones the shard already has.
+    """
+    if USER_SHARDS <= 0:
+        return {}
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT user_id FROM chat_sessions UNION SELECT user_id FROM user_memories')
+        users = [row[0] for row in cursor.fetchall()]
+        if not users:
+            return {}
+        for row in cursor.execute('SELECT session_id FROM session_archive').fetchall():
+            _restore_archived_session(cursor, row[0], None)
+
+    # Checkpoint names belong to the worker
+    from .memory_worker import CHECKPOINT, checkpoint_for
+
+    by_shard: Dict[int, List[str]] = {}
+    for user_id in users:
+        by_shard.setdefault(shard_for(user_id), []).append(user_id)
+    for shard, shard_users in sorted(by_shard.items()):
+        init_db(shard)
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('ATTACH DATABASE ? AS shard', (shard_path(shard),))
+            cursor.execute('CREATE TEMP TABLE moving_users (user_id TEXT PRIMARY KEY)')
+            cursor.executemany('INSERT INTO temp.moving_users VALUES (?)', [(u,) for u in shard_users])
+            try:
+                for table, columns, owned in _SHARDED_TABLES:
+                    cursor.execute(f'INSERT INTO shard.{table} ({columns}) '
+                                   f'SELECT {columns} FROM main.{table} WHERE {owned}')
+            except sqlite3.IntegrityError as e:
+                raise RuntimeError(f"Can't move unsharded user data into shard {shard} ({shard_path(shard)}): {e}. "
+                                   f"Set TRAVEL_DB_USER_SHARDS=0, or move the conflicting rows by hand.") from e
+            for table, _, owned in reversed(_SHARDED_TABLES):
+                cursor.execute(f'DELETE FROM main.{table} WHERE {owned}')
+            cursor.execute(
+                '''INSERT OR IGNORE INTO main.worker_checkpoints (name, last_message_id, updated_at)
+                   SELECT ?, last_message_id, CURRENT_TIMESTAMP FROM main.worker_checkpoints WHERE name = ?''',
+                (checkpoint_for(shard), CHECKPOINT)
+            )
+            cursor.execute('DROP TABLE temp.moving_users')
+        print(f"[Database] Moved {len(shard_users)} users' data into shard {shard}")
+    _memories_changed(users)
+    return {shard: len(shard_users) for shard, shard_users in by_shard.items()}
@@ -0,0 +1,182 @@
+"""
+Process-wide keep-alive HTTP clients for search and LLM traffic.
+
+Search: a DDGS client holds one primp HTTP client per search engine, and
+those keep their connections (and TLS sessions) open. Instead of a new DDGS
+per call, search_client() checks one out of a pool and puts it back
+afterwards, so repeat searches skip the TCP and TLS handshakes. At most
+TRAVEL_SEARCH_POOL_SIZE are in use at once; a caller that can't get one
+within TRAVEL_SEARCH_POOL_WAIT_S gets a TimeoutError, which the search
+functions already treat as a failed search. A client whose search raised is
+dropped rather than reused.
+
+LLM: litellm sends OpenAI-compatible requests through litellm.aclient_session
+when it is set. llm_sessions.install() points it at one httpx.AsyncClient
+shared by every agent: HTTP/2 where the server supports it (TRAVEL_HTTP2,
+needs the h2 package), at most TRAVEL_LLM_MAX_CONNECTIONS connections, of
+which TRAVEL_LLM_MAX_KEEPALIVE stay open for TRAVEL_LLM_KEEPALIVE_S when
+idle. httpx connections belong to one event loop, so the client is made per
+loop (the server has one); outside a loop litellm keeps its own clients.
+
+stats() reports how often a pooled connection was reused: search checkouts
+against clients created, LLM requests against new connections and TLS
+handshakes (from httpcore's trace events). TRAVEL_HTTP_POOLS=0 goes back to
+a client per call.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+POOLS_ENABLED = os.getenv("TRAVEL_HTTP_POOLS", "1") != "0"
+SEARCH_POOL_SIZE = int(os.getenv("TRAVEL_SEARCH_POOL_SIZE", "8"))
+SEARCH_POOL_WAIT_S = float(os.getenv("TRAVEL_SEARCH_POOL_WAIT_S", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("TRAVEL_LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("TRAVEL_LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_S = float(os.getenv("TRAVEL_LLM_KEEPALIVE_S", "60"))
+HTTP2_ENABLED = os.getenv("TRAVEL_HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+
+class SearchClientPool:
+    """Reusable search clients, per client class (so benchmark fakes get their own)."""
+
+    def __init__(self, size: int = SEARCH_POOL_SIZE, wait_s: float = SEARCH_POOL_WAIT_S):
+        self.size = size
+        self.wait_s = wait_s
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: Dict[Callable[[], Any], List[Any]] = {}
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.waited = 0
+
+    @contextmanager
+    def client(self, factory: Callable[[], Any]) -> Iterator[Any]:
+        """A client made by `factory`, idle from an earlier call if there is one"""
+        if not POOLS_ENABLED:
+            with factory() as client:
+                yield client
+            return
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.waited += 1
+            if not self._slots.acquire(timeout=self.wait_s):
+                raise TimeoutError(f"No search client free after {self.wait_s:g}s")
+        try:
+            with self._lock:
+                self.checkouts += 1
+                idle = self._idle.get(factory)
+                client = idle.pop() if idle else None
+                if client is None:
+                    self.created += 1
+            if client is None:
+                client = factory()
+            try:
+                yield client
+            except BaseException:
+                with self._lock:
+                    self.discarded += 1
+                raise
+            with self._lock:
+                self._idle.setdefault(factory, []).append(client)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = self.checkouts - self.created
+            return {
+                "size": self.size,
+                "idle": sum(len(clients) for clients in self._idle.values()),
+                "checkouts": self.checkouts,
+                "created": self.created,
+                "reused": reused,
+                "reuse_rate": round(reused / self.checkouts, 3) if self.checkouts else None,
+                "discarded": self.discarded,
+                "waited": self.waited,
+            }
+
+
+class LLMSessions:
+    """The shared httpx.AsyncClient litellm sends LLM requests through."""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+
+    def install(self):
+        """Make litellm use the running loop's shared client (no-op outside a loop)."""
+        if not POOLS_ENABLED:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        import litellm
+        if self._loop is not loop or self._client is None or self._client.is_closed:
+            # A client of an earlier loop can't be closed from this one; it is dropped
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                                    keepalive_expiry=LLM_KEEPALIVE_S),
+                # litellm passes each request's own timeout; this is only the fallback
+                timeout=httpx.Timeout(600.0, connect=10.0),
+                follow_redirects=True,
+                event_hooks={"request": [self._on_request]},
+            )
+            self._loop = loop
+            print(f"[HttpPool] Shared LLM client (HTTP/2 {'on' if HTTP2_ENABLED else 'off'}, "
+                  f"{LLM_MAX_CONNECTIONS} connections, {LLM_MAX_KEEPALIVE} kept alive)")
+        litellm.aclient_session = self._client
+
+    async def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.connections, 0)
+        return {
+            "http2": HTTP2_ENABLED,
+            "max_connections": LLM_MAX_CONNECTIONS,
+            "max_keepalive": LLM_MAX_KEEPALIVE,
+            "requests": self.requests,
+            "connections": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "reused": reused,
+            "reuse_rate": round(reused / self.requests, 3) if self.requests else None,
+        }
+
+
+search_pool = SearchClientPool()
+llm_sessions = LLMSessions()
+
+
+def search_client(factory: Callable[[], Any]):
+    """Check a search client out of the shared pool: `with search_client(DDGS) as ddgs: ...`"""
+    return search_pool.client(factory)
+
+
+def stats() -> Dict[str, Any]:
+    return {"enabled": POOLS_ENABLED, "search": search_pool.stats(), "llm": llm_sessions.stats()}
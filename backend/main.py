@@ -1,15 +1,27 @@
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import asyncio
+import re
+import sys
+import time
 import uuid
 
-from .models import UserQuery, TripPlan, UserQueryWithClientId
-from .orchestrator import Orchestrator
+from .models import UserQuery, TripPlan, UserQueryWithClientId, CompareQuery
+from .compare import COMPARE_MAX_DESTINATIONS
 from . import database as db
+from .visa_matrix import visa_matrix
+from .airports import airport_index
+from . import analytics
+from .memory_worker import MEMORY_EXTRACTION_ENABLED, memory_worker
+from .memory_store import upsert_memory
+from .archive import ARCHIVE_AFTER_DAYS, session_archiver
+from . import transfer
+from .serialization import RawJSON, encode_model, json_response
 from .status_manager import status_manager
 from fastapi import WebSocket, WebSocketDisconnect
 
@@ -26,6 +38,86 @@ app.add_middleware(
 
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
 
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.@-]{1,128}$")
+
+
+def current_user(x_user_id: Optional[str] = Header(default=None)) -> str:
+    """
+    The user a request is for, from the X-User-Id header (the default user
+    without one). Sessions, messages and memories are scoped to it.
+    """
+    if not x_user_id:
+        return db.DEFAULT_USER_ID
+    if not USER_ID_PATTERN.match(x_user_id):
+        raise HTTPException(status_code=400, detail="Invalid X-User-Id header")
+    return x_user_id
+
+
+def _orchestrator():
+    """
+    A new Orchestrator. Imported on first use, not with this module: it pulls
+    in google.adk, litellm and ddgs, which take seconds to load and only
+    planning needs, so the API comes up without them.
+    """
+    from .orchestrator import Orchestrator
+    return Orchestrator()
+
+
+@app.on_event("startup")
+async def init_database():
+    # Registered first: the other startup hooks read the database
+    for shard in dict.fromkeys([None, *db.all_shards()]):
+        db.init_db(shard)
+    # Sharding just turned on: users' existing data moves out of the unsharded file
+    db.migrate_to_shards()
+
+
+@app.on_event("startup")
+async def load_latency_history():
+    # Once here, so planning requests never read the history on the event loop
+    from .agents.deadlines import latency_tracker
+    await asyncio.to_thread(latency_tracker.load)
+
+
+@app.on_event("startup")
+async def load_visa_matrix():
+    visa_matrix.load()
+
+
+@app.on_event("startup")
+async def backfill_trip_costs():
+    analytics.backfill_trip_costs()
+
+
+@app.on_event("startup")
+async def start_memory_worker():
+    if MEMORY_EXTRACTION_ENABLED:
+        memory_worker.start()
+
+
+@app.on_event("shutdown")
+async def stop_memory_worker():
+    await memory_worker.stop()
+
+
+@app.on_event("startup")
+async def start_session_archiver():
+    if ARCHIVE_AFTER_DAYS > 0:
+        session_archiver.start()
+
+
+@app.on_event("shutdown")
+async def stop_session_archiver():
+    await session_archiver.stop()
+
+
+@app.on_event("shutdown")
+async def close_http_pools():
+    # Only loaded once something planned; nothing to close otherwise
+    http_pool = sys.modules.get(f"{__package__}.http_pool")
+    if http_pool is not None:
+        await http_pool.llm_sessions.aclose()
+
 # Pydantic models for API
 
 
@@ -89,20 +181,23 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
 
 
 @app.post("/plan_trip_with_session")
-async def plan_trip_with_session(query: UserQueryWithClientId, session_id: Optional[str] = None):
+async def plan_trip_with_session(query: UserQueryWithClientId, session_id: Optional[str] = None,
+                                 user_id: str = Depends(current_user)):
     """Plan a trip and save to a chat session"""
 
-    # TODO: Implement memory-based personalization in the future
-    # This will include fetching user memories, injecting them into prompts/agents,
-    # and extracting new memories from interactions for future personalization.
+    # Personalization stays off this request's path: memories are retrieved
+    # from the in-memory index inside TravelAgent, and new ones are extracted
+    # from the saved messages later by the background memory worker.
 
-    orchestrator = Orchestrator()
+    orchestrator = _orchestrator()
 
     # Create or get session
     if not session_id:
         session_id = str(uuid.uuid4())
         title = f"Trip to {query.destination}" if query.destination else "New Trip"
-        db.create_session(session_id, title, query.destination)
+        db.create_session(session_id, title, query.destination, user_id=user_id)
+    elif not db.get_session(session_id, user_id):
+        raise HTTPException(status_code=404, detail="Session not found")
 
     # Save user message with full query details
     user_content = f"Plan a trip to {query.destination}"
@@ -112,97 +207,252 @@ async def plan_trip_with_session(query: UserQueryWithClientId, session_id: Optio
         user_content += f" from {query.origin}"
     # Store the full user query object for later restoration
     db.add_message(session_id, "user", user_content,
-                   user_query=query.model_dump())
+                   user_query=query.model_dump(), user_id=user_id)
 
     # Plan the trip
-    result = await orchestrator.plan_trip(query, client_id=query.client_id)
+    result = await orchestrator.plan_trip(query, client_id=query.client_id, user_id=user_id)
 
     # Save assistant response with trip plan
-    db.add_message(
+    # Encoded once: the stored message and the response share the same JSON text
+    trip_plan = encode_model(result)
+    message = db.add_message(
         session_id,
         "assistant",
         f"I've planned your trip to {result.destination}!",
-        result.model_dump()
+        trip_plan.text,
+        user_id=user_id
+    )
+    if result.cost:
+        analytics.record_trip_cost(message['id'], session_id, result.destination, result.cost.model_dump(),
+                                   user_id)
+
+    return json_response({
+        "session_id": session_id,
+        "trip_plan": trip_plan
+    })
+
+
+@app.post("/replan_trip")
+async def replan_trip(query: UserQueryWithClientId, session_id: str, user_id: str = Depends(current_user)):
+    """
+    Re-plan a session's trip after the search was edited. Only the sections
+    affected by the changed fields are re-run; the rest of the session's last
+    plan is kept. Without a previous plan this is a full plan.
+    """
+    if not db.get_session(session_id, user_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    messages = db.get_session_messages(session_id, user_id)
+    previous_query = next((m['user_query'] for m in reversed(messages) if m['user_query']), None)
+    previous_plan = next((m['trip_plan'] for m in reversed(messages) if m['trip_plan']), None)
+    if previous_query is None or previous_plan is None:
+        return await plan_trip_with_session(query, session_id, user_id)
+
+    orchestrator = _orchestrator()
+
+    user_content = f"Update the trip to {query.destination}"
+    if query.dates:
+        user_content += f" on {query.dates}"
+    if query.origin:
+        user_content += f" from {query.origin}"
+    db.add_message(session_id, "user", user_content,
+                   user_query=query.model_dump(), user_id=user_id)
+
+    result = await orchestrator.replan_trip(query, previous_query, previous_plan,
+                                            client_id=query.client_id, user_id=user_id)
+
+    # Encoded once: the stored message and the response share the same JSON text
+    trip_plan = encode_model(result)
+    message = db.add_message(
+        session_id,
+        "assistant",
+        f"I've updated your trip to {result.destination}!",
+        trip_plan.text,
+        user_id=user_id
     )
+    if result.cost:
+        analytics.record_trip_cost(message['id'], session_id, result.destination, result.cost.model_dump(),
+                                   user_id)
 
-    return {
+    return json_response({
         "session_id": session_id,
-        "trip_plan": result
-    }
+        "trip_plan": trip_plan
+    })
+
+
+@app.post("/compare")
+async def compare_destinations(query: CompareQuery, user_id: str = Depends(current_user)):
+    """Plan 2+ destinations for one origin/dates/budget and return a ranked summary"""
+    if not 2 <= len(query.destinations) <= COMPARE_MAX_DESTINATIONS:
+        raise HTTPException(status_code=400,
+                            detail=f"Provide between 2 and {COMPARE_MAX_DESTINATIONS} destinations")
+
+    orchestrator = _orchestrator()
+    return await orchestrator.compare_destinations(query, client_id=query.client_id, user_id=user_id)
+
+
+@app.post("/warmup")
+async def warmup():
+    """
+    Load the planning stack ahead of the first plan, e.g. from a startup
+    probe. Optional: without it the first planning request pays for it.
+    """
+    started = time.perf_counter()
+    # Off the event loop: the imports take seconds of CPU
+    await asyncio.to_thread(_orchestrator)
+    return {"status": "warm", "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
 
 # Chat Sessions API
 
 
 @app.get("/sessions")
-async def get_sessions():
-    """Get all chat sessions"""
-    sessions = db.get_all_sessions()
+async def get_sessions(user_id: str = Depends(current_user)):
+    """Get the user's chat sessions"""
+    sessions = db.get_all_sessions(user_id)
     return {"sessions": sessions}
 
 
 @app.post("/sessions")
-async def create_session(request: CreateSessionRequest):
+async def create_session(request: CreateSessionRequest, user_id: str = Depends(current_user)):
     """Create a new chat session"""
     session_id = str(uuid.uuid4())
-    session = db.create_session(session_id, request.title, request.destination)
+    session = db.create_session(session_id, request.title, request.destination, user_id=user_id)
     return session
 
 
 @app.get("/sessions/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, user_id: str = Depends(current_user)):
     """Get a specific session with its messages"""
-    session = db.get_session(session_id)
+    session = db.get_session(session_id, user_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    messages = db.get_session_messages(session_id)
-    return {
+    # Stored plans go out as stored, without a decode/encode round trip
+    messages = db.get_session_messages(session_id, user_id, decode=False)
+    for message in messages:
+        for field in ('trip_plan', 'user_query'):
+            if message[field]:
+                message[field] = RawJSON(message[field])
+    return json_response({
         "session": session,
         "messages": messages
-    }
+    })
 
 
 @app.delete("/sessions/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, user_id: str = Depends(current_user)):
     """Delete a chat session"""
-    success = db.delete_session(session_id)
+    success = db.delete_session(session_id, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Session not found")
     return {"message": "Session deleted"}
 
+# Airports API
+
+
+@app.get("/airports/search")
+async def search_airports(q: str = "", limit: int = 10):
+    """Ranked airport/city matches for the origin autocomplete"""
+    results = airport_index.search(q, limit=min(max(limit, 1), 50))
+    return {"query": q, "airports": [airport.to_dict() for airport in results]}
+
+# Analytics API
+
+
+@app.get("/analytics/budgets")
+async def get_budget_analytics(destination: Optional[str] = None, currency: Optional[str] = None):
+    """Budget distributions per destination and travel month across all saved plans"""
+    return {"budgets": analytics.budget_distributions(destination, currency)}
+
+# Metrics API
+
+
+@app.get("/metrics/http")
+async def get_http_pool_stats():
+    """Connection reuse of the shared search and LLM HTTP clients"""
+    from .http_pool import stats
+    return stats()
+
+
+@app.get("/metrics/search")
+async def get_search_provider_stats():
+    """Health, latency and rate limiting per search provider"""
+    # Loaded with the planning stack; before the first plan there is nothing to report
+    search_providers = sys.modules.get(f"{__package__}.agents.tools.search_providers")
+    return {"providers": search_providers.search_broker.snapshot() if search_providers else {}}
+
+
+@app.get("/metrics/latency")
+async def get_section_latency_stats():
+    """Rolling p50/p95 per planning section (and per destination region), from the persisted history"""
+    from .agents.deadlines import latency_tracker
+    return {"sections": latency_tracker.stats()}
+
 # Memories API
 
 
 @app.get("/memories")
-async def get_memories(memory_type: Optional[str] = None):
-    """Get all user memories"""
-    memories = db.get_memories(memory_type)
+async def get_memories(memory_type: Optional[str] = None, user_id: str = Depends(current_user)):
+    """Get the user's memories"""
+    memories = db.get_memories(memory_type, user_id=user_id)
     return {"memories": memories}
 
 
 @app.post("/memories")
-async def create_memory(request: CreateMemoryRequest):
-    """Create a new memory manually"""
-    memory = db.add_memory(request.memory_type, request.content)
+async def create_memory(request: CreateMemoryRequest, user_id: str = Depends(current_user)):
+    """Create a new memory manually (merged into an existing duplicate if there is one)"""
+    memory = upsert_memory(request.memory_type, request.content, user_id=user_id)
     return memory
 
 
 @app.delete("/memories/{memory_id}")
-async def delete_memory(memory_id: int):
+async def delete_memory(memory_id: int, user_id: str = Depends(current_user)):
     """Delete a specific memory"""
-    success = db.delete_memory(memory_id)
+    success = db.delete_memory(memory_id, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Memory not found")
     return {"message": "Memory deleted"}
 
 
 @app.delete("/memories")
-async def clear_memories():
-    """Clear all memories"""
-    count = db.clear_all_memories()
+async def clear_memories(user_id: str = Depends(current_user)):
+    """Clear all of the user's memories"""
+    count = db.clear_all_memories(user_id)
     return {"message": f"Cleared {count} memories"}
 
 
+# Export / Import API
+
+
+@app.get("/export")
+async def export_data(user_id: str = Depends(current_user)):
+    """Stream the user's sessions, messages and memories as NDJSON"""
+    filename = f"travel-export-{user_id}.ndjson"
+    return StreamingResponse(transfer.export_lines(user_id), media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@app.post("/import")
+async def import_data(request: Request, import_id: Optional[str] = None, start_line: int = 0,
+                      user_id: str = Depends(current_user)):
+    """
+    Import an NDJSON export (streamed request body) into the user's data.
+    Re-send with the returned import_id to resume an interrupted import.
+    """
+    import_id = import_id or str(uuid.uuid4())
+    try:
+        return await transfer.import_lines(request.stream(), user_id, import_id, max(start_line, 0))
+    except transfer.TransferError as e:
+        raise HTTPException(status_code=400, detail={
+            "error": str(e), "import_id": import_id,
+            "committed_lines": transfer.import_progress(user_id, import_id)})
+
+
+@app.get("/import/{import_id}")
+async def get_import_progress(import_id: str, user_id: str = Depends(current_user)):
+    """Lines of an import committed so far (send the rest with start_line set to this)"""
+    return {"import_id": import_id, "committed_lines": transfer.import_progress(user_id, import_id)}
+
+
 # Serve frontend static files when built (production)
 if STATIC_DIR.exists():
     @app.get("/{full_path:path}")
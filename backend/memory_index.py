@@ -0,0 +1,176 @@
+"""
+Relevance-ranked retrieval of user memories.
+
+Memories are embedded with a hashing vectorizer (word unigrams and bigrams
+hashed into a fixed number of signed buckets, L2-normalized), so no model has
+to be downloaded or loaded. Vectors are stored in the memory_vectors table
+next to user_memories and held in memory as one NumPy matrix; a query is a
+single matrix-vector product, with the query's buckets IDF-weighted over the
+memories so words every memory shares count for little.
+
+For a trip, the top-k memories by similarity to the query (plus a small
+confidence bonus, and a boost for trip-independent facts like home location
+or dietary needs) are packed into a context string within a token budget.
+Each user has their own index over their own memories (memory_index_for);
+built context strings are cached per query, and the cache and the matrix are
+only rebuilt after that user's memories change (database.memory_version).
+The least recently used indexes are dropped past INDEX_CACHE_USERS users.
+"""
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import database as db
+
+# Bump the dimension to re-embed everything (stored vectors of another size are redone)
+DIM = 1024
+TOP_K = int(os.getenv("TRAVEL_MEMORY_TOP_K", "8"))
+TOKEN_BUDGET = int(os.getenv("TRAVEL_MEMORY_TOKEN_BUDGET", "300"))
+CONFIDENCE_WEIGHT = 0.1
+# Facts that apply to every trip, whatever its words
+ALWAYS_RELEVANT = {"home_location", "dietary_preference", "accessibility_needs", "travel_companions"}
+ALWAYS_RELEVANT_BOOST = 0.3
+# Below this a memory has nothing to do with the trip and is left out
+MIN_SCORE = 0.15
+CACHE_SIZE = 256
+INDEX_CACHE_USERS = int(os.getenv("TRAVEL_MEMORY_INDEX_USERS", "128"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "the", "to", "in", "of", "for", "and", "or", "with", "on", "at", "from", "my", "i",
+              "is", "are", "be", "plan", "trip", "travel", "visit"}
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w for w in _WORD.findall(text.lower().replace("_", " ")) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def embed(text: str) -> np.ndarray:
+    """Hashed bag of unigrams and bigrams, L2-normalized"""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for token in _tokens(text):
+        h = zlib.crc32(token.encode())
+        vector[h % DIM] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def query_text(query: Dict[str, Any]) -> str:
+    """Words describing a trip request (a UserQuery dict) to match memories against"""
+    parts = [query.get('query'), query.get('destination'), query.get('origin'), query.get('travel_time')]
+    if query.get('strict_budget'):
+        parts.append("budget cheap")
+    if (query.get('travelers') or 1) > 1:
+        parts.append("travel companions family friends group")
+    return " ".join(p for p in parts if p)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class MemoryIndex:
+    """In-memory NumPy index over one user's memories, reloaded when they change."""
+
+    def __init__(self, user_id: str = db.DEFAULT_USER_ID):
+        self.user_id = user_id
+        self._version: Optional[int] = None
+        self._memories: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, DIM), dtype=np.float32)
+        self._prior = np.zeros(0, dtype=np.float32)
+        self._idf = np.ones(DIM, dtype=np.float32)
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+
+    def _refresh(self):
+        if self._version == db.memory_version(self.user_id):
+            return
+        version = db.memory_version(self.user_id)
+        rows = db.get_memories_with_vectors(self.user_id)
+        vectors, missing = [], []
+        for row in rows:
+            if row['vector'] is not None and row['dim'] == DIM:
+                vectors.append(np.frombuffer(row['vector'], dtype=np.float32))
+            else:
+                vector = embed(row['content'])
+                vectors.append(vector)
+                missing.append((row['id'], DIM, vector.tobytes()))
+        if missing:
+            db.save_memory_vectors(missing, self.user_id)
+
+        self._memories = [{'id': r['id'], 'memory_type': r['memory_type'], 'content': r['content'],
+                           'confidence': r['confidence']} for r in rows]
+        self._matrix = np.vstack(vectors) if vectors else np.zeros((0, DIM), dtype=np.float32)
+        df = np.count_nonzero(self._matrix, axis=0)
+        self._idf = (np.log((len(rows) + 1) / (df + 1)) + 1).astype(np.float32)
+        self._prior = np.array(
+            [CONFIDENCE_WEIGHT * (m['confidence'] or 0.0) +
+             (ALWAYS_RELEVANT_BOOST if m['memory_type'] in ALWAYS_RELEVANT else 0.0)
+             for m in self._memories], dtype=np.float32)
+        self._cache.clear()
+        self._version = version
+        if missing:
+            print(f"[MemoryIndex] Embedded {len(missing)} new memories for {self.user_id} ({len(rows)} total)")
+
+    def vectors(self, memory_type: str) -> List[Tuple[Dict[str, Any], np.ndarray]]:
+        """(memory, vector) pairs of one type, for duplicate checks"""
+        self._refresh()
+        return [(m, self._matrix[i]) for i, m in enumerate(self._memories) if m['memory_type'] == memory_type]
+
+    def search(self, text: str, k: int = TOP_K) -> List[Dict[str, Any]]:
+        """Top-k memories for the text, best first, with their scores"""
+        self._refresh()
+        if not self._memories:
+            return []
+        query = embed(text) * self._idf
+        norm = np.linalg.norm(query)
+        scores = self._matrix @ (query / norm if norm else query) + self._prior
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{**self._memories[i], 'score': float(scores[i])} for i in top]
+
+    def context_for(self, query: Dict[str, Any], k: int = TOP_K, token_budget: int = TOKEN_BUDGET) -> str:
+        """Memory context for a trip request: the most relevant memories that fit the token budget"""
+        self._refresh()
+        text = query_text(query)
+        key = f"{k}:{token_budget}:{text}"
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        lines, used = [], 0
+        for memory in self.search(text, k):
+            if memory['score'] < MIN_SCORE:
+                break
+            line = f"- [{memory['memory_type']}]: {memory['content']}"
+            cost = estimate_tokens(line)
+            if used + cost > token_budget:
+                continue
+            lines.append(line)
+            used += cost
+        context = "User preferences and past information:\n" + "\n".join(lines) + "\n" if lines else ""
+
+        self._cache[key] = context
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return context
+
+
+_indexes: "OrderedDict[str, MemoryIndex]" = OrderedDict()
+
+
+def memory_index_for(user_id: str = db.DEFAULT_USER_ID) -> MemoryIndex:
+    """The memory index of one user"""
+    user_id = user_id or db.DEFAULT_USER_ID
+    index = _indexes.get(user_id)
+    if index is None:
+        index = _indexes[user_id] = MemoryIndex(user_id)
+        if len(_indexes) > INDEX_CACHE_USERS:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(user_id)
+    return index
@@ -0,0 +1,141 @@
+"""
+Memory writes: dedupe on write, decay and compaction.
+
+upsert_memory is the write path for new memories. A memory that repeats an
+existing one of the same type is merged into it instead of inserted, raising
+the existing memory's confidence. A repeat is either the same normalized text
+(content_hash) or, failing that, a hashed-vector cosine similarity of at least
+DUPLICATE_SIMILARITY (see memory_index.embed).
+
+compact_memories runs periodically from the memory worker:
+- confidence decays with a half-life of TRAVEL_MEMORY_HALF_LIFE_DAYS since a
+  memory was last seen or decayed
+- duplicates that slipped in (concurrent writes, rows from before hashing)
+  are merged
+- memories below MIN_CONFIDENCE are dropped, and only the MAX_MEMORIES
+  strongest of each user are kept
+
+Both only ever compare a user's memories with that user's own.
+"""
+import hashlib
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import database as db
+from .memory_index import embed, memory_index_for
+
+DUPLICATE_SIMILARITY = 0.75
+# Share of the remaining doubt a repeat sighting removes
+REINFORCE_WEIGHT = 0.5
+HALF_LIFE_DAYS = float(os.getenv("TRAVEL_MEMORY_HALF_LIFE_DAYS", "180"))
+MIN_CONFIDENCE = 0.2
+MAX_MEMORIES = int(os.getenv("TRAVEL_MEMORY_MAX", "500"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(content: str) -> str:
+    """Lowercase words only, so case, punctuation and spacing don't make a new memory"""
+    return " ".join(_WORD.findall(content.lower()))
+
+
+def content_hash(memory_type: str, content: str) -> str:
+    return hashlib.sha1(f"{memory_type}|{normalize(content)}".encode()).hexdigest()
+
+
+def merged_confidence(existing: float, new: float) -> float:
+    """Confidence after seeing a memory again with confidence `new`"""
+    existing, new = existing or 0.0, new or 0.0
+    return min(1.0, existing + (1.0 - existing) * new * REINFORCE_WEIGHT)
+
+
+def _similar_memory(memory_type: str, content: str, user_id: str) -> Optional[Dict[str, Any]]:
+    vector = embed(content)
+    best, best_score = None, DUPLICATE_SIMILARITY
+    for memory, memory_vector in memory_index_for(user_id).vectors(memory_type):
+        score = float(memory_vector @ vector)
+        if score >= best_score:
+            best, best_score = memory, score
+    return best
+
+
+def upsert_memory(memory_type: str, content: str, source_session_id: str = None,
+                  confidence: float = 1.0, user_id: str = db.DEFAULT_USER_ID) -> Dict[str, Any]:
+    """
+    Add a memory for a user, or merge it into their existing duplicate by
+    raising that memory's confidence. The result has "merged" set accordingly.
+    """
+    digest = content_hash(memory_type, content)
+    existing = db.get_memory_by_hash(digest, user_id) or _similar_memory(memory_type, content, user_id)
+    if existing:
+        memory = db.reinforce_memory(existing['id'], merged_confidence(existing['confidence'], confidence), user_id)
+        # None: a compaction pass deleted the duplicate meanwhile, so add this one
+        if memory is not None:
+            return {**memory, 'merged': True}
+    return {**db.add_memory(memory_type, content, source_session_id, confidence, digest, user_id), 'merged': False}
+
+
+def compact_memories(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Decay confidences, merge duplicates and drop weak or excess memories, one transaction per shard."""
+    now = now or datetime.utcnow()
+    stats = {"kept": 0, "merged": 0, "dropped": 0, "skipped": 0}
+    for shard in db.all_shards():
+        for key, value in _compact_shard(shard, now).items():
+            stats[key] += value
+    print(f"[MemoryStore] Compacted memories: {stats}")
+    return stats
+
+
+def _compact_shard(shard: Optional[int], now: datetime) -> Dict[str, int]:
+    rows = db.get_memories_for_compaction(shard)
+    # What the pass read: rows changed by the time it writes are skipped
+    seen = {row['id']: (row['confidence'], row['updated_at'], row['decayed_at']) for row in rows}
+
+    for row in rows:
+        age_days = max(0.0, (now - datetime.fromisoformat(str(row['decayed_at']))).total_seconds() / 86400)
+        row['confidence'] = (row['confidence'] or 0.0) * 0.5 ** (age_days / HALF_LIFE_DAYS)
+        row['content_hash'] = content_hash(row['memory_type'], row['content'])
+
+    # Strongest first, so duplicates merge into the memory most worth keeping
+    kept: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    vectors: Dict[Tuple[str, str], List[np.ndarray]] = {}
+    deleted: List[int] = []
+    merged = 0
+    for row in sorted(rows, key=lambda r: -r['confidence']):
+        key = (row['user_id'], row['memory_type'])
+        same_type = kept.setdefault(key, [])
+        type_vectors = vectors.setdefault(key, [])
+        vector = embed(row['content'])
+        target = next((k for k in same_type if k['content_hash'] == row['content_hash']), None)
+        if target is None and type_vectors:
+            scores = np.vstack(type_vectors) @ vector
+            if scores.max() >= DUPLICATE_SIMILARITY:
+                target = same_type[int(scores.argmax())]
+        if target is not None:
+            target['confidence'] = merged_confidence(target['confidence'], row['confidence'])
+            deleted.append(row['id'])
+            merged += 1
+        else:
+            same_type.append(row)
+            type_vectors.append(vector)
+
+    per_user: Dict[str, List[Dict[str, Any]]] = {}
+    for (user_id, _), group in kept.items():
+        per_user.setdefault(user_id, []).extend(group)
+    strong, dropped = [], 0
+    for survivors in per_user.values():
+        survivors.sort(key=lambda r: -r['confidence'])
+        keep = [r for r in survivors if r['confidence'] >= MIN_CONFIDENCE][:MAX_MEMORIES]
+        keep_ids = {r['id'] for r in keep}
+        gone = [r['id'] for r in survivors if r['id'] not in keep_ids]
+        strong += keep
+        deleted += gone
+        dropped += len(gone)
+
+    updates = [(r['confidence'], r['content_hash'], r['id'], *seen[r['id']]) for r in strong]
+    skipped = db.apply_memory_compaction(updates, [(i, *seen[i]) for i in deleted], shard, {r['user_id'] for r in rows})
+    return {"kept": len(strong), "merged": merged, "dropped": dropped, "skipped": skipped}
@@ -0,0 +1,176 @@
+"""
+Background memory extraction.
+
+Memories are extracted off the request path: /plan_trip_with_session only
+saves the chat messages, and this worker later reads finished interactions
+(assistant messages with a trip plan, plus the user query before them) from
+chat_messages in id order. Several interactions are compacted and sent to
+MemoryAgent in one extraction call per user in the batch (memories never mix
+users), and the results are written with memory_store.upsert_memory
+(duplicates merge into the user's existing memories). Every
+TRAVEL_MEMORY_COMPACT_INTERVAL_S the worker also runs the decay/compaction
+pass.
+
+Progress is checkpointed by message id in worker_checkpoints (one checkpoint
+per database shard), so a restart resumes where the worker stopped. A batch
+runs once it is full or its oldest interaction has waited
+TRAVEL_MEMORY_MAX_WAIT_S; a failed batch, including one the model answered
+without a memory list, is retried on the next poll.
+
+Run one pass by hand (ignoring the batch wait):
+
+    python -m backend.memory_worker --once [--compact]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from . import database as db
+from .memory_store import compact_memories, upsert_memory
+
+CHECKPOINT = "memory_extraction"
+MEMORY_EXTRACTION_ENABLED = os.getenv("TRAVEL_MEMORY_EXTRACTION", "1") != "0"
+BATCH_SIZE = int(os.getenv("TRAVEL_MEMORY_BATCH_SIZE", "5"))
+MAX_WAIT_S = float(os.getenv("TRAVEL_MEMORY_MAX_WAIT_S", "300"))
+POLL_S = float(os.getenv("TRAVEL_MEMORY_POLL_S", "30"))
+COMPACT_INTERVAL_S = float(os.getenv("TRAVEL_MEMORY_COMPACT_INTERVAL_S", str(6 * 3600)))
+
+
+def checkpoint_for(shard: Optional[int]) -> str:
+    """Checkpoint name of a database shard (message ids are per shard file)"""
+    return CHECKPOINT if shard is None else f"{CHECKPOINT}:{shard:02d}"
+
+
+class MemoryWorker:
+    """Polls chat_messages and extracts memories in batches."""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, max_wait_s: float = MAX_WAIT_S, poll_s: float = POLL_S,
+                 compact_interval_s: float = COMPACT_INTERVAL_S):
+        self.batch_size = batch_size
+        self.max_wait = timedelta(seconds=max_wait_s)
+        self.poll_s = poll_s
+        self.compact_interval_s = compact_interval_s
+        self._last_compaction: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self, force: bool = False) -> int:
+        """
+        Extract memories from the next batch of every shard, if it is full, has
+        waited long enough, or `force` is set. Returns the number of
+        interactions processed.
+        """
+        processed = 0
+        for shard in db.all_shards():
+            processed += await self._run_shard(shard, force)
+        return processed
+
+    def _pending(self, checkpoint_name: str, shard: Optional[int]) -> List[Dict[str, Any]]:
+        return db.get_plan_messages_after(db.get_checkpoint(checkpoint_name), self.batch_size, shard)
+
+    @staticmethod
+    def _store(memories: List[Dict[str, Any]], source_session_id: Optional[str], user_id: str):
+        for memory in memories:
+            upsert_memory(memory['memory_type'], memory['content'], source_session_id,
+                          memory.get('confidence', 1.0), user_id)
+
+    async def _run_shard(self, shard: Optional[int], force: bool) -> int:
+        # The database work runs in a thread, like archive.py's, so it never blocks the event loop
+        checkpoint_name = checkpoint_for(shard)
+        pending = await asyncio.to_thread(self._pending, checkpoint_name, shard)
+        if not pending:
+            return 0
+        # created_at is SQLite's CURRENT_TIMESTAMP (UTC)
+        waited = datetime.utcnow() - datetime.fromisoformat(str(pending[0]['created_at']))
+        if not force and len(pending) < self.batch_size and waited < self.max_wait:
+            return 0
+
+        # Loaded here, not at import: MemoryAgent pulls in google.adk and litellm
+        from .agents.memory_agent import MemoryAgent, compact_interaction
+
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for message in pending:
+            by_user.setdefault(message['user_id'], []).append(message)
+
+        extracted = 0
+        for user_id, messages in by_user.items():
+            agent = MemoryAgent("MemoryAgent")
+            agent.set_user_id(user_id)
+            interactions = [compact_interaction(m['user_query'], m['trip_plan']) for m in messages]
+            memories = await agent.extract_batch(interactions)
+
+            sessions = {m['session_id'] for m in messages}
+            source_session_id = sessions.pop() if len(sessions) == 1 else None
+            await asyncio.to_thread(self._store, memories, source_session_id, user_id)
+            extracted += len(memories)
+        await asyncio.to_thread(db.set_checkpoint, checkpoint_name, pending[-1]['id'])
+        print(f"[MemoryWorker] Processed messages up to {pending[-1]['id']}"
+              f"{f' in shard {shard}' if shard is not None else ''}: "
+              f"{extracted} memories from {len(pending)} interactions of {len(by_user)} users")
+        return len(pending)
+
+    async def _loop(self):
+        while True:
+            try:
+                # Full batches mean there may be more waiting
+                while await self.run_once() >= self.batch_size:
+                    pass
+                now = time.monotonic()
+                if self._last_compaction is None or now - self._last_compaction >= self.compact_interval_s:
+                    # A full scan and rewrite of the memories table: keep it off the event loop
+                    await asyncio.to_thread(compact_memories)
+                    self._last_compaction = now
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[MemoryWorker] Extraction failed, will retry: {e}")
+            await asyncio.sleep(self.poll_s)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            print(f"[MemoryWorker] Started (batches of {self.batch_size}, polling every {self.poll_s:.0f}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+memory_worker = MemoryWorker()
+
+
+async def _drain() -> int:
+    total = 0
+    while True:
+        processed = await memory_worker.run_once(force=True)
+        total += processed
+        if processed == 0:
+            return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Extract memories from saved chat messages")
+    parser.add_argument("--once", action="store_true", help="Process everything pending now and exit")
+    parser.add_argument("--compact", action="store_true", help="Run the decay/compaction pass")
+    args = parser.parse_args(argv)
+
+    if args.once:
+        total = asyncio.run(_drain())
+        print(f"[MemoryWorker] Processed {total} interactions")
+    if args.compact:
+        compact_memories()
+    if not args.once and not args.compact:
+        for shard in db.all_shards():
+            print(f"[MemoryWorker] Checkpoint {checkpoint_for(shard)} at message "
+                  f"{db.get_checkpoint(checkpoint_for(shard))}")
+
+
+if __name__ == "__main__":
+    main()
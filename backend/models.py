@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 
 class UserQuery(BaseModel):
@@ -14,12 +14,26 @@ class UserQuery(BaseModel):
     currency: str = "USD"
     strict_budget: bool = False
     budget: Optional[str] = None
+    deadline_seconds: Optional[float] = None  # Overall planning budget; server default if unset
+    engine: Literal["agents", "fast"] = "agents"  # "fast" plans in one LLM call, for quick previews
 
 
 class UserQueryWithClientId(UserQuery):
     client_id: Optional[str] = None
 
 
+class Money(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    amount: float
+    currency: str
+
+
+class CompareQuery(UserQueryWithClientId):
+    """One origin/dates/budget, several candidate destinations"""
+    query: str = "Compare destinations"
+    destinations: List[str]
+
+
 class FlightOption(BaseModel):
     model_config = ConfigDict(extra='forbid')
     airline: str
@@ -28,6 +42,7 @@ class FlightOption(BaseModel):
     arrival: str
     duration: str
     booking_url: Optional[str] = None
+    price_amount: Optional[Money] = None  # Parsed from price
 
 
 class HotelOption(BaseModel):
@@ -39,6 +54,7 @@ class HotelOption(BaseModel):
     amenities: List[str]
     image_url: Optional[str] = None
     booking_url: Optional[str] = None
+    price_per_night_amount: Optional[Money] = None  # Parsed from price_per_night
 
 
 class VisaInfo(BaseModel):
@@ -58,6 +74,7 @@ class ActivityOption(BaseModel):
     price: str
     duration: str
     image_url: Optional[str] = None
+    price_amount: Optional[Money] = None  # Parsed from price
 
 
 class ItineraryDay(BaseModel):
@@ -66,6 +83,17 @@ class ItineraryDay(BaseModel):
     activities: List[ActivityOption]
 
 
+class TripCost(BaseModel):
+    """Estimated trip cost in the plan currency, split by component"""
+    model_config = ConfigDict(extra='forbid')
+    currency: str
+    total: float
+    flights: float = 0.0
+    hotels: float = 0.0
+    activities: float = 0.0
+    travel_month: Optional[str] = None  # "YYYY-MM", when known
+
+
 class TripPlan(BaseModel):
     model_config = ConfigDict(extra='forbid')
     destination: str
@@ -76,5 +104,31 @@ class TripPlan(BaseModel):
     visa: VisaInfo
     itinerary: List[ItineraryDay]
     total_budget: Optional[str] = None
+    cost: Optional[TripCost] = None
     preferred_currency: str = "USD"
+    # Per section ("flights", "hotels", "visa", "activities", "itinerary"):
+    # "ok", "pending" (missed the deadline) or "degraded" (agent failed)
+    section_status: Dict[str, str] = {}
+
 
+class DestinationSummary(BaseModel):
+    """One row of a destination comparison"""
+    model_config = ConfigDict(extra='forbid')
+    rank: int
+    destination: str
+    total_budget: Optional[str] = None
+    cost: Optional[TripCost] = None
+    within_budget: Optional[bool] = None  # None when no budget was given or nothing was priced
+    visa_required: Optional[bool] = None  # None when the visa lookup didn't complete
+    flight_duration: Optional[str] = None
+    flight_duration_minutes: Optional[int] = None
+    section_status: Dict[str, str] = {}
+    error: Optional[str] = None
+
+
+class ComparisonResult(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+    origin: Optional[str] = None
+    currency: str = "USD"
+    destinations: List[DestinationSummary]  # Best first
+    plans: Dict[str, TripPlan] = {}
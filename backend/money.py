@@ -0,0 +1,139 @@
+"""
+Price parsing and trip cost estimates.
+
+Agents return prices as display strings ("USD 1,200", "$85/night", "500 EUR",
+"Free"). parse_money turns them into Money once, when a plan is assembled, and
+the parsed amounts travel with the plan (price_amount fields, TripPlan.cost),
+so totals and analytics work on numbers instead of re-parsing strings.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import ActivityOption, FlightOption, HotelOption, ItineraryDay, Money, TripCost
+
+# Symbols map to a currency; "$" is resolved against the plan currency
+_SYMBOLS = {"€": "EUR", "£": "GBP", "₹": "INR", "¥": "JPY", "₩": "KRW", "฿": "THB", "₫": "VND"}
+_DOLLAR_PREFIXES = {"C$": "CAD", "CA$": "CAD", "A$": "AUD", "AU$": "AUD", "NZ$": "NZD",
+                    "S$": "SGD", "HK$": "HKD", "US$": "USD"}
+_DOLLAR_CURRENCIES = {"USD", "CAD", "AUD", "NZD", "SGD", "HKD"}
+_CODES = _DOLLAR_CURRENCIES | set(_SYMBOLS.values()) | {
+    "CHF", "CNY", "DKK", "NOK", "SEK", "PLN", "CZK", "HUF", "TRY", "AED", "SAR", "QAR", "ZAR", "MXN",
+    "BRL", "ARS", "CLP", "COP", "PEN", "IDR", "MYR", "PHP", "TWD", "LKR", "NPR", "EGP", "MAD", "KES", "ILS",
+}
+_PREFIXES = "|".join(map(re.escape, sorted([*_DOLLAR_PREFIXES, *_SYMBOLS, "$"], key=len, reverse=True)))
+_CODE_ALTERNATION = "|".join(sorted(_CODES))
+_NUMBER = r"(?:\d{1,3}(?:[,.]\d{3})+|\d+)(?:[.,]\d+)?"
+# A price inside free text: "USD 1,200", "$85", "€ 89", "A$120", "500 EUR", "1.200,50 EUR"
+PRICE_IN_TEXT = re.compile(rf"(?:(?:{_PREFIXES})\s?|\b(?:{_CODE_ALTERNATION})\s?){_NUMBER}"
+                           rf"|\b{_NUMBER}\s?(?:{_CODE_ALTERNATION})\b")
+_FREE = re.compile(r"^\s*(free|included|no charge)\b", re.IGNORECASE)
+_AMOUNT = re.compile(r"\d[\d.,]*\d|\d")
+_CODE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def _currency_of(text: str, default_currency: str) -> str:
+    for prefix, code in _DOLLAR_PREFIXES.items():
+        if prefix in text:
+            return code
+    for code in _CODE.findall(text.upper()):
+        if code in _CODES:
+            return code
+    for symbol, code in _SYMBOLS.items():
+        if symbol in text:
+            return code
+    if "$" in text and default_currency not in _DOLLAR_CURRENCIES:
+        return "USD"
+    return default_currency
+
+
+def _amount(number: str) -> Optional[float]:
+    """
+    Read "1,200.50", "1.200,50", "89,99" or "1,20,000": the last separator is
+    the decimal point unless exactly three digits follow it and the other
+    separator isn't used. None for "1.200" (1.2 or 1200) and other forms
+    that can't be read reliably.
+    """
+    last = max(number.rfind("."), number.rfind(","))
+    if last < 0:
+        return float(number)
+    decimal, whole, fraction = number[last], number[:last], number[last + 1:]
+    thousands = "," if decimal == "." else "."
+    if len(fraction) == 3 and thousands not in whole:
+        # "1,200", "1.200.000": digit grouping, not a decimal point
+        if decimal == "." and "." not in whole:
+            return None
+        return float(number.replace(decimal, ""))
+    if decimal in whole:
+        return None
+    return float(f"{whole.replace(thousands, '')}.{fraction}")
+
+
+def parse_money(text: Optional[str], default_currency: str = "USD") -> Optional[Money]:
+    """
+    Parse a price string into Money. Ranges ("USD 100-150") take the lower
+    bound, like the old budget estimate did. Returns None when there's no
+    number, or none that can be read reliably (see _amount).
+    """
+    if not text:
+        return None
+    if _FREE.match(text):
+        return Money(amount=0.0, currency=default_currency)
+    match = _AMOUNT.search(text)
+    amount = _amount(match.group(0)) if match else None
+    if amount is None:
+        return None
+    return Money(amount=amount, currency=_currency_of(text, default_currency))
+
+
+def _with_amount(item: Dict[str, Any], field: str, currency: str) -> Dict[str, Any]:
+    """Copy of an option dict with `<field>_amount` filled in, unless it already is."""
+    if item.get(f"{field}_amount") is not None:
+        return item
+    money = parse_money(item.get(field), currency)
+    return {**item, f"{field}_amount": money.model_dump() if money else None}
+
+
+def priced_plan_items(data: Dict[str, Any], currency: str) -> Tuple[
+        List[FlightOption], List[FlightOption], List[HotelOption], List[ItineraryDay]]:
+    """Build the plan's flight/hotel/itinerary models with every price parsed once."""
+    outbound_flights = [FlightOption(**_with_amount(f, "price", currency))
+                        for f in data.get("outbound_flights", [])]
+    return_flights = [FlightOption(**_with_amount(f, "price", currency))
+                      for f in data.get("return_flights", [])]
+    hotels = [HotelOption(**_with_amount(h, "price_per_night", currency))
+              for h in data.get("hotels", [])]
+    itinerary = [
+        ItineraryDay(day=d["day"], activities=[ActivityOption(**_with_amount(a, "price", currency))
+                                               for a in d.get("activities", [])])
+        for d in data.get("itinerary", [])
+    ]
+    return outbound_flights, return_flights, hotels, itinerary
+
+
+def priced_activities(data: Dict[str, Any], currency: str) -> List[ActivityOption]:
+    """The plan's standalone activity list with prices parsed."""
+    return [ActivityOption(**_with_amount(a, "price", currency)) for a in data.get("activities", [])]
+
+
+def estimate_trip_cost(outbound_flights: List[FlightOption], return_flights: List[FlightOption],
+                       hotels: List[HotelOption], itinerary: List[ItineraryDay], days: Optional[int],
+                       currency: str, travel_month: Optional[str] = None,
+                       activities: Optional[List[ActivityOption]] = None) -> TripCost:
+    """
+    Rough trip cost: first outbound and return flight, first hotel for the
+    stay, and every itinerary activity. Without an itinerary, one activity per
+    day from `activities` stands in. Amounts in another currency than the
+    plan's are left out rather than added as if they were the same unit.
+    """
+    def amount(money: Optional[Money]) -> float:
+        return money.amount if money and money.currency == currency else 0.0
+
+    flights = (amount(outbound_flights[0].price_amount) if outbound_flights else 0.0) + \
+        (amount(return_flights[0].price_amount) if return_flights else 0.0)
+    hotel = amount(hotels[0].price_per_night_amount) * (days or 3) if hotels else 0.0
+    if itinerary:
+        activity_total = sum(amount(a.price_amount) for day in itinerary for a in day.activities)
+    else:
+        activity_total = sum(amount(a.price_amount) for a in (activities or [])[:days or 3])
+    return TripCost(currency=currency, total=flights + hotel + activity_total, flights=flights,
+                    hotels=hotel, activities=activity_total, travel_month=travel_month)
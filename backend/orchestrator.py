@@ -5,12 +5,20 @@ The TravelAgent handles all sub-agent orchestration internally using Google ADK'
 multi-agent architecture. This orchestrator now just provides a clean interface
 to the TravelAgent and handles final result assembly.
 """
-import re
-from typing import Dict, Any, List
+import asyncio
+from typing import Any, Dict
 
 from .gemini_client import get_gemini_client
+from . import recorder
 from .agents import TravelAgent
-from .models import TripPlan, UserQuery, FlightOption, HotelOption, ItineraryDay
+from .airports import airport_index
+from .analytics import travel_month
+from .compare import (COMPARE_MAX_CONCURRENT_SECTIONS, COMPARE_SECTIONS, rank_summaries, summarize,
+                      unique_destinations)
+from .replan import ALL_SECTIONS, affected_sections, merge_results, previous_sections
+from .money import estimate_trip_cost, priced_activities, priced_plan_items
+from .models import ComparisonResult, CompareQuery, TripPlan, UserQuery
+from .visa_matrix import country_code, visa_matrix
 
 
 class Orchestrator:
@@ -35,41 +43,7 @@ class Orchestrator:
             model_client=self.client
         )
 
-    def _extract_price(self, price_str: str) -> float:
-        """Helper to extract a numeric price from a string like '$1,200' or '500 EUR'"""
-        if not price_str:
-            return 0.0
-        clean_str = price_str.replace(',', '')
-        match = re.search(r'(\d+\.?\d*)', clean_str)
-        if match:
-            return float(match.group(1))
-        return 0.0
-
-    def _calculate_total_budget(self, outbound_flights: List[FlightOption], return_flights: List[FlightOption],
-                                hotels: List[HotelOption], itinerary: List[ItineraryDay], days: int, currency: str) -> str:
-        """Calculate a rough total budget estimate including roundtrip flights"""
-        total = 0.0
-
-        # Add outbound flight cost
-        if outbound_flights:
-            total += self._extract_price(outbound_flights[0].price)
-
-        # Add return flight cost
-        if return_flights:
-            total += self._extract_price(return_flights[0].price)
-
-        if hotels:
-            nightly_rate = self._extract_price(hotels[0].price_per_night)
-            total += nightly_rate * (days or 3)
-
-        if itinerary:
-            for day in itinerary:
-                for activity in day.activities:
-                    total += self._extract_price(activity.price)
-
-        return f"{currency} {total:,.2f}"
-
-    async def plan_trip(self, user_query: UserQuery, client_id: str = None) -> TripPlan:
+    async def plan_trip(self, user_query: UserQuery, client_id: str = None, user_id: str = None) -> TripPlan:
         """
         Plan a complete trip by delegating to the TravelAgent.
 
@@ -78,6 +52,8 @@ class Orchestrator:
         """
         if client_id:
             self.travel_agent.set_client_id(client_id)
+        if user_id:
+            self.travel_agent.set_user_id(user_id)
 
         # Construct query string
         query_str = f"Trip to {user_query.destination}"
@@ -92,26 +68,81 @@ class Orchestrator:
         context = user_query.model_dump()
 
         # TravelAgent orchestrates the sub-agents (FlightAgent, HotelAgent, VisaAgent, ItineraryAgent, ActivityAgent)
-        result = await self.travel_agent.perform_task(query_str, context)
-
-        # Calculate total budget estimate with roundtrip flights
-        outbound_flights = [FlightOption(**f)
-                            for f in result.get("outbound_flights", [])]
-        return_flights = [FlightOption(**f)
-                          for f in result.get("return_flights", [])]
-        hotels = [HotelOption(**h) for h in result.get("hotels", [])]
-        itinerary = [ItineraryDay(**i) for i in result.get("itinerary", [])]
-        total_budget = self._calculate_total_budget(
-            outbound_flights, return_flights, hotels, itinerary, user_query.days, user_query.currency
+        # With TRAVEL_RECORD_DIR set, the run's LLM/search traffic is saved as a cassette
+        with recorder.recording_run(context):
+            if user_query.engine == "fast":
+                # One structured completion over prefetched searches, for quick previews
+                result = await self.travel_agent.perform_fast_plan(query_str, context)
+            else:
+                result = await self.travel_agent.perform_task(query_str, context)
+
+        return self._build_trip_plan(user_query, result)
+
+    async def replan_trip(self, user_query: UserQuery, previous_query: Dict[str, Any],
+                          previous_plan: Dict[str, Any], client_id: str = None, user_id: str = None) -> TripPlan:
+        """
+        Re-plan after the user edited their search, re-running only the
+        sections that depend on the changed fields (see replan.py) and keeping
+        the rest of the previous plan. Falls back to a full plan when every
+        section is affected.
+        """
+        sections = affected_sections(previous_query, user_query.model_dump(),
+                                     previous_plan.get("section_status"))
+        if sections >= set(ALL_SECTIONS):
+            return await self.plan_trip(user_query, client_id=client_id, user_id=user_id)
+
+        previous = {**previous_plan, "section_status": {
+            section: status for section, status in previous_plan.get("section_status", {}).items()
+            if section not in sections}}
+        if not sections:
+            print("[Orchestrator] Nothing to re-plan, reusing previous plan")
+            return self._build_trip_plan(user_query, merge_results(previous, {}, sections))
+
+        if client_id:
+            self.travel_agent.set_client_id(client_id)
+        if user_id:
+            self.travel_agent.set_user_id(user_id)
+
+        query_str = f"Trip to {user_query.destination}"
+        if user_query.dates:
+            query_str += f" on {user_query.dates}"
+        if user_query.origin:
+            query_str += f" from {user_query.origin}"
+        print(f"[Orchestrator] Re-planning {sorted(sections)} for: {query_str}")
+
+        context = user_query.model_dump()
+        with recorder.recording_run(context):
+            result = await self.travel_agent.perform_task(
+                query_str, context, sections=sections,
+                known_sections={s: r for s, r in previous_sections(previous_plan).items() if s not in sections})
+
+        merged = merge_results(previous, result, sections)
+        # Kept hotels still link to the old dates
+        if "hotels" not in sections and previous_query.get("dates") != user_query.dates:
+            merged["hotels"] = [
+                {**hotel, "booking_url": self.travel_agent._generate_hotel_booking_url(
+                    hotel.get("name", "hotel"), user_query.destination, user_query.dates)}
+                for hotel in merged["hotels"]
+            ]
+        return self._build_trip_plan(user_query, merged)
+
+    def _build_trip_plan(self, user_query: UserQuery, result: Dict[str, Any]) -> TripPlan:
+        """Assemble the TripPlan from the TravelAgent's results"""
+        # Parse every price once; the amounts are stored with the plan
+        outbound_flights, return_flights, hotels, itinerary = priced_plan_items(result, user_query.currency)
+        cost = estimate_trip_cost(
+            outbound_flights, return_flights, hotels, itinerary, user_query.days, user_query.currency,
+            travel_month(user_query.dates, user_query.travel_time),
+            activities=priced_activities(result, user_query.currency)
         )
 
         # Construct Final Trip Plan
         return TripPlan(
             destination=user_query.destination or "Unknown",
             destination_images=result.get("destination_images", []),
-            outbound_flights=result.get("outbound_flights", []),
-            return_flights=result.get("return_flights", []),
-            hotels=result.get("hotels", []),
+            outbound_flights=outbound_flights,
+            return_flights=return_flights,
+            hotels=hotels,
             visa=result.get("visa", {
                 "country": user_query.destination,
                 "required": False,
@@ -120,7 +151,94 @@ class Orchestrator:
                 "application_url": None,
                 "application_steps": []
             }),
-            itinerary=result.get("itinerary", []),
-            total_budget=total_budget,
-            preferred_currency=user_query.currency
+            itinerary=itinerary,
+            total_budget=f"{cost.currency} {cost.total:,.2f}",
+            cost=cost,
+            preferred_currency=user_query.currency,
+            section_status=result.get("section_status", {})
+        )
+
+    async def compare_destinations(self, compare_query: CompareQuery, client_id: str = None,
+                                   user_id: str = None) -> ComparisonResult:
+        """
+        Plan several destinations for one origin/dates/budget and rank them.
+
+        All destinations run on one TravelAgent whose sections share a
+        concurrency cap, so N destinations don't fire 4N agents at once. The
+        origin is resolved once and shared, visa answers come from the visa
+        matrix where possible, and otherwise once per destination country
+        (Paris and Lyon share one VisaAgent run). The itinerary is skipped -
+        the comparison needs cost, visa and flight time, not a day-by-day plan.
+        """
+        travel_agent = TravelAgent(
+            name="TravelAgent",
+            model_client=self.client,
+            max_concurrent_sections=COMPARE_MAX_CONCURRENT_SECTIONS
+        )
+        if client_id:
+            travel_agent.set_client_id(client_id)
+        if user_id:
+            travel_agent.set_user_id(user_id)
+
+        destinations = unique_destinations(compare_query.destinations)
+        origin_airport = airport_index.resolve(compare_query.origin)
+        origin = origin_airport.label if origin_airport else compare_query.origin
+        base = compare_query.model_dump(exclude={"destinations", "client_id", "query"})
+        print(f"[Orchestrator] Comparing {len(destinations)} destinations from {origin}")
+
+        # Without a matrix answer, the first destination of each country runs
+        # the visa section and the others in that country take its answer
+        visa_leaders: Dict[str, str] = {}
+        visa_from: Dict[str, str] = {}
+        for destination in destinations:
+            country = country_code(destination)
+            if country is None or visa_matrix.lookup(origin, destination):
+                continue
+            leader = visa_leaders.setdefault(country, destination)
+            if leader != destination:
+                visa_from[destination] = leader
+        without_visa = tuple(section for section in COMPARE_SECTIONS if section != "visa")
+
+        async def plan_one(destination: str) -> TripPlan:
+            user_query = UserQuery(**{**base, "origin": origin, "destination": destination,
+                                      "query": f"Plan a trip to {destination}"})
+            query_str = f"Trip to {destination}"
+            if user_query.dates:
+                query_str += f" on {user_query.dates}"
+            if origin:
+                query_str += f" from {origin}"
+            context = user_query.model_dump()
+            with recorder.recording_run(context):
+                result = await travel_agent.perform_task(
+                    query_str, context, sections=without_visa if destination in visa_from else COMPARE_SECTIONS)
+            return self._build_trip_plan(user_query, result)
+
+        outcomes = await asyncio.gather(*(plan_one(d) for d in destinations), return_exceptions=True)
+        by_destination = dict(zip(destinations, outcomes))
+        for destination, leader in visa_from.items():
+            plan, leader_plan = by_destination[destination], by_destination[leader]
+            if not isinstance(plan, TripPlan) or not isinstance(leader_plan, TripPlan):
+                continue
+            by_destination[destination] = plan.model_copy(update={
+                "visa": leader_plan.visa,
+                "section_status": {**plan.section_status, "visa": leader_plan.section_status.get("visa", "degraded")},
+            })
+        outcomes = [by_destination[d] for d in destinations]
+
+        plans: Dict[str, TripPlan] = {}
+        summaries = []
+        for destination, outcome in zip(destinations, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"[Orchestrator] Comparison for {destination} failed: {outcome}")
+                summaries.append(summarize(destination, None, None, False, compare_query.currency, str(outcome)))
+                continue
+            plans[destination] = outcome
+            summaries.append(summarize(destination, outcome, compare_query.budget,
+                                       compare_query.strict_budget, compare_query.currency))
+
+        return ComparisonResult(
+            origin=origin,
+            currency=compare_query.currency,
+            destinations=rank_summaries(summaries, compare_query.strict_budget),
+            plans=plans
         )
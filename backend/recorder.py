@@ -0,0 +1,180 @@
+"""
+Opt-in traffic recorder for LLM and search calls.
+
+Set TRAVEL_RECORD_DIR to a directory and every Orchestrator.plan_trip run is
+written there as one cassette file (JSON Lines): a header with the UserQuery,
+then each LiteLlm request/response pair, each DuckDuckGo text/image search with
+its raw results, every structured-output parse outcome, and a footer with the
+run duration. backend/benchmarks/replay.py serves cassettes back offline.
+
+Recording is scoped per planning run with a ContextVar, so concurrent requests
+never interleave in one cassette and code outside a run records nothing.
+"""
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import litellm
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+
+RECORD_DIR = os.getenv("TRAVEL_RECORD_DIR")
+
+_active_run: ContextVar[Optional["CassetteRun"]] = ContextVar("cassette_run", default=None)
+
+
+def response_schema_name(response_format: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Pull the schema name (FlightList, VisaInfo, ...) out of a LiteLlm response_format."""
+    if not isinstance(response_format, dict):
+        return None
+    json_schema = response_format.get("json_schema")
+    if isinstance(json_schema, dict):
+        return json_schema.get("name")
+    schema = response_format.get("response_schema")
+    if isinstance(schema, dict):
+        return schema.get("title")
+    return None
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return value
+
+
+class CassetteRun:
+    """Entries captured during a single planning run."""
+
+    def __init__(self, user_query: Dict[str, Any]):
+        self.run_id = str(uuid.uuid4())
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.user_query = user_query
+        self.entries: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    def add(self, entry_type: str, **data: Any):
+        self.entries.append({
+            "type": entry_type,
+            "offset_s": round(time.perf_counter() - self._t0, 4),
+            **data,
+        })
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._t0
+
+    def parse_failures(self) -> int:
+        return sum(1 for e in self.entries if e["type"] == "parse" and not e["ok"])
+
+    def save(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.started_at))
+        path = os.path.join(directory, f"{stamp}-{self.run_id}.jsonl")
+        header = {"type": "run", "run_id": self.run_id, "started_at": self.started_at,
+                  "user_query": self.user_query}
+        footer = {"type": "end", "duration_s": round(self.elapsed, 4), "error": self.error}
+        with open(path, "w") as f:
+            for line in [header, *self.entries, footer]:
+                f.write(json.dumps(line, default=str) + "\n")
+        print(f"[Recorder] Saved cassette {path} ({len(self.entries)} entries)")
+        return path
+
+
+@contextmanager
+def observe_run(user_query: Dict[str, Any]) -> Iterator[CassetteRun]:
+    """Capture entries for one run in memory without writing a cassette."""
+    run = CassetteRun(user_query)
+    token = _active_run.set(run)
+    try:
+        yield run
+    except Exception as e:
+        run.error = str(e)
+        raise
+    finally:
+        _active_run.reset(token)
+
+
+@contextmanager
+def recording_run(user_query: Dict[str, Any]) -> Iterator[Optional[CassetteRun]]:
+    """
+    Record one planning run to TRAVEL_RECORD_DIR when recording is enabled.
+
+    Nested inside an already active run (e.g. a replay harness observing the
+    run) this is a no-op and entries keep flowing to the outer run.
+    """
+    if not RECORD_DIR or _active_run.get() is not None:
+        yield _active_run.get()
+        return
+
+    with observe_run(user_query) as run:
+        try:
+            yield run
+        finally:
+            try:
+                run.save(RECORD_DIR)
+            except OSError as e:
+                print(f"[Recorder] Failed to save cassette: {e}")
+
+
+def record(entry_type: str, **data: Any):
+    """Append an entry to the active run, if any."""
+    run = _active_run.get()
+    if run is not None:
+        run.add(entry_type, **data)
+
+
+def record_search(kind: str, query: str, max_results: int, results: List[Dict[str, Any]], duration: float):
+    record("search", kind=kind, query=query, max_results=max_results,
+           results=results, duration_s=round(duration, 4))
+
+
+class RecordingLLMClient(LiteLLMClient):
+    """Wraps a LiteLLMClient and records every completion into the active run."""
+
+    def __init__(self, inner: LiteLLMClient):
+        self.inner = inner
+
+    async def acompletion(self, model: Any, messages: Any, tools: Any, **kwargs: Any):
+        started = time.perf_counter()
+        response = await self.inner.acompletion(model=model, messages=messages, tools=tools, **kwargs)
+        if _active_run.get() is None:
+            return response
+        if kwargs.get("stream"):
+            return self._record_stream(response, started, model, messages, tools, kwargs)
+        self._record(response, started, model, messages, tools, kwargs)
+        return response
+
+    async def _record_stream(self, stream: Any, started: float, model: Any, messages: Any,
+                             tools: Any, kwargs: Dict[str, Any]):
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        # Stored as one complete response; replay re-chunks it when asked to stream
+        self._record(litellm.stream_chunk_builder(chunks), started, model, messages, tools, kwargs)
+
+    def _record(self, response: Any, started: float, model: Any, messages: Any,
+                tools: Any, kwargs: Dict[str, Any]):
+        record(
+            "llm",
+            model=model,
+            schema=response_schema_name(kwargs.get("response_format")),
+            turn=sum(1 for m in messages if m.get("role") == "assistant"),
+            request={
+                "messages": [_to_jsonable(m) for m in messages],
+                "tools": [t.get("function", {}).get("name") for t in tools or []],
+            },
+            response=_to_jsonable(response),
+            duration_s=round(time.perf_counter() - started, 4),
+        )
+
+
+def instrument_model(model: LiteLlm) -> LiteLlm:
+    """Route a LiteLlm through RecordingLLMClient when recording is enabled."""
+    if RECORD_DIR and not isinstance(model.llm_client, RecordingLLMClient):
+        model.llm_client = RecordingLLMClient(model.llm_client)
+    return model
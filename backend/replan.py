@@ -0,0 +1,101 @@
+"""
+Incremental re-planning.
+
+When a user edits one field of their search and re-submits, only the
+sections whose agent prompts read that field need to run again; the rest of
+the previous trip plan is kept. FIELD_DEPENDENCIES mirrors the context keys
+each sub-agent's create_adk_agent uses.
+"""
+from typing import Any, Dict, Iterable, List, Set
+
+ALL_SECTIONS = ("flights", "hotels", "visa", "activities", "itinerary")
+
+# UserQuery field -> sections whose agent prompt uses it
+FIELD_DEPENDENCIES: Dict[str, Set[str]] = {
+    "destination": set(ALL_SECTIONS),
+    "origin": {"flights", "visa", "itinerary"},
+    "dates": {"flights"},  # hotel booking links also carry the dates; they are rebuilt on merge
+    "days": {"flights", "hotels", "itinerary"},
+    "travelers": {"flights", "hotels"},
+    "travel_time": {"flights", "hotels"},
+    "currency": {"flights", "hotels", "activities"},
+    "strict_budget": {"flights", "hotels", "activities"},
+    # Not read by any agent prompt
+    "budget": set(),
+    "query": set(),
+    "deadline_seconds": set(),
+    "engine": set(),
+    "client_id": set(),
+}
+
+# The itinerary is built around the activity list, so new activities mean a new itinerary
+ITINERARY_INPUTS = {"activities"}
+
+# Section -> TripPlan fields it produces
+SECTION_FIELDS: Dict[str, List[str]] = {
+    "flights": ["outbound_flights", "return_flights"],
+    "hotels": ["hotels"],
+    "visa": ["visa"],
+    "activities": [],  # Not part of TripPlan; feeds the itinerary
+    "itinerary": ["itinerary"],
+}
+
+
+def affected_sections(previous_query: Dict[str, Any], new_query: Dict[str, Any],
+                      previous_status: Dict[str, str] = None) -> Set[str]:
+    """
+    Sections to re-run: those depending on a changed field, the itinerary when
+    its inputs change, and any section that didn't finish "ok" last time.
+    Unknown fields are treated as affecting everything.
+    """
+    sections: Set[str] = set()
+    for field in set(previous_query) | set(new_query):
+        if previous_query.get(field) != new_query.get(field):
+            sections |= FIELD_DEPENDENCIES.get(field, set(ALL_SECTIONS))
+    if sections & ITINERARY_INPUTS:
+        sections.add("itinerary")
+    sections |= {section for section, status in (previous_status or {}).items()
+                 if section in ALL_SECTIONS and status != "ok"}
+    return sections
+
+
+def previous_sections(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Section results recovered from a stored trip plan, in the shape the
+    itinerary agent's gathered_info uses. Activities aren't stored on their
+    own, so the previous itinerary's activities stand in for them.
+    """
+    return {
+        "flights": {"outbound_flights": plan.get("outbound_flights", []),
+                    "return_flights": plan.get("return_flights", [])},
+        "hotels": {"hotels": plan.get("hotels", [])},
+        "visa": plan.get("visa"),
+        "activities": {"activities": [a for day in plan.get("itinerary", []) for a in day.get("activities", [])]},
+    }
+
+
+def merge_results(plan: Dict[str, Any], result: Dict[str, Any], sections: Iterable[str]) -> Dict[str, Any]:
+    """
+    The previous plan (a TripPlan dict) with the re-run sections' fields
+    replaced by fresh results, in the shape TravelAgent.perform_task returns.
+    """
+    sections = set(sections)
+    merged = {
+        "outbound_flights": plan.get("outbound_flights", []),
+        "return_flights": plan.get("return_flights", []),
+        "hotels": plan.get("hotels", []),
+        "visa": plan.get("visa"),
+        "itinerary": plan.get("itinerary", []),
+        "activities": [],
+        "destination_images": plan.get("destination_images", []),
+        "section_status": dict(plan.get("section_status", {})),
+    }
+    for section in sections:
+        for field in SECTION_FIELDS[section]:
+            merged[field] = result.get(field, merged[field])
+    if "activities" in sections:
+        merged["activities"] = result.get("activities", [])
+    if not merged["destination_images"]:
+        merged["destination_images"] = result.get("destination_images", [])
+    merged["section_status"].update(result.get("section_status", {}))
+    return merged
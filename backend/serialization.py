@@ -0,0 +1,46 @@
+"""
+Serialize-once JSON for trip plans.
+
+A TripPlan is validated once, when Orchestrator._build_trip_plan assembles
+it, and encoded once, by pydantic-core's serializer (encode_model). That text
+is what database.add_message stores, and json_response splices it into the
+HTTP response as is: it is never dumped to dicts, re-validated or re-encoded
+on the way out. Stored plans go back out the same way, straight from the
+trip_plan column.
+"""
+import json
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel
+
+
+class RawJSON:
+    """JSON text that is already encoded, to be embedded as is."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def encode_model(model: BaseModel) -> RawJSON:
+    return RawJSON(model.model_dump_json())
+
+
+def encode(value: Any) -> str:
+    """JSON text of plain values, with RawJSON and models embedded without a dict round trip"""
+    if isinstance(value, RawJSON):
+        return value.text
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{json.dumps(str(k))}:{encode(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(encode(v) for v in value) + "]"
+    if isinstance(value, BaseModel):
+        return value.model_dump_json()
+    return json.dumps(value)
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """A JSON response encoded by `encode`, bypassing FastAPI's jsonable_encoder"""
+    return Response(encode(content).encode(), status_code=status_code, media_type="application/json")
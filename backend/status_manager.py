@@ -30,9 +30,11 @@ class StatusManager:
                 del self.active_connections[client_id]
         print(f"[StatusManager] Client {client_id} disconnected.")
 
-    async def send_status(self, client_id: str, status: str, step: str = None, data: dict = None):
+    async def send_status(self, client_id: str, status: str, step: str = None, data: dict = None,
+                          progress: dict = None):
         """
         Send a status update to all connected clients for a specific client_id.
+        `progress` (elapsed_s, pending sections, eta_s) is included when given.
         """
         if not client_id or client_id not in self.active_connections:
             return
@@ -42,6 +44,8 @@ class StatusManager:
             "step": step,
             "data": data or {}
         }
+        if progress is not None:
+            message["progress"] = progress
         
         payload = json.dumps(message)
         
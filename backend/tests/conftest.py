@@ -0,0 +1,22 @@
+"""
+Shared fixtures. Run from the repository root: python -m pytest backend/tests
+"""
+import os
+
+# litellm fetches its model cost map at import unless told to use the bundled one
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+import pytest
+
+from backend import database as db
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Point the chat DB (and the ADK session store) at a throwaway directory."""
+    from backend.agents.base_agent import Agent, ReportingSessionService
+
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "travel_agent.db"))
+    monkeypatch.setattr(Agent, "_session_service", ReportingSessionService(str(tmp_path / "adk_sessions.db")))
+    db.init_db()
+    return tmp_path
@@ -0,0 +1,16 @@
+import pytest
+
+from backend.analytics import travel_month
+
+
+@pytest.mark.parametrize("text, month", [
+    ("March 10-17, 2026", "2026-03"),
+    ("Sept. 2026", "2026-09"),
+    ("2026-03-10 to 2026-03-17", "2026-03"),
+    ("maybe April 2026", "2026-04"),
+    ("Marrakech in 2026", None),
+    ("Decent weather, 2026", None),
+    ("Summer 2026", None),
+])
+def test_travel_month(text, month):
+    assert travel_month(text) == month
@@ -0,0 +1,25 @@
+import asyncio
+
+from backend.agents.visa_agent import VisaAgent
+from backend.benchmarks.fakes import fake_backends
+from backend.models import CompareQuery
+from backend.visa_matrix import visa_matrix
+
+
+def test_destinations_in_one_country_share_a_visa_lookup(temp_db, monkeypatch):
+    from backend.orchestrator import Orchestrator
+
+    monkeypatch.setattr(visa_matrix, "_entries", {})
+    monkeypatch.setattr(visa_matrix, "_loaded", True)
+    visa_runs = []
+    create_adk_agent = VisaAgent.create_adk_agent
+    monkeypatch.setattr(VisaAgent, "create_adk_agent",
+                        lambda self, context: visa_runs.append(context["destination"]) or create_adk_agent(self, context))
+
+    with fake_backends():
+        result = asyncio.run(Orchestrator().compare_destinations(
+            CompareQuery(origin="New York", destinations=["Paris", "Lyon", "Tokyo"], days=3)))
+
+    assert sorted(visa_runs) == ["Paris", "Tokyo"]
+    assert result.plans["Lyon"].visa == result.plans["Paris"].visa
+    assert result.plans["Lyon"].section_status["visa"] == result.plans["Paris"].section_status["visa"]
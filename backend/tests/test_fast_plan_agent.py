@@ -0,0 +1,15 @@
+import asyncio
+
+from backend.agents.fast_plan_agent import FastPlanAgent
+from backend.benchmarks.fakes import fake_backends
+
+
+def test_perform_task_returns_a_plan(temp_db):
+    with fake_backends():
+        agent = FastPlanAgent("FastPlanAgent")
+        plan = asyncio.run(agent.perform_task(
+            "Trip to Paris", {"destination": "Paris", "origin": "New York", "days": 3, "search_results": {}}))
+
+    assert plan["outbound_flights"]
+    assert plan["hotels"]
+    assert plan["days"]
@@ -0,0 +1,23 @@
+from backend import database as db
+from backend.agents.deadlines import LatencyTracker
+
+
+def test_history_is_read_only_by_load(temp_db, monkeypatch):
+    tracker = LatencyTracker(persist=True)
+    for seconds in (1.0, 2.0, 3.0):
+        tracker.record("flights", seconds, "FR")
+    tracker.flush()
+
+    restarted = LatencyTracker(persist=True)
+    reads = []
+    monkeypatch.setattr(db, "get_section_latencies",
+                        lambda *args, wrapped=db.get_section_latencies: reads.append(args) or wrapped(*args))
+    restarted.record("hotels", 1.5)
+    assert restarted.percentile("flights", 50) is None
+    assert restarted.stats()["hotels"]["samples"] == 1
+    assert reads == []
+
+    restarted.load()
+    assert len(reads) == 1
+    assert restarted.percentile("flights", 50) == 2.0
+    assert restarted.percentile("flights", 50, "FR") == 2.0
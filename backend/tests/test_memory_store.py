@@ -0,0 +1,29 @@
+from backend import database as db
+from backend.memory_store import compact_memories, upsert_memory
+
+
+def test_upsert_adds_when_the_duplicate_was_deleted(temp_db, monkeypatch):
+    first = upsert_memory("travel_style", "Prefers boutique hotels", "trip", 0.6)
+    monkeypatch.setattr(db, "get_memory_by_hash", lambda *args: {**first, "confidence": 0.6})
+    db.delete_memory(first["id"])
+
+    memory = upsert_memory("travel_style", "Prefers boutique hotels", "trip", 0.6)
+
+    assert memory["merged"] is False
+    assert [m["content"] for m in db.get_memories()] == ["Prefers boutique hotels"]
+
+
+def test_compaction_keeps_a_reinforcement_made_mid_pass(temp_db, monkeypatch):
+    memory = upsert_memory("travel_style", "Prefers boutique hotels", "trip", 0.6)
+    read = db.get_memories_for_compaction
+
+    def read_then_reinforce(shard=None):
+        rows = read(shard)
+        db.reinforce_memory(memory["id"], 0.9)
+        return rows
+
+    monkeypatch.setattr(db, "get_memories_for_compaction", read_then_reinforce)
+    stats = compact_memories()
+
+    assert stats["skipped"] == 1
+    assert db.get_memories()[0]["confidence"] == 0.9
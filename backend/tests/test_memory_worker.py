@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from backend import database as db
+from backend.agents.memory_agent import MemoryAgent
+from backend.benchmarks.fakes import fake_backends
+from backend.memory_worker import CHECKPOINT, MemoryWorker
+
+
+def test_checkpoint_only_moves_after_a_memory_list(temp_db, monkeypatch):
+    db.create_session("trip", "Paris", "Paris")
+    db.add_message("trip", "user", "Trip to Paris", user_query={"query": "Trip to Paris", "destination": "Paris"})
+    plan = db.add_message("trip", "assistant", "Here is your plan", trip_plan={"destination": "Paris"})
+    worker = MemoryWorker(batch_size=5)
+
+    async def empty_output(self, *args, **kwargs):
+        return {}
+
+    monkeypatch.setattr(MemoryAgent, "run_adk_agent", empty_output)
+    with fake_backends(), pytest.raises(ValueError):
+        asyncio.run(worker.run_once(force=True))
+    assert db.get_checkpoint(CHECKPOINT) == 0
+
+    async def memory_list(self, *args, **kwargs):
+        return {"memories": [{"memory_type": "destination_preference", "content": "Likes Paris",
+                              "confidence": 0.8}]}
+
+    monkeypatch.setattr(MemoryAgent, "run_adk_agent", memory_list)
+    with fake_backends():
+        assert asyncio.run(worker.run_once(force=True)) == 1
+    assert db.get_checkpoint(CHECKPOINT) == plan["id"]
+    assert [m["content"] for m in db.get_memories()] == ["Likes Paris"]
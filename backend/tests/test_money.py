@@ -0,0 +1,18 @@
+import pytest
+
+from backend.money import parse_money
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("USD 1,200", 1200.0),
+    ("$85/night", 85.0),
+    ("USD 100-150", 100.0),
+    ("1.200,50 EUR", 1200.5),
+    ("€89,99", 89.99),
+    ("₹1,20,000", 120000.0),
+    ("1.200.000 IDR", 1200000.0),
+    ("1.200 EUR", None),
+])
+def test_parse_money(text, amount):
+    money = parse_money(text)
+    assert (money.amount if money else None) == amount
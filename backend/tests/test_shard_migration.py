@@ -0,0 +1,25 @@
+from backend import database as db
+from backend.memory_store import upsert_memory
+
+
+def test_unsharded_user_data_moves_into_shards(temp_db, monkeypatch):
+    for user_id in ("alice", "bob"):
+        db.create_session(f"{user_id}-trip", "Paris", "Paris", user_id=user_id)
+        db.add_message(f"{user_id}-trip", "user", "Trip to Paris", user_query={"destination": "Paris"},
+                       user_id=user_id)
+        upsert_memory("preference", f"{user_id} likes museums", f"{user_id}-trip", 0.9, user_id)
+    db.set_checkpoint("memory_extraction", 2)
+
+    monkeypatch.setattr(db, "USER_SHARDS", 2)
+    moved = db.migrate_to_shards()
+
+    assert sum(moved.values()) == 2
+    for user_id in ("alice", "bob"):
+        assert db.get_session(f"{user_id}-trip", user_id)["title"] == "Paris"
+        assert [m["content"] for m in db.get_session_messages(f"{user_id}-trip", user_id)] == ["Trip to Paris"]
+        assert [m["content"] for m in db.get_memories(user_id=user_id)] == [f"{user_id} likes museums"]
+    with db.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0] == 0
+    for shard in moved:
+        assert db.get_checkpoint(f"memory_extraction:{shard:02d}") == 2
+    assert db.migrate_to_shards() == {}
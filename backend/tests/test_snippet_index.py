@@ -0,0 +1,49 @@
+import pytest
+
+from backend.agents.tools.search_providers import SearchMiss
+from backend.agents.tools.snippet_index import SnippetIndexProvider, set_search_scope
+
+
+def results(topic: str, n: int = 3):
+    return [{"title": f"{topic} deal {i}", "href": f"https://example.com/{topic.replace(' ', '-')}/{i}",
+             "body": f"{topic} from USD {300 + i}"} for i in range(n)]
+
+
+@pytest.fixture
+def index(temp_db):
+    provider = SnippetIndexProvider()
+    set_search_scope("Paris", "New York")
+    provider.remember("text", "roundtrip flights New York to Paris March 2026 prices",
+                      results("roundtrip flights New York to Paris"))
+    provider.remember("text", "New York citizens visa requirements Paris official visa application site",
+                      results("France visa requirements for New York citizens"))
+    provider.remember("text", "best hotels Paris prices per night", results("best hotels Paris"))
+    return provider
+
+
+def test_same_origin_near_duplicate_is_answered(index):
+    set_search_scope("Paris", "New York")
+    assert len(index.search("text", "roundtrip flights New York to Paris Spring 2026 prices", 3)) == 3
+
+
+def test_different_origin_flight_search_misses(index):
+    set_search_scope("Paris", "London")
+    with pytest.raises(SearchMiss):
+        index.search("text", "roundtrip flights London to Paris March 2026 prices", 3)
+
+
+def test_different_nationality_visa_search_misses(index):
+    set_search_scope("Paris", "India")
+    with pytest.raises(SearchMiss):
+        index.search("text", "India citizens visa requirements Paris official visa application site", 3)
+
+
+def test_origin_independent_search_is_shared_across_origins(index):
+    set_search_scope("Paris", "London")
+    assert len(index.search("text", "best hotels Paris prices per night 2026", 3)) == 3
+
+
+def test_search_outside_a_plan_misses(index):
+    set_search_scope(None)
+    with pytest.raises(SearchMiss):
+        index.search("text", "best hotels Paris prices per night", 3)
@@ -0,0 +1,18 @@
+import pytest
+
+from backend.visa_matrix import country_code
+
+
+@pytest.mark.parametrize("place, code", [
+    ("Japan", "JP"),
+    ("tokyo", "JP"),
+    ("Kyoto, Japan", "JP"),
+    ("London (LHR)", "GB"),
+    ("US", "US"),
+    ("Paris, TX", None),
+    ("Springfield, IL", None),
+    ("LA", "US"),
+    ("Laos", "LA"),
+])
+def test_country_code(place, code):
+    assert country_code(place) == code
@@ -0,0 +1,161 @@
+"""
+Bulk export and import of a user's sessions, messages and memories as NDJSON.
+
+An export is one JSON object per line:
+
+    {"type": "export", "version": 1, "user_id": ..., "exported_at": ...}
+    {"type": "session", "id": ..., "title": ..., "destination": ..., ...}
+    {"type": "message", "session_id": ..., "role": ..., "trip_plan": "<JSON text>", ...}
+    ...
+    {"type": "memory", "memory_type": ..., "content": ..., "confidence": ..., ...}
+
+Every session line is followed by its messages, archived sessions included
+(read from their segment). trip_plan and user_query keep the stored JSON text,
+so plans are neither parsed nor re-encoded on either side. Rows are read in
+keyset-paginated pages, so memory use doesn't grow with the history.
+
+An import reads the request body line by line and commits every BATCH_LINES
+lines in one transaction, together with the number of lines done so far as
+the import's checkpoint. Sending the same import_id again resumes: lines up
+to the checkpoint are skipped, so the client can re-send the whole file, or
+only the rest of it with start_line set to the checkpoint. A new import_id
+imports everything again (messages of existing sessions are added again).
+Sessions whose id another user already has get a stable new id.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+from . import database as db
+from .archive import read_archived_messages
+from .memory_store import content_hash
+
+FORMAT_VERSION = 1
+PAGE_SIZE = 500
+BATCH_LINES = 1000
+
+_MESSAGE_FIELDS = ("session_id", "role", "content", "trip_plan", "user_query", "created_at")
+_REQUIRED = {"session": ("id",), "message": ("session_id", "role", "content"), "memory": ("memory_type", "content")}
+
+
+def _line(record: Dict[str, Any]) -> str:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def _session_messages(session_id: str, user_id: str) -> Iterator[Dict[str, Any]]:
+    location = db.get_archive_location(session_id, user_id)
+    if location is not None:
+        yield from read_archived_messages(db.shard_for(user_id), location)
+        return
+    after = 0
+    while True:
+        page = db.get_raw_messages_page(session_id, after, PAGE_SIZE, user_id)
+        yield from page
+        if len(page) < PAGE_SIZE:
+            return
+        after = page[-1]['id']
+
+
+def export_lines(user_id: str) -> Iterator[str]:
+    """NDJSON lines of everything a user has, one page of rows in memory at a time"""
+    yield _line({"type": "export", "version": FORMAT_VERSION, "user_id": user_id,
+                 "exported_at": datetime.utcnow().isoformat()})
+
+    after = ""
+    while True:
+        sessions = db.get_sessions_page(user_id, after, PAGE_SIZE)
+        for session in sessions:
+            yield _line({"type": "session", "id": session['id'], "title": session['title'],
+                         "destination": session['destination'], "created_at": session['created_at'],
+                         "updated_at": session['updated_at']})
+            for message in _session_messages(session['id'], user_id):
+                yield _line({"type": "message", **{field: message.get(field) for field in _MESSAGE_FIELDS}})
+        if len(sessions) < PAGE_SIZE:
+            break
+        after = sessions[-1]['id']
+
+    after = 0
+    while True:
+        memories = db.get_memories_page(user_id, after, PAGE_SIZE)
+        for memory in memories:
+            yield _line({"type": "memory", **{k: v for k, v in memory.items() if k not in ("id", "content_hash")}})
+        if len(memories) < PAGE_SIZE:
+            break
+        after = memories[-1]['id']
+
+
+def checkpoint_name(import_id: str) -> str:
+    return f"import:{import_id}"
+
+
+def import_progress(user_id: str, import_id: str) -> int:
+    """Lines of an import committed so far"""
+    return db.get_checkpoint(checkpoint_name(import_id), db.shard_for(user_id))
+
+
+class TransferError(ValueError):
+    """A line of an import couldn't be read"""
+
+
+async def import_lines(chunks: AsyncIterator[bytes], user_id: str, import_id: str,
+                       start_line: int = 0) -> Dict[str, Any]:
+    """
+    Import NDJSON from a byte stream into a user's data. start_line is the
+    line number of the stream's first line within the whole export.
+    """
+    done = import_progress(user_id, import_id)
+    checkpoint = checkpoint_name(import_id)
+    totals = {"sessions": 0, "messages": 0, "memories": 0}
+    batch: Dict[str, List[Dict[str, Any]]] = {"session": [], "message": [], "memory": []}
+    pending = 0
+    line_no = start_line
+
+    async def commit():
+        nonlocal pending
+        counts = await asyncio.to_thread(db.import_batch, user_id, batch["session"], batch["message"],
+                                         batch["memory"], checkpoint, line_no)
+        for key, value in counts.items():
+            totals[key] += value
+        for rows in batch.values():
+            rows.clear()
+        pending = 0
+
+    def take(raw: bytes):
+        nonlocal pending
+        if line_no <= done or not raw.strip():
+            return
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            raise TransferError(f"Line {line_no}: {e}")
+        kind = record.get("type") if isinstance(record, dict) else None
+        if kind not in batch:
+            # The header line, or a record type this version doesn't know
+            return
+        missing = [field for field in _REQUIRED[kind] if record.get(field) is None]
+        if missing:
+            raise TransferError(f"Line {line_no}: {kind} without {', '.join(missing)}")
+        if kind == "memory":
+            record["content_hash"] = content_hash(record["memory_type"], record["content"])
+        batch[kind].append(record)
+        pending += 1
+
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            take(raw)
+            if pending >= BATCH_LINES:
+                await commit()
+    if buffer.strip():
+        line_no += 1
+        take(buffer)
+    if pending or line_no > done:
+        await commit()
+
+    skipped = max(0, min(done, line_no) - start_line)
+    print(f"[Transfer] Import {import_id} for {user_id}: {totals} ({skipped} lines already imported)")
+    return {"import_id": import_id, "lines": line_no, "skipped_lines": skipped, "imported": totals}
@@ -0,0 +1,151 @@
+"""
+Local visa matrix keyed on (origin country, destination country).
+
+Visa rules change rarely, so VisaAgent's search + extraction only needs to run
+when the matrix has no fresh answer for a pair. Entries live in the
+visa_matrix table and are loaded into an in-memory dict at startup, so a lookup
+is one place-name normalization plus a dict access.
+
+Entries are written whenever VisaAgent produces a result during planning, and
+the refresh job re-runs VisaAgent for entries older than the TTL:
+
+    python -m backend.visa_matrix --refresh [--limit 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import database as db
+from .airports import airport_index
+
+# How long an answer is trusted before VisaAgent runs again
+VISA_TTL_DAYS = float(os.getenv("TRAVEL_VISA_TTL_DAYS", "30"))
+
+_PLACES_PATH = os.path.join(os.path.dirname(__file__), "data", "countries.json")
+
+with open(_PLACES_PATH) as _f:
+    _places_data = json.load(_f)
+COUNTRY_NAMES: Dict[str, str] = _places_data["names"]
+_PLACE_CODES: Dict[str, str] = _places_data["places"]
+
+
+def country_code(place: Optional[str]) -> Optional[str]:
+    """
+    Normalize a country, city or airport ("Japan", "tokyo", "Paris, France",
+    "US", "London (LHR)") to an ISO 3166 alpha-2 code. Returns None for places
+    we can't resolve, including "City, Qualifier" forms whose qualifier we
+    don't know ("Paris, TX" is not in France).
+    """
+    if not place:
+        return None
+    text = " ".join(place.strip().lower().replace(".", "").split())
+    if text in _PLACE_CODES:
+        return _PLACE_CODES[text]
+    if "," in text:
+        # "Kyoto, Japan" -> the qualifier decides; never fall back to the city
+        return _PLACE_CODES.get(text.rsplit(",", 1)[1].strip())
+    airport = airport_index.resolve(place)
+    if airport:
+        return airport.country
+    # A bare ISO code ("US"), once no city or airport alias claimed it ("LA")
+    return text.upper() if text.upper() in COUNTRY_NAMES else None
+
+
+class VisaMatrix:
+    """In-memory index over the visa_matrix table."""
+
+    def __init__(self, ttl_days: float = VISA_TTL_DAYS):
+        self.ttl = timedelta(days=ttl_days)
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._loaded = False
+
+    def load(self):
+        """(Re)load every entry from the database."""
+        self._entries = {(e['origin_code'], e['destination_code']): e for e in db.get_visa_entries()}
+        self._loaded = True
+        print(f"[VisaMatrix] Loaded {len(self._entries)} visa entries")
+
+    @staticmethod
+    def key(origin: Optional[str], destination: Optional[str]) -> Optional[Tuple[str, str]]:
+        origin_code, destination_code = country_code(origin), country_code(destination)
+        if not origin_code or not destination_code:
+            return None
+        return origin_code, destination_code
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        updated_at = datetime.fromisoformat(str(entry['updated_at']))
+        return datetime.utcnow() - updated_at < self.ttl
+
+    def lookup(self, origin: Optional[str], destination: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Visa info for the pair if the matrix has a fresh answer, else None."""
+        if not self._loaded:
+            self.load()
+        key = self.key(origin, destination)
+        entry = self._entries.get(key) if key else None
+        if entry is None or not self._is_fresh(entry):
+            return None
+        return entry['visa_info']
+
+    def store(self, origin: Optional[str], destination: Optional[str], visa_info: Dict[str, Any]) -> bool:
+        """Save a VisaAgent result. Returns False when the pair can't be normalized."""
+        key = self.key(origin, destination)
+        if key is None:
+            return False
+        if not self._loaded:
+            self.load()
+        self._entries[key] = db.upsert_visa_entry(*key, visa_info, origin=origin, destination=destination)
+        return True
+
+    def stale_entries(self) -> List[Dict[str, Any]]:
+        if not self._loaded:
+            self.load()
+        return [e for e in self._entries.values() if not self._is_fresh(e)]
+
+
+visa_matrix = VisaMatrix()
+
+
+async def refresh_stale(limit: Optional[int] = None) -> int:
+    """Re-run VisaAgent for stale entries and store the fresh answers."""
+    from .agents.visa_agent import VisaAgent, VisaInfo
+
+    agent = VisaAgent("VisaAgent")
+    stale = visa_matrix.stale_entries()[:limit]
+    refreshed = 0
+    for entry in stale:
+        origin = entry['origin'] or COUNTRY_NAMES.get(entry['origin_code'], entry['origin_code'])
+        destination = entry['destination'] or COUNTRY_NAMES.get(entry['destination_code'], entry['destination_code'])
+        context = {"origin": origin, "destination": destination}
+        adk_agent = agent.create_adk_agent(context)
+        try:
+            result = await agent.run_adk_agent(
+                adk_agent, f"Visa requirements from {origin} to {destination}", f"visa-refresh-{uuid.uuid4()}")
+        except Exception as e:
+            print(f"[VisaMatrix] Refresh failed for {origin} -> {destination}: {e}")
+            continue
+        if isinstance(result, VisaInfo):
+            visa_matrix.store(origin, destination, result.model_dump())
+            refreshed += 1
+    print(f"[VisaMatrix] Refreshed {refreshed}/{len(stale)} stale entries")
+    return refreshed
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Inspect or refresh the local visa matrix")
+    parser.add_argument("--refresh", action="store_true", help="Re-run VisaAgent for stale entries")
+    parser.add_argument("--limit", type=int, help="Refresh at most this many entries")
+    args = parser.parse_args(argv)
+
+    if args.refresh:
+        asyncio.run(refresh_stale(args.limit))
+    else:
+        visa_matrix.load()
+        print(f"[VisaMatrix] {len(visa_matrix.stale_entries())} stale (TTL {VISA_TTL_DAYS:g} days)")
+
+
+if __name__ == "__main__":
+    main()
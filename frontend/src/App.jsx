@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { BrowserRouter, Routes, Route, useNavigate, Navigate, useLocation } from 'react-router-dom';
-import { planTripWithSession, createStatusWebSocket } from './api';
+import { planTripWithSession, replanTrip, createStatusWebSocket } from './api';
 import { getSession } from './api/sessions';
 import ItineraryDrawer from './components/ItineraryDrawer';
 import ChatSidebar from './components/ChatSidebar';
@@ -61,6 +61,7 @@ function AppContent() {
     const [travelTime, setTravelTime] = useState('');
     const [strictBudget, setStrictBudget] = useState(false);
     const [statusMessage, setStatusMessage] = useState('');
+    const [progress, setProgress] = useState(null);
     const [clientId] = useState(() => crypto.randomUUID());
     const hasAttemptedRestore = useRef(false);
 
@@ -68,7 +69,8 @@ function AppContent() {
     useEffect(() => {
         const cleanup = createStatusWebSocket(clientId, {
             onStatusUpdate: setStatusMessage,
-            onStepChange: setCurrentStep
+            onStepChange: setCurrentStep,
+            onProgress: setProgress
         });
         return cleanup;
     }, [clientId]);
@@ -152,7 +154,7 @@ function AppContent() {
         }
     }, [location.pathname, tripPlan, loading, error, navigate, currentSessionId]);
 
-    const handleSearch = async (e) => {
+    const handleSearch = async (e, { replan = false } = {}) => {
         e?.preventDefault();
         if (!destination.trim()) return;
 
@@ -161,12 +163,15 @@ function AppContent() {
         setTripPlan(null);
         setHasSearched(true);
         setCurrentStep(0);
+        setProgress(null);
         setIsItineraryOpen(false);
 
         navigate('/trip');
 
         try {
-            const result = await planTripWithSession({
+            // Edits to an existing trip only re-run the affected sections
+            const plan = replan && currentSessionId ? replanTrip : planTripWithSession;
+            const result = await plan({
                 destination, dates, origin, days, travelers,
                 travel_time: travelTime, currency,
                 strict_budget: strictBudget,
@@ -275,6 +280,7 @@ function AppContent() {
                             agentSteps={agentSteps}
                             currentStep={currentStep}
                             statusMessage={statusMessage}
+                            progress={progress}
                             destination={destination}
                             setDestination={setDestination}
                             origin={origin}
@@ -290,7 +296,7 @@ function AppContent() {
                             strictBudget={strictBudget}
                             setStrictBudget={setStrictBudget}
                             setIsItineraryOpen={setIsItineraryOpen}
-                            onRefetch={handleSearch}
+                            onRefetch={(e) => handleSearch(e, { replan: true })}
                         />
                     } />
                     <Route path="/" element={<Navigate to="/search" replace />} />
@@ -1,2 +1,2 @@
 // Re-export from API service for backward compatibility
-export { fetchAirports, searchAirports } from './api/airports';
+export { searchAirports } from './api/airports';
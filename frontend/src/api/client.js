@@ -2,10 +2,14 @@ import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.PROD ? '' : 'http://localhost:8000';
 
+// Sessions and memories are scoped per user; without an id the API uses its default user
+const USER_ID = import.meta.env.VITE_USER_ID;
+
 const client = axios.create({
     baseURL: API_BASE_URL,
     headers: {
         'Content-Type': 'application/json',
+        ...(USER_ID ? { 'X-User-Id': USER_ID } : {}),
     },
 });
 
@@ -2,4 +2,5 @@ export * from './trip';
 export { createStatusWebSocket } from './trip';
 export * from './sessions';
 export * from './memories';
+export * from './airports';
 export { default as client } from './client';
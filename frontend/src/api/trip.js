@@ -18,15 +18,28 @@ export const planTripWithSession = async (queryData, sessionId = null) => {
     }
 };
 
+// Re-plan a session's trip after the search was edited.
+// Only the sections affected by the changed fields are re-run on the backend.
+export const replanTrip = async (queryData, sessionId) => {
+    try {
+        const response = await client.post(`/replan_trip?session_id=${sessionId}`, queryData);
+        return response.data;
+    } catch (error) {
+        console.error("Error re-planning trip:", error);
+        throw error;
+    }
+};
+
 /**
  * Creates a WebSocket connection for real-time trip planning status updates.
  * @param {string} clientId - Unique client identifier
  * @param {object} callbacks - Callback functions for WebSocket events
  * @param {function} callbacks.onStatusUpdate - Called when status message is received
  * @param {function} callbacks.onStepChange - Called when step changes (receives step index)
+ * @param {function} callbacks.onProgress - Called with { elapsed_s, pending, eta_s } during planning
  * @returns {function} Cleanup function to close the connection
  */
-export const createStatusWebSocket = (clientId, { onStatusUpdate, onStepChange }) => {
+export const createStatusWebSocket = (clientId, { onStatusUpdate, onStepChange, onProgress }) => {
     let ws = null;
     let reconnectTimer = null;
 
@@ -48,6 +61,9 @@ export const createStatusWebSocket = (clientId, { onStatusUpdate, onStepChange }
             if (data.step && onStepChange && stepMap[data.step] !== undefined) {
                 onStepChange(stepMap[data.step]);
             }
+            if (data.progress && onProgress) {
+                onProgress(data.progress);
+            }
         };
 
         ws.onclose = () => {
@@ -1,6 +1,12 @@
 import React from 'react';
 
-const AgentStatus = ({ agentSteps, currentStep, statusMessage, destination }) => {
+// Round first, so 119.6 reads "2m 0s" rather than "1m 60s"
+const formatSeconds = (seconds) => {
+  const total = Math.round(seconds);
+  return total >= 60 ? `${Math.floor(total / 60)}m ${total % 60}s` : `${total}s`;
+};
+
+const AgentStatus = ({ agentSteps, currentStep, statusMessage, progress, destination }) => {
   return (
     <div className="flex-1 flex items-start justify-center px-6 py-8">
       <div className="w-full max-w-md">
@@ -11,6 +17,12 @@ const AgentStatus = ({ agentSteps, currentStep, statusMessage, destination }) =>
           <p className="text-[var(--color-text)] text-sm mb-6 text-center animate-pulse">
             {statusMessage || 'Connecting to agents...'}
           </p>
+          {progress && (
+            <p className="text-[var(--color-text-subtle)] text-xs -mt-4 mb-6 text-center">
+              {formatSeconds(progress.elapsed_s)} elapsed
+              {progress.eta_s != null && ` · about ${formatSeconds(progress.eta_s)} left`}
+            </p>
+          )}
           <div className="space-y-4">
             {agentSteps.map((step, index) => (
               <div
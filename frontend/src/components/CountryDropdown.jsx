@@ -1,45 +1,50 @@
-import React, { useState, useRef, useEffect, useMemo } from 'react';
-import { fetchAirports, searchAirports } from '../airports';
+import React, { useState, useRef, useEffect } from 'react';
+import { searchAirports } from '../airports';
+
+// Wait for a pause in typing before asking the backend
+const SEARCH_DEBOUNCE_MS = 150;
 
 const CountryDropdown = ({ value, onChange, placeholder, required = false, icon }) => {
     const [isOpen, setIsOpen] = useState(false);
     const [searchQuery, setSearchQuery] = useState(value || '');
-    const [airports, setAirports] = useState([]);
-    const [isLoading, setIsLoading] = useState(true);
+    const [filteredAirports, setFilteredAirports] = useState([]);
+    const [isLoading, setIsLoading] = useState(false);
     const dropdownRef = useRef(null);
     const inputRef = useRef(null);
 
-    // Fetch airports on mount
+    // Search airports on the backend as the user types
     useEffect(() => {
-        const loadAirports = async () => {
-            setIsLoading(true);
+        if (!searchQuery.trim()) {
+            setFilteredAirports([]);
+            setIsLoading(false);
+            return;
+        }
+
+        let cancelled = false;
+        setIsLoading(true);
+        const timer = setTimeout(async () => {
             try {
-                const airportList = await fetchAirports();
-                // Ensure we always set an array
-                if (Array.isArray(airportList)) {
-                    setAirports(airportList);
-                } else {
-                    console.error('fetchAirports did not return an array:', airportList);
-                    setAirports([]);
+                const results = await searchAirports(searchQuery);
+                if (!cancelled) {
+                    setFilteredAirports(results);
                 }
             } catch (error) {
-                console.error('Failed to load airports:', error);
-                setAirports([]);
+                console.error('Failed to search airports:', error);
+                if (!cancelled) {
+                    setFilteredAirports([]);
+                }
             } finally {
-                setIsLoading(false);
+                if (!cancelled) {
+                    setIsLoading(false);
+                }
             }
+        }, SEARCH_DEBOUNCE_MS);
+
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
         };
-        
-        loadAirports();
-    }, []);
-
-    // Filter airports based on search query
-    const filteredAirports = useMemo(() => {
-        if (isLoading || airports.length === 0) {
-            return [];
-        }
-        return searchAirports(airports, searchQuery);
-    }, [searchQuery, airports, isLoading]);
+    }, [searchQuery]);
 
     // Close dropdown when clicking outside
     useEffect(() => {
@@ -130,14 +135,14 @@ const CountryDropdown = ({ value, onChange, placeholder, required = false, icon
             />
 
             {/* Loading state */}
-            {isOpen && isLoading && (
+            {isOpen && isLoading && filteredAirports.length === 0 && (
                 <div className="absolute z-[9999] w-full mt-1 bg-[var(--color-surface)] border border-[var(--color-border)] rounded-xl shadow-lg p-4">
-                    <p className="text-[var(--color-text-muted)] text-sm">Loading airports...</p>
+                    <p className="text-[var(--color-text-muted)] text-sm">Searching airports...</p>
                 </div>
             )}
 
             {/* Dropdown */}
-            {isOpen && !isLoading && filteredAirports.length > 0 && (
+            {isOpen && filteredAirports.length > 0 && (
                 <div className="absolute z-[9999] w-full mt-1 bg-[var(--color-surface)] border border-[var(--color-border)] rounded-xl shadow-lg max-h-60 overflow-auto">
                     {filteredAirports.map((airport) => (
                         <button
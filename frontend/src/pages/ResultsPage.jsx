@@ -11,6 +11,7 @@ const ResultsPage = ({
   agentSteps,
   currentStep,
   statusMessage,
+  progress,
   destination,
   setDestination,
   origin,
@@ -204,6 +205,7 @@ const ResultsPage = ({
           agentSteps={agentSteps}
           currentStep={currentStep}
           statusMessage={statusMessage}
+          progress={progress}
           destination={destination}
         />
       )}